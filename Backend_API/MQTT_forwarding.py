@@ -1,19 +1,66 @@
-import paho.mqtt.client as mqtt
-import json
+import os
+import sys
+import threading
+import time
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+from forward_pool import ForwardPool
+from coalescer import SpotCoalescer
+from outbox import Outbox, OutboxDrainer
+from sqlite_sink import SqliteSink
+
 API_BASE = "http://localhost:3000"
 
 BROKER = "broker.emqx.io"
 PORT = 1883
 CLIENT_ID = "SmartPark2026_P6"
 
-TOPIC_SPOTS = "smart_parking_2026/parking/spots/+/status"
-TOPIC_BARRIER_STATE = "smart_parking_2026/parking/barriers/+/state"
+TOPIC_SPOTS = "smart_parking_2026/parking/spots/{spot_id}/status"
+TOPIC_SPOTS_BATCH = "smart_parking_2026/parking/spots/batch"
+TOPIC_BARRIER_STATE = "smart_parking_2026/parking/barriers/{barrier_id}/state"
 TOPIC_NEW_SPOT = "smart_parking_2026/parking/config/new_spot"
+TOPIC_METRICS = "smart_parking_2026/parking/monitoring/forwarder"
+
+# HTTP forwarding runs off the MQTT thread (see forward_pool.py)
+N_WORKERS = 4               # one keep-alive connection per worker
+QUEUE_SIZE = 1000           # jobs per worker queue
+ENQUEUE_TIMEOUT_S = 0.2     # max time the MQTT thread waits on a full queue
+METRICS_INTERVAL_S = 10.0   # backpressure metrics (print + TOPIC_METRICS)
+
+# Spot updates: coalesced per spot (last write wins) and sent with PUT /places/status
+# Without the outbox only: with OUTBOX_FILE the drainer batches instead and the window is unused
+COALESCE_WINDOW_S = 0.05    # 0 = disabled (one PUT per message through the pool)
+BULK_MAX = 500              # max updates per bulk request
+
+# Durable outbox (SQLite WAL): MQTT events are stored locally first and drained to the
+# API in the background, with retry/backoff when the API is slow or down (see outbox.py)
+OUTBOX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.db")  # "" = disabled
+OUTBOX_IDLE_S = 0.05        # drainer poll interval when the outbox is empty
+OUTBOX_BACKOFF_MAX_S = 30.0 # max delay between two delivery attempts
 
-# Avoid publishing ADD repeatedly on restart
+# Sink: "rest" (server.js API) or "sqlite" (write straight into the server.js database,
+# single-box deployments, see sqlite_sink.py)
+SINK = os.environ.get("SMARTPARK_SINK", "rest")
+SQLITE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parking.db")  # same file as server.js
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "schema.sql")
+SINK_BATCH_N = 500          # group commit every N rows ...
+SINK_BATCH_MS = 50.0        # ... or every M milliseconds
+
+pool = None       # ForwardPool, created by start_workers()
+coalescer = None  # SpotCoalescer, created by start_workers()
+outbox = None     # Outbox, created by start_workers()
+drainer = None    # OutboxDrainer, created by start_workers()
+sink = None       # SqliteSink, created by start_workers() when SINK == "sqlite"
+
+# Avoid publishing ADD repeatedly on restart: announced ids are kept on disk
+ANNOUNCED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "announced_spots.txt")
 published_spots = set()
+_announce_lock = threading.Lock()
+
+# Spot ids that exist in the API (warmed from GET /places at startup)
+known_spots = set()
 
 def build_update_payload(payload: dict):
     out = {"status": payload.get("status")}
@@ -31,6 +78,23 @@ def build_update_payload(payload: dict):
         out["debounce"] = dn
 
     return out
+
+def expand_batch(payload: dict):
+    # parking/spots/batch -> same dicts as the per-spot topic
+    # {"ts", "threshold_cm", "debounce_n", "spots": [[id, status, distance_cm], ...]}
+    for item in payload.get("spots") or []:
+        if not isinstance(item, list) or len(item) < 2:
+            continue
+        spot = {
+            "id": item[0],
+            "status": item[1],
+            "threshold_cm": payload.get("threshold_cm"),
+            "debounce_n": payload.get("debounce_n"),
+            "ts": payload.get("ts"),
+        }
+        if len(item) > 2:
+            spot["distance_cm"] = item[2]
+        yield spot
 #########################
 #fonctions de traitemens#
 #########################
@@ -39,15 +103,51 @@ def topic_barrier_id(topic: str):
     parts = topic.split("/")
     return parts[-2] if len(parts) >= 2 else None
 
+def load_announced():
+    # one id per line, appended by publish_new_spot
+    try:
+        with open(ANNOUNCED_FILE, encoding="utf-8") as f:
+            published_spots.update(line.strip() for line in f if line.strip())
+    except FileNotFoundError:
+        pass
+    print(f"📂 {len(published_spots)} spot(s) already announced on {TOPIC_NEW_SPOT}")
+
+def load_known_spots(http=requests):
+    # Warm cache: known spots take exactly one PUT, new ones are created up front
+    try:
+        r = http.get(f"{API_BASE}/places", timeout=5)
+        r.raise_for_status()
+        known_spots.update(row["id"] for row in r.json())
+        print(f"📂 {len(known_spots)} known spot(s) loaded from {API_BASE}/places")
+    except Exception as e:
+        print(f"⚠️ could not load known spots ({e}), falling back to create on 404")
+
 def publish_new_spot(mqtt_client, spot_id: str):
-    if spot_id in published_spots:
-        return
+    with _announce_lock:
+        if spot_id in published_spots:
+            return
+        published_spots.add(spot_id)
+        with open(ANNOUNCED_FILE, "a", encoding="utf-8") as f:
+            f.write(spot_id + "\n")
     payload = {"id": spot_id, "cmd": "ADD"}
-    mqtt_client.publish(TOPIC_NEW_SPOT, json.dumps(payload), retain=False)
-    published_spots.add(spot_id)
+    mqtt_client.publish(TOPIC_NEW_SPOT, codec.dumps(payload), retain=False)
     print(f"📤 published new_spot -> {TOPIC_NEW_SPOT} {payload}")
 
-def forward_spot(mqtt_client, payload: dict, topic: str):
+def ensure_spot(mqtt_client, http, spot_id: str, fields: dict, label=None):
+    # POST /places for a spot missing from the cache, then remember it
+    create_body = {"id": spot_id, "label": label or spot_id}
+    for k in ("distance", "threshold", "debounce"):
+        if k in fields:
+            create_body[k] = fields[k]
+
+    create_resp = http.post(f"{API_BASE}/places", json=create_body, timeout=2)
+
+    # If created (201) OR already exists (409), publish config/new_spot once
+    if create_resp.status_code in (201, 409, 200):
+        known_spots.add(spot_id)
+        publish_new_spot(mqtt_client, spot_id)
+
+def forward_spot(mqtt_client, payload: dict, topic: str, http=requests):
     spot_id = payload.get("id")
     status = payload.get("status")
     if not spot_id or status not in ["FREE", "OCCUPIED"]:
@@ -55,25 +155,68 @@ def forward_spot(mqtt_client, payload: dict, topic: str):
 
     update_body = build_update_payload(payload)
 
-    r = requests.put(f"{API_BASE}/places/{spot_id}/status", json=update_body, timeout=2)
+    if spot_id not in known_spots:
+        ensure_spot(mqtt_client, http, spot_id, update_body, payload.get("label"))
+
+    r = http.put(f"{API_BASE}/places/{spot_id}/status", json=update_body, timeout=2)
     print(f"➡️ {topic} -> REST {r.status_code}")
 
     if r.status_code == 404:
-        create_body = {"id": spot_id, "label": payload.get("label") or spot_id}
-        for k in ("distance", "threshold", "debounce"):
-            if k in update_body:
-                create_body[k] = update_body[k]
+        # cache was stale (spot deleted / DB reset): create and retry once
+        known_spots.discard(spot_id)
+        ensure_spot(mqtt_client, http, spot_id, update_body, payload.get("label"))
+        r = http.put(f"{API_BASE}/places/{spot_id}/status", json=update_body, timeout=2)
+        print(f"🔁 retry -> REST {r.status_code}")
 
-        create_resp = requests.post(f"{API_BASE}/places", json=create_body, timeout=2)
+def create_unknown_spots(mqtt_client, http, updates):
+    # Before a bulk PUT: create the spots that are not in the cache yet
+    for u in updates:
+        if u["id"] not in known_spots:
+            ensure_spot(mqtt_client, http, u["id"], u)
 
-        # If created (201) OR already exists (409), publish config/new_spot once
-        if create_resp.status_code in (201, 409, 200):
-            publish_new_spot(mqtt_client, spot_id)
+def create_missing_spots(mqtt_client, http, updates):
+    # Bulk PUT answered not_found (stale cache): create the spots, then the same updates are sent again
+    for u in updates:
+        known_spots.discard(u["id"])
+        ensure_spot(mqtt_client, http, u["id"], u)
+    return updates
 
-        r = requests.put(f"{API_BASE}/places/{spot_id}/status", json=update_body, timeout=2)
-        print(f"🔁 retry -> REST {r.status_code}")
+def queue_spot(mqtt_client, payload: dict, topic: str):
+    if sink is not None:
+        sink_spot(mqtt_client, payload)
+        return
+    if outbox is None and coalescer is None:
+        dispatch(payload.get("id"), forward_spot, mqtt_client, payload, topic)
+        return
+
+    spot_id = payload.get("id")
+    if not spot_id or payload.get("status") not in ["FREE", "OCCUPIED"]:
+        return
+    update = build_update_payload(payload)
+    update["id"] = spot_id
+    if outbox is not None:
+        outbox.append("spot", spot_id, update, replace=True)  # supersedes the pending state of the spot
+    else:
+        coalescer.add(update)
+
+def sink_spot(mqtt_client, payload: dict):
+    update = build_update_payload(payload)
+    update["id"] = payload.get("id")
+    if payload.get("label"):
+        update["label"] = payload["label"]
+    if sink.add_spot(update) and update["id"] not in known_spots:
+        # inserted by the upsert: announce it like a POST /places
+        known_spots.add(update["id"])
+        publish_new_spot(mqtt_client, update["id"])
+
+def put_barrier_state(http, barrier_id: str, state: str):
+    return http.put(
+        f"{API_BASE}/barrier/{barrier_id}/state",
+        json={"state": state},
+        timeout=2
+    )
 
-def forward_barrier_state(payload: dict, topic: str):
+def forward_barrier_state(payload: dict, topic: str, http=requests):
     state = payload.get("state")
     if state not in ["OPENING", "OPENED", "CLOSING", "CLOSED"]:
         return
@@ -82,41 +225,178 @@ def forward_barrier_state(payload: dict, topic: str):
     if not barrier_id:
         return
 
-    r = requests.put(
-        f"{API_BASE}/barrier/{barrier_id}/state",
-        json={"state": state},
-        timeout=2
-    )
+    r = put_barrier_state(http, barrier_id, state)
     print(f"🚧 {topic} state={state} -> REST {r.status_code}")
+    return r
+
+def queue_barrier_state(payload: dict, topic: str):
+    barrier_id = topic_barrier_id(topic)
+    if sink is not None:
+        sink.add_barrier(barrier_id, payload.get("state"))
+        return
+    if outbox is None:
+        dispatch(("barrier", barrier_id), forward_barrier_state, payload, topic)
+        return
+
+    state = payload.get("state")
+    if barrier_id and state in ["OPENING", "OPENED", "CLOSING", "CLOSED"]:
+        outbox.append("barrier", barrier_id, {"state": state})  # every transition kept, in order
+
+def deliver_outbox(http, rows):
+    # One drainer batch: spots in bulk PUTs, then barrier states in order.
+    # Raising keeps the whole batch in the outbox (re-sending a state is harmless).
+    spots = [body for _, kind, _, body in rows if kind == "spot"]
+    for i in range(0, len(spots), BULK_MAX):
+        r = coalescer.send(http, spots[i:i + BULK_MAX])
+        if r.status_code >= 500:
+            raise RuntimeError(f"PUT /places/status -> {r.status_code}")
+        if r.status_code != 200:
+            print(f"⚠️ bulk rejected ({r.status_code}), {len(spots[i:i + BULK_MAX])} update(s) dropped")
+
+    for _, kind, barrier_id, body in rows:
+        if kind != "barrier":
+            continue
+        r = put_barrier_state(http, barrier_id, body["state"])
+        print(f"🚧 outbox {barrier_id} state={body['state']} -> REST {r.status_code}")
+        if r.status_code >= 500:
+            raise RuntimeError(f"PUT /barrier/{barrier_id}/state -> {r.status_code}")
 
 def on_connect(client, userdata, flags, reason_code, properties=None):
     print(f"✅ Connected: reason_code={reason_code}")
-    client.subscribe(TOPIC_SPOTS)
-    client.subscribe(TOPIC_BARRIER_STATE)
-    print(f"✅ Subscribed to {TOPIC_SPOTS}")
-    print(f"✅ Subscribed to {TOPIC_BARRIER_STATE}")
+    # every route of the table, again after each reconnection
+    router.subscribe_all(client, qos=0)
+    for f in router.filters():
+        print(f"✅ Subscribed to {f}")
+
+
+##############
+#file d'envoi#
+##############
+def start_workers(mqtt_client):
+    global pool, coalescer, outbox, drainer, sink
+    load_announced()
+    if SINK == "sqlite":
+        sink = SqliteSink(SQLITE_DB, SCHEMA_FILE, SINK_BATCH_N, SINK_BATCH_MS)
+        known_spots.update(sink.spot_ids())
+        print(f"💽 sqlite sink {SQLITE_DB}: {len(known_spots)} known spot(s), "
+              f"group commit {SINK_BATCH_N} rows / {SINK_BATCH_MS:.0f} ms")
+        sink.start()
+        return
+
+    load_known_spots()
+    if COALESCE_WINDOW_S > 0 or OUTBOX_FILE:
+        coalescer = SpotCoalescer(
+            API_BASE, COALESCE_WINDOW_S, BULK_MAX,
+            before_send=lambda http, updates: create_unknown_spots(mqtt_client, http, updates),
+            on_not_found=lambda http, ids, updates: create_missing_spots(mqtt_client, http, updates)
+        )
+    if OUTBOX_FILE:
+        # the outbox replaces the in-memory window: the coalescer only sends the bulk PUTs
+        outbox = Outbox(OUTBOX_FILE)
+        print(f"📂 outbox {OUTBOX_FILE}: {outbox.depth()} pending event(s) from a previous run")
+        drainer = OutboxDrainer(outbox, deliver_outbox, BULK_MAX, OUTBOX_IDLE_S,
+                                backoff_max=OUTBOX_BACKOFF_MAX_S)
+        drainer.start()
+    else:
+        # no outbox: per-message PUTs go through the worker pool
+        pool = ForwardPool(N_WORKERS, QUEUE_SIZE, ENQUEUE_TIMEOUT_S)
+        pool.start()
+        if coalescer is not None:
+            coalescer.start()
+
+def stop_workers():
+    if sink is not None:
+        sink.stop()
+    if drainer is not None:
+        drainer.stop()
+        outbox.close()
+    elif coalescer is not None:
+        coalescer.stop()
+    if pool is not None:
+        pool.stop()
+
+def dispatch(key, fn, *args):
+    # Same key -> same worker -> per-spot / per-barrier order is kept
+    if pool is None:
+        fn(*args)  # no pool started (imported as a library): run inline
+        return
+    if not pool.submit(key, fn, *args):
+        print(f"⚠️ queue full, dropped {key}")
+
+def report_metrics(mqtt_client, stop: threading.Event):
+    last_done = 0
+    last_drained = 0
+    while not stop.wait(METRICS_INTERVAL_S):
+        if sink is not None:
+            m = dict(sink.stats, pending=sink.pending(), ts=time.time())
+            print(f"💽 sink rows={m['rows']} commits={m['commits']} pending={m['pending']} "
+                  f"invalid={m['invalid']} max_commit={m['max_commit_ms']}ms")
+            mqtt_client.publish(TOPIC_METRICS, codec.dumps({"sink": m}))
+            continue
+        m = {"ts": time.time()}
+        if pool is not None:  # outbox mode: nothing goes through the pool
+            m = pool.metrics()
+            m["rate"] = round((m["done"] - last_done) / METRICS_INTERVAL_S, 1)
+            last_done = m["done"]
+            print(f"📊 queue {m['depth']}/{m['capacity']} (max {m['max_depth']}) | {m['rate']} req/s | "
+                  f"full_waits={m['full_waits']} dropped={m['dropped']} errors={m['errors']}")
+        if coalescer is not None:
+            m["coalescer"] = dict(coalescer.stats)
+            c = m["coalescer"]
+            print(f"📦 coalescer received={c['received']} coalesced={c['coalesced']} "
+                  f"sent={c['sent']} bulk_requests={c['requests']} errors={c['errors']}")
+        if drainer is not None:
+            o = dict(outbox.stats, **drainer.stats)
+            o["depth"] = outbox.depth()
+            o["oldest_age_s"] = round(outbox.oldest_age(), 1)
+            o["drain_rate"] = round((o["drained"] - last_drained) / METRICS_INTERVAL_S, 1)
+            last_drained = o["drained"]
+            m["outbox"] = o
+            print(f"💾 outbox depth={o['depth']} (oldest {o['oldest_age_s']}s) | drain {o['drain_rate']} ev/s | "
+                  f"appended={o['appended']} compacted={o['compacted']} retries={o['retries']}")
+        mqtt_client.publish(TOPIC_METRICS, codec.dumps(m))
 
 
 ######
 #main#
 ######
+# topic -> handler table (smartpark_mqtt/router.py), JSON decoded by the handler only
+router = Router()
+
+@router.route(TOPIC_SPOTS_BATCH)
+def on_spots_batch(client, msg):
+    for spot in expand_batch(msg.json):
+        queue_spot(client, spot, msg.topic)
+
+@router.route(TOPIC_SPOTS)
+def on_spot_status(client, msg):
+    queue_spot(client, msg.json, msg.topic)
+
+@router.route(TOPIC_BARRIER_STATE)
+def on_barrier_state(client, msg):
+    queue_barrier_state(msg.json, msg.topic)
+
 def on_message(client, userdata, msg):
-    try:
-        payload = json.loads(msg.payload.decode())
-        topic = msg.topic
+    router.dispatch(client, msg)
 
-        if "/parking/spots/" in topic and topic.endswith("/status"):
-            forward_spot(client, payload, topic)
-        elif "/parking/barriers/" in topic and topic.endswith("/state"):
-            forward_barrier_state(payload, topic)
+def main():
+    client = make_client(CLIENT_ID)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    start_workers(client)
 
-    except Exception as e:
-        print(f"⚠️ Error: {e}")
+    stop = threading.Event()
+    threading.Thread(target=report_metrics, args=(client, stop), daemon=True).start()
 
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
-client.on_connect = on_connect
-client.on_message = on_message
+    print(f"🔌 Connecting to {BROKER}:{PORT} ...")
+    connect_with_backoff(client, BROKER, PORT)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        stop.set()
+        stop_workers()
 
-print(f"🔌 Connecting to {BROKER}:{PORT} ...")
-client.connect(BROKER, PORT)
-client.loop_forever()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Throughput of MQTT_forwarding sinks: MQTT -> SQLite, direct vs through the REST API.
+
+Floods --count spot events (loopback broker, in-process) into the forwarder and
+measures the time until every event is persisted:
+
+    sqlite   : SMARTPARK_SINK=sqlite, group commit into a temporary copy of the schema
+    rest     : outbox + bulk PUT /places/status (default REST path)
+    rest-1   : one PUT /places/{id}/status per message through the worker pool
+
+The REST modes need node server.js on API_BASE, otherwise they are skipped.
+
+Usage :
+    python bench_sink.py
+    python bench_sink.py --count 50000 --spots 500 --modes sqlite rest
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ["SMARTPARK_TRANSPORT"] = "loopback"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import MQTT_forwarding as p6
+from smartpark_mqtt import make_client
+
+SPOT_TOPIC = "smart_parking_2026/parking/spots/{}/status"
+
+
+def api_up() -> bool:
+    try:
+        return p6.requests.get(f"{p6.API_BASE}/parking/state", timeout=1).status_code == 200
+    except Exception:
+        return False
+
+
+def configure(mode: str, tmp: str):
+    # fresh module state for each run
+    p6.pool = p6.coalescer = p6.outbox = p6.drainer = p6.sink = None
+    p6.ANNOUNCED_FILE = os.path.join(tmp, f"announced_{mode}.txt")
+    p6.SINK = "sqlite" if mode == "sqlite" else "rest"
+    p6.SQLITE_DB = os.path.join(tmp, "parking.db")
+    p6.OUTBOX_FILE = os.path.join(tmp, "outbox.db") if mode == "rest" else ""
+    p6.COALESCE_WINDOW_S = 0.0
+
+
+def persisted(mode: str, client, count: int) -> bool:
+    if not client._inbox.empty():
+        return False
+    if mode == "sqlite":
+        return p6.sink.stats["rows"] >= count
+    if mode == "rest":
+        return p6.outbox.depth() == 0
+    m = p6.pool.metrics()
+    return m["done"] >= m["enqueued"]
+
+
+def run(mode: str, count: int, n_spots: int, tmp: str, timeout: float):
+    configure(mode, tmp)
+    client = make_client(f"{p6.CLIENT_ID}-{mode}")
+    client.on_connect = p6.on_connect
+    client.on_message = p6.on_message
+    p6.start_workers(client)
+    client.connect("loopback", 0, 60)
+    client.loop_start()
+
+    source = make_client(f"SmartPark2026_BENCH-{mode}")
+    source.connect("loopback", 0, 60)
+    spot_ids = [f"S{i:05d}" for i in range(n_spots)]
+
+    start = time.perf_counter()
+    for k in range(count):
+        spot_id = spot_ids[k % n_spots]
+        status = "OCCUPIED" if (k // n_spots) % 2 == 0 else "FREE"
+        payload = {"id": spot_id, "status": status, "distance_cm": 20.0, "threshold_cm": 50.0, "debounce_n": 4}
+        source.publish(SPOT_TOPIC.format(spot_id), json.dumps(payload), qos=1)
+    published = time.perf_counter() - start
+
+    deadline = time.time() + timeout
+    while not persisted(mode, client, count) and time.time() < deadline:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    done = persisted(mode, client, count)
+
+    if mode == "sqlite":
+        detail = f"{p6.sink.stats['commits']} commits, max {p6.sink.stats['max_commit_ms']} ms"
+    elif mode == "rest":
+        detail = f"{p6.coalescer.stats['requests']} bulk PUTs, {p6.outbox.stats['compacted']} compacted"
+    else:
+        detail = f"{p6.pool.metrics()['done']} PUTs"
+
+    client.loop_stop()
+    client.disconnect()
+    source.disconnect()
+    p6.stop_workers()
+    return published, elapsed, done, detail
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20000, help="spot events to inject")
+    parser.add_argument("--spots", type=int, default=200, help="distinct spot ids")
+    parser.add_argument("--modes", nargs="+", choices=["sqlite", "rest", "rest-1"], default=["sqlite", "rest", "rest-1"])
+    parser.add_argument("--timeout", type=float, default=120.0, help="max seconds per mode")
+    parser.add_argument("--verbose", action="store_true", help="keep the forwarder's own prints")
+    args = parser.parse_args()
+
+    rest_ok = api_up()
+    print(f"{args.count} events on {args.spots} spots")
+    print(f"{'mode':>7} | {'published s':>11} | {'persisted s':>11} | {'events/s':>10} | detail")
+    for mode in args.modes:
+        if mode != "sqlite" and not rest_ok:
+            print(f"{mode:>7} | REST API not reachable on {p6.API_BASE}: skipped")
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            out = sys.stdout if args.verbose else open(os.devnull, "w")
+            with contextlib.redirect_stdout(out):
+                published, elapsed, done, detail = run(mode, args.count, args.spots, tmp, args.timeout)
+        rate = f"{args.count / elapsed:10.0f}" if done else f"{'TIMEOUT':>10}"
+        print(f"{mode:>7} | {published:11.2f} | {elapsed:11.2f} | {rate} | {detail}")
+
+
+if __name__ == "__main__":
+    main()
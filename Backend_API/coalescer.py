@@ -0,0 +1,94 @@
+import threading
+
+import requests
+
+
+class SpotCoalescer:
+    """
+    Coalesces spot updates per spot id over a short window (last write wins)
+    and flushes them with one bulk request: PUT /places/status (server.js).
+
+    - add() only stores the latest update of the spot: O(1), never blocks on HTTP.
+    - A single flusher thread sends one bulk PUT per window (max_batch updates
+      per request), so updates of a spot reach the API in order.
+    - before_send(http, updates) runs before each bulk PUT (e.g. create new spots up front).
+    - Spots unknown to the API (not_found) are handed to on_not_found(http, ids, updates)
+      which creates them and returns the updates to send again.
+    """
+
+    def __init__(self, api_base: str, window_s: float = 0.05, max_batch: int = 500,
+                 before_send=None, on_not_found=None):
+        self.api_base = api_base
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.before_send = before_send
+        self.on_not_found = on_not_found
+        self._lock = threading.Lock()
+        self._pending = {}  # spot id -> update body (with "id")
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"received": 0, "coalesced": 0, "sent": 0, "requests": 0, "errors": 0}
+
+    def add(self, update: dict):
+        with self._lock:
+            self.stats["received"] += 1
+            if update["id"] in self._pending:
+                self.stats["coalesced"] += 1  # superseded before being sent
+            self._pending[update["id"]] = update
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        session = requests.Session()  # keep-alive connection for every flush
+        while not self._stop.wait(self.window_s):
+            self.flush(session)
+        self.flush(session)  # last window on shutdown
+        session.close()
+
+    def flush(self, http=requests):
+        with self._lock:
+            if not self._pending:
+                return
+            updates = list(self._pending.values())
+            self._pending = {}
+
+        for i in range(0, len(updates), self.max_batch):
+            chunk = updates[i:i + self.max_batch]
+            try:
+                self.send(http, chunk)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Error: {e}")
+
+    def send(self, http, updates):
+        if self.before_send is not None:
+            self.before_send(http, updates)
+        r = http.put(f"{self.api_base}/places/status", json={"updates": updates}, timeout=5)
+        self.stats["requests"] += 1
+        print(f"➡️ bulk {len(updates)} spot(s) -> REST {r.status_code}")
+        if r.status_code != 200:
+            self.stats["errors"] += 1
+            return r
+
+        body = r.json()
+        self.stats["sent"] += body.get("updated", 0)
+        for bad in body.get("invalid", []):
+            print(f"⚠️ invalid update {bad}")
+
+        missing = set(body.get("not_found", []))
+        if missing and self.on_not_found is not None:
+            retry = self.on_not_found(http, missing, [u for u in updates if u["id"] in missing])
+            if retry:
+                r2 = http.put(f"{self.api_base}/places/status", json={"updates": retry}, timeout=5)
+                self.stats["requests"] += 1
+                print(f"🔁 bulk retry {len(retry)} spot(s) -> REST {r2.status_code}")
+                if r2.status_code == 200:
+                    self.stats["sent"] += r2.json().get("updated", 0)
+        return r
@@ -16,3 +16,68 @@ CREATE TABLE IF NOT EXISTS barriers (
 
 
 CREATE INDEX IF NOT EXISTS idx_spots_status ON spots(status);
+
+-- ---------------------------------------------------------------
+-- Historique d'occupation
+-- spot_events : append-only, rempli par trigger a chaque changement de status
+-- (PUT REST, bulk PUT, sink SQLite du forwarder -> meme chemin)
+-- ---------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS spot_events (
+  id      INTEGER PRIMARY KEY AUTOINCREMENT,
+  spot_id TEXT NOT NULL,
+  status  TEXT NOT NULL CHECK (status IN ('FREE','OCCUPIED')),
+  ts      TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_spot_events_spot ON spot_events(spot_id, id);
+CREATE INDEX IF NOT EXISTS idx_spot_events_ts ON spot_events(ts);
+
+CREATE TRIGGER IF NOT EXISTS trg_spot_events_insert AFTER INSERT ON spots
+BEGIN
+  INSERT INTO spot_events (spot_id, status, ts) VALUES (new.id, new.status, new.updated_at);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_spot_events_update AFTER UPDATE OF status ON spots
+WHEN old.status <> new.status
+BEGIN
+  INSERT INTO spot_events (spot_id, status, ts) VALUES (new.id, new.status, new.updated_at);
+END;
+
+-- Rollups par minute (period = 60) et par heure (period = 3600), bucket = debut en secondes unix
+-- occupied_s  : secondes occupees dans le bucket
+-- arrivals    : FREE -> OCCUPIED (turnover), departures : OCCUPIED -> FREE
+-- dwell_s_sum : somme des durees de stationnement terminees dans le bucket
+CREATE TABLE IF NOT EXISTS rollup_spot (
+  period      INTEGER NOT NULL,
+  spot_id     TEXT NOT NULL,
+  bucket      INTEGER NOT NULL,
+  occupied_s  REAL NOT NULL DEFAULT 0,
+  arrivals    INTEGER NOT NULL DEFAULT 0,
+  departures  INTEGER NOT NULL DEFAULT 0,
+  dwell_s_sum REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (period, spot_id, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_zone (
+  period      INTEGER NOT NULL,
+  zone        TEXT NOT NULL,
+  bucket      INTEGER NOT NULL,
+  occupied_s  REAL NOT NULL DEFAULT 0,
+  arrivals    INTEGER NOT NULL DEFAULT 0,
+  departures  INTEGER NOT NULL DEFAULT 0,
+  dwell_s_sum REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (period, zone, bucket)
+) WITHOUT ROWID;
+
+-- dernier status traite par les rollups (debut de l'intervalle en cours)
+CREATE TABLE IF NOT EXISTS spot_occupancy (
+  spot_id TEXT PRIMARY KEY,
+  status  TEXT NOT NULL,
+  since   TEXT NOT NULL
+);
+
+-- curseur des rollups (dernier spot_events.id agrege)
+CREATE TABLE IF NOT EXISTS history_state (
+  name  TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+
+import requests
+
+
+class ForwardPool:
+    """
+    Bounded work queues drained by a pool of HTTP workers.
+
+    - One queue per worker; a job is routed by key (spot id / barrier id),
+      so every job of the same key runs on the same worker, in order.
+    - Each worker owns a requests.Session (persistent keep-alive connection).
+    - submit() never blocks the MQTT thread longer than enqueue_timeout:
+      if the queue is still full the job is dropped and counted.
+    """
+
+    def __init__(self, n_workers: int = 4, queue_size: int = 1000, enqueue_timeout: float = 0.2):
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(n_workers)]
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.threads = []
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "done": 0, "errors": 0, "dropped": 0, "full_waits": 0, "max_depth": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def start(self):
+        for i, q in enumerate(self.queues):
+            t = threading.Thread(target=self._worker, args=(q,), name=f"forward-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        for q in self.queues:
+            q.put(None)
+        for t in self.threads:
+            t.join(timeout)
+        self.threads = []
+
+    def _worker(self, q: queue.Queue):
+        session = requests.Session()
+        while True:
+            job = q.get()
+            if job is None:
+                break
+            fn, args = job
+            try:
+                fn(*args, http=session)
+            except Exception as e:
+                self._count("errors")
+                print(f"⚠️ Error: {e}")
+            finally:
+                self._count("done")
+        session.close()
+
+    def submit(self, key, fn, *args) -> bool:
+        """Queues fn(*args, http=session) on the worker that owns key."""
+        q = self.queues[hash(key) % len(self.queues)]
+        try:
+            q.put_nowait((fn, args))
+        except queue.Full:
+            # Backpressure: wait a little, then drop rather than stall MQTT keepalives
+            self._count("full_waits")
+            try:
+                q.put((fn, args), timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return False
+
+        depth = q.qsize()
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def metrics(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["depth"] = sum(q.qsize() for q in self.queues)
+        out["capacity"] = self.queue_size * len(self.queues)
+        out["workers"] = len(self.queues)
+        out["ts"] = time.time()
+        return out
@@ -0,0 +1,102 @@
+// Load test des endpoints GET polles par les dashboards (aucune dependance: module http).
+//
+// Usage:
+//   node load_test.js                                   # 64 connexions, 10 s, 3 endpoints
+//   node load_test.js --etag                            # renvoie If-None-Match (polls -> 304)
+//   node load_test.js --paths /parking/state --concurrency 128 --duration 20
+//
+// Avant / apres: lancer le meme test contre l'ancien server.js (git checkout <commit> -- server.js)
+// puis contre le nouveau, sur la meme base parking.db.
+
+const http = require("http");
+
+function parseArgs(argv) {
+  const args = {
+    base: "http://localhost:3000",
+    paths: ["/parking/state", "/parking/available", "/places"],
+    concurrency: 64,
+    duration: 10,
+    etag: false,
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    if (a === "--base") args.base = argv[++i];
+    else if (a === "--concurrency") args.concurrency = Number(argv[++i]);
+    else if (a === "--duration") args.duration = Number(argv[++i]);
+    else if (a === "--etag") args.etag = true;
+    else if (a === "--paths") {
+      args.paths = [];
+      while (argv[i + 1] && !argv[i + 1].startsWith("--")) args.paths.push(argv[++i]);
+    }
+  }
+  return args;
+}
+
+function percentile(sorted, p) {
+  if (!sorted.length) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.round((p / 100) * (sorted.length - 1)))];
+}
+
+async function runPath(args, path) {
+  const url = new URL(path, args.base);
+  const agent = new http.Agent({ keepAlive: true, maxSockets: args.concurrency });
+  const deadline = Date.now() + args.duration * 1000;
+  const latencies = [];
+  const codes = {};
+  let lastEtag = null;
+
+  function once() {
+    return new Promise((resolve) => {
+      const headers = args.etag && lastEtag ? { "If-None-Match": lastEtag } : {};
+      const t0 = process.hrtime.bigint();
+      const req = http.get(url, { agent, headers }, (res) => {
+        if (res.headers.etag) lastEtag = res.headers.etag;
+        res.resume();
+        res.on("end", () => {
+          latencies.push(Number(process.hrtime.bigint() - t0) / 1e6);
+          codes[res.statusCode] = (codes[res.statusCode] || 0) + 1;
+          resolve();
+        });
+      });
+      req.on("error", () => {
+        codes.error = (codes.error || 0) + 1;
+        resolve();
+      });
+    });
+  }
+
+  async function worker() {
+    while (Date.now() < deadline) await once();
+  }
+
+  const start = Date.now();
+  await Promise.all(Array.from({ length: args.concurrency }, worker));
+  const elapsed = (Date.now() - start) / 1000;
+  agent.destroy();
+
+  latencies.sort((a, b) => a - b);
+  return {
+    path,
+    rps: latencies.length / elapsed,
+    p50: percentile(latencies, 50),
+    p99: percentile(latencies, 99),
+    codes,
+  };
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  console.log(
+    `${args.base} | ${args.concurrency} connexions | ${args.duration}s par endpoint | etag=${args.etag}`
+  );
+  console.log(`${"endpoint".padStart(20)} | ${"req/s".padStart(9)} | ${"p50 ms".padStart(7)} | ${"p99 ms".padStart(7)} | codes`);
+  for (const path of args.paths) {
+    const r = await runPath(args, path);
+    console.log(
+      `${r.path.padStart(20)} | ${r.rps.toFixed(0).padStart(9)} | ${r.p50.toFixed(2).padStart(7)} | ` +
+        `${r.p99.toFixed(2).padStart(7)} | ${JSON.stringify(r.codes)}`
+    );
+  }
+}
+
+main();
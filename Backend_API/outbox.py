@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import threading
+import time
+
+import requests
+
+
+class Outbox:
+    """
+    Durable local outbox (SQLite, WAL mode) between MQTT and the REST API.
+
+    - append() is a local insert: accepts events at MQTT speed even when the API is down.
+    - Spot rows are compacted on write: a new state for a spot replaces the pending one
+      (only the latest state of a spot matters for the spots table).
+    - Barrier rows are kept in order (OPENING -> OPENED -> ...).
+    - Rows are deleted only after delivery (ack), so nothing is lost on crash/restart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL: durable across app crash, fast commits
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+              seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+              kind    TEXT NOT NULL,
+              key     TEXT NOT NULL,
+              body    TEXT NOT NULL,
+              created REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_kind_key ON outbox(kind, key)")
+        self.stats = {"appended": 0, "compacted": 0}
+
+    def append(self, kind: str, key: str, body: dict, replace: bool = False):
+        with self._lock:
+            self.db.execute("BEGIN")
+            if replace:
+                cur = self.db.execute("DELETE FROM outbox WHERE kind = ? AND key = ?", (kind, key))
+                self.stats["compacted"] += cur.rowcount
+            self.db.execute(
+                "INSERT INTO outbox (kind, key, body, created) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(body), time.time())
+            )
+            self.db.execute("COMMIT")
+            self.stats["appended"] += 1
+
+    def peek(self, limit: int):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT seq, kind, key, body FROM outbox ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, kind, key, json.loads(body)) for seq, kind, key, body in rows]
+
+    def ack(self, seqs):
+        with self._lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("DELETE FROM outbox WHERE seq = ?", [(s,) for s in seqs])
+            self.db.execute("COMMIT")
+
+    def depth(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def oldest_age(self) -> float:
+        with self._lock:
+            row = self.db.execute("SELECT MIN(created) FROM outbox").fetchone()
+        return 0.0 if row[0] is None else time.time() - row[0]
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+class OutboxDrainer:
+    """
+    Background thread replaying the outbox to the API.
+
+    deliver(http, rows) sends one batch (at most batch_max rows) and raises on a
+    transient failure (API down, 5xx): the batch stays in the outbox and is
+    retried with exponential backoff (backoff_min .. backoff_max seconds).
+    """
+
+    def __init__(self, outbox: Outbox, deliver, batch_max: int = 500, idle_s: float = 0.05,
+                 backoff_min: float = 0.5, backoff_max: float = 30.0):
+        self.outbox = outbox
+        self.deliver = deliver
+        self.batch_max = batch_max
+        self.idle_s = idle_s
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"drained": 0, "batches": 0, "retries": 0, "backoff_s": 0.0, "last_error": None}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="outbox-drainer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        session = requests.Session()
+        backoff = 0.0
+        while not self._stop.is_set():
+            rows = self.outbox.peek(self.batch_max)
+            if not rows:
+                self._stop.wait(self.idle_s)  # also the coalescing window of spot states
+                continue
+            try:
+                self.deliver(session, rows)
+            except Exception as e:
+                backoff = min(self.backoff_max, max(self.backoff_min, backoff * 2))
+                self.stats["retries"] += 1
+                self.stats["backoff_s"] = backoff
+                self.stats["last_error"] = str(e)
+                print(f"⚠️ outbox delivery failed ({e}), retry in {backoff:.1f}s")
+                self._stop.wait(backoff)
+                continue
+
+            backoff = 0.0
+            self.stats["backoff_s"] = 0.0
+            self.outbox.ack([r[0] for r in rows])
+            self.stats["drained"] += len(rows)
+            self.stats["batches"] += 1
+        session.close()
@@ -24,6 +24,121 @@ function isIntOrNull(v) {
   return v === undefined || v === null || (Number.isInteger(v) && Number.isFinite(v));
 }
 
+// meme regles que PUT /places/:id/status -> null si ok, sinon { error, message }
+function validateStatusUpdate({ status, distance, threshold, debounce }) {
+  if (!["FREE", "OCCUPIED"].includes(status)) {
+    return { error: "INVALID_STATUS" };
+  }
+  if (!isNumberOrNull(distance)) {
+    return { error: "INVALID_DISTANCE", message: "distance must be a number" };
+  }
+  if (!isNumberOrNull(threshold)) {
+    return { error: "INVALID_THRESHOLD", message: "threshold must be a number" };
+  }
+  if (!isIntOrNull(debounce)) {
+    return { error: "INVALID_DEBOUNCE", message: "debounce must be an integer" };
+  }
+  return null;
+}
+
+// -------------------
+// --- MIRROR RAM ----
+// -------------------
+// Copie en memoire de spots/barriers, mise a jour a chaque ecriture (write-through).
+// Les GET la lisent sans toucher SQLite: compteurs O(1), corps JSON mis en cache
+// par version, ETag -> 304 si rien n'a change depuis le dernier poll.
+// Une ecriture par une autre connexion (sink SQLite du forwarder) change
+// PRAGMA data_version: le miroir est alors recharge depuis la base.
+const stmts = {
+  allSpots: db.prepare(
+    "SELECT id, label, status, distance, threshold, debounce, updated_at FROM spots ORDER BY id"
+  ),
+  allBarriers: db.prepare("SELECT id, state, updated_at FROM barriers"),
+  insertSpot: db.prepare(`
+    INSERT INTO spots (id, label, status, distance, threshold, debounce, updated_at)
+    VALUES (?, ?, 'FREE', ?, ?, ?, ?)
+  `),
+  upsertBarrier: db.prepare(`
+    INSERT INTO barriers (id, state, updated_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET state=excluded.state, updated_at=excluded.updated_at
+  `),
+  dataVersion: db.prepare("PRAGMA data_version").pluck(),
+};
+
+const mirror = {
+  epoch: Date.now().toString(36),
+  version: 0,
+  dataVersion: null,
+  spots: new Map(),     // id -> row
+  barriers: new Map(),  // id -> { state, updated_at }
+  counts: { total: 0, free: 0, occupied: 0 },
+  cache: {},            // corps JSON deja serialises pour la version courante
+};
+
+function mirrorChanged() {
+  mirror.version += 1;
+  mirror.cache = {};
+}
+
+function loadMirror() {
+  mirror.spots.clear();
+  mirror.barriers.clear();
+  mirror.counts = { total: 0, free: 0, occupied: 0 };
+  for (const row of stmts.allSpots.all()) {
+    mirror.spots.set(row.id, row);
+    mirror.counts.total += 1;
+    mirror.counts[row.status === "FREE" ? "free" : "occupied"] += 1;
+  }
+  for (const row of stmts.allBarriers.all()) {
+    mirror.barriers.set(row.id, { state: row.state, updated_at: row.updated_at });
+  }
+  mirror.dataVersion = stmts.dataVersion.get();
+  mirrorChanged();
+}
+
+// rechargement seulement si une autre connexion a commit depuis
+function syncMirror() {
+  if (stmts.dataVersion.get() !== mirror.dataVersion) loadMirror();
+}
+
+function mirrorSpot(row) {
+  const prev = mirror.spots.get(row.id);
+  if (prev) mirror.counts[prev.status === "FREE" ? "free" : "occupied"] -= 1;
+  else mirror.counts.total += 1;
+  mirror.counts[row.status === "FREE" ? "free" : "occupied"] += 1;
+  mirror.spots.set(row.id, row);
+  mirrorChanged();
+}
+
+// applique un update (memes regles que le SQL: champs ecrases seulement s'ils sont fournis)
+function mirrorStatusUpdate(id, u, ts) {
+  const prev = mirror.spots.get(id);
+  if (!prev) return null;
+  const row = {
+    ...prev,
+    status: u.status,
+    distance: u.distance !== undefined ? u.distance : prev.distance,
+    threshold: u.threshold !== undefined ? u.threshold : prev.threshold,
+    debounce: u.debounce !== undefined ? u.debounce : prev.debounce,
+    updated_at: ts,
+  };
+  mirrorSpot(row);
+  return row;
+}
+
+// envoie le corps en cache (build() serialise une fois par version) avec ETag
+function sendMirrored(req, res, key, build) {
+  syncMirror();
+  const etag = `W/"${mirror.epoch}-${mirror.version}"`;
+  res.set("ETag", etag);
+  if (req.get("If-None-Match") === etag) return res.status(304).end();
+  if (mirror.cache[key] === undefined) mirror.cache[key] = JSON.stringify(build());
+  res.type("application/json").send(mirror.cache[key]);
+}
+
+loadMirror();
+
 // ---------------
 // --- PLACES ----
 // ---------------
@@ -48,15 +163,11 @@ app.post("/places", (req, res) => {
     return res.status(400).json({ error: "INVALID_DEBOUNCE", message: "debounce must be an integer" });
   }
 
-  const stmt = db.prepare(`
-    INSERT INTO spots (id, label, status, distance, threshold, debounce, updated_at)
-    VALUES (?, ?, 'FREE', ?, ?, ?, ?)
-  `);
-
   const ts = nowIso();
 
   try {
-    stmt.run(
+    syncMirror();
+    stmts.insertSpot.run(
       id,
       label ?? id,
       distance ?? null,
@@ -65,7 +176,7 @@ app.post("/places", (req, res) => {
       ts
     );
 
-    return res.status(201).json({
+    const row = {
       id,
       label: label ?? id,
       status: "FREE",
@@ -73,7 +184,9 @@ app.post("/places", (req, res) => {
       threshold: threshold ?? null,
       debounce: debounce ?? null,
       updated_at: ts
-    });
+    };
+    mirrorSpot(row);
+    return res.status(201).json(row);
   } catch (e) {
     if (String(e).includes("UNIQUE")) {
       return res
@@ -88,113 +201,119 @@ app.post("/places", (req, res) => {
 
 // requete liste de places
 app.get("/places", (req, res) => {
-  const rows = db
-    .prepare(
-      "SELECT id, label, status, distance, threshold, debounce, updated_at FROM spots ORDER BY id"
-    )
-    .all();
-  res.json(rows);
+  sendMirrored(req, res, "places", () =>
+    [...mirror.spots.values()].sort((a, b) => (a.id < b.id ? -1 : a.id > b.id ? 1 : 0))
+  );
 });
 
 // requete chercher place par {id}
 app.get("/places/:id", (req, res) => {
-  const row = db
-    .prepare(
-      "SELECT id, label, status, distance, threshold, debounce, updated_at FROM spots WHERE id = ?"
-    )
-    .get(req.params.id);
-
+  syncMirror();
+  const row = mirror.spots.get(req.params.id);
   if (!row) return res.status(404).json({ error: "NOT_FOUND", message: "Spot not found" });
   res.json(row);
 });
 
 // requete chercher status place par {id}
 app.get("/places/:id/status", (req, res) => {
-  const row = db.prepare("SELECT status FROM spots WHERE id = ?").get(req.params.id);
+  syncMirror();
+  const row = mirror.spots.get(req.params.id);
   if (!row) return res.status(404).json({ error: "NOT_FOUND", message: "Spot not found" });
-  res.json(row);
+  res.json({ status: row.status });
 });
 
-// change status d'une place
-// + accepte aussi (optionnel) distance/threshold/debounce pour mise a jour depuis JSON
-app.put("/places/:id/status", (req, res) => {
-  const { status, distance, threshold, debounce } = req.body || {};
+// change status de plusieurs places en une seule transaction (1 fsync)
+// body: { "updates": [ { "id": "A01", "status": "OCCUPIED", "distance": 19.8, ... }, ... ] }
+// distance/threshold/debounce: ecrasés seulement s'ils sont fournis (comme le PUT unitaire)
+const bulkUpdateStmt = db.prepare(`
+  UPDATE spots SET
+    status = ?,
+    updated_at = ?,
+    distance  = CASE WHEN ? THEN ? ELSE distance END,
+    threshold = CASE WHEN ? THEN ? ELSE threshold END,
+    debounce  = CASE WHEN ? THEN ? ELSE debounce END
+  WHERE id = ?
+`);
+
+function runStatusUpdate(id, u, ts) {
+  return bulkUpdateStmt.run(
+    u.status,
+    ts,
+    u.distance !== undefined ? 1 : 0, u.distance ?? null,
+    u.threshold !== undefined ? 1 : 0, u.threshold ?? null,
+    u.debounce !== undefined ? 1 : 0, u.debounce ?? null,
+    id
+  ).changes;
+}
 
-  if (!["FREE", "OCCUPIED"].includes(status)) {
-    return res.status(400).json({ error: "INVALID_STATUS" });
+const applyBulkUpdates = db.transaction((updates, ts) => {
+  const notFound = [];
+  let updated = 0;
+  for (const u of updates) {
+    if (runStatusUpdate(u.id, u, ts) === 0) notFound.push(u.id);
+    else updated += 1;
   }
+  return { updated, notFound };
+});
 
-  if (!isNumberOrNull(distance)) {
-    return res.status(400).json({ error: "INVALID_DISTANCE", message: "distance must be a number" });
+app.put("/places/status", (req, res) => {
+  const { updates } = req.body || {};
+  if (!Array.isArray(updates)) {
+    return res.status(400).json({ error: "INVALID_UPDATES", message: "updates must be an array" });
   }
-  if (!isNumberOrNull(threshold)) {
-    return res.status(400).json({ error: "INVALID_THRESHOLD", message: "threshold must be a number" });
-  }
-  if (!isIntOrNull(debounce)) {
-    return res.status(400).json({ error: "INVALID_DEBOUNCE", message: "debounce must be an integer" });
+
+  const valid = [];
+  const invalid = [];
+  for (const u of updates) {
+    if (!u || !u.id || typeof u.id !== "string") {
+      invalid.push({ id: u && u.id, error: "INVALID_ID" });
+      continue;
+    }
+    const err = validateStatusUpdate(u);
+    if (err) invalid.push({ id: u.id, ...err });
+    else valid.push(u);
   }
 
   const ts = nowIso();
+  syncMirror();
+  const { updated, notFound } = applyBulkUpdates(valid, ts);
+  const missing = new Set(notFound);
+  for (const u of valid) {
+    if (!missing.has(u.id)) mirrorStatusUpdate(u.id, u, ts);
+  }
 
-  // Build dynamic update so we only overwrite fields if they are provided
-  const sets = ["status = ?", "updated_at = ?"];
-  const params = [status, ts];
+  res.json({ ok: true, updated, not_found: notFound, invalid, updated_at: ts });
+});
 
-  if (distance !== undefined) {
-    sets.push("distance = ?");
-    params.push(distance);
-  }
-  if (threshold !== undefined) {
-    sets.push("threshold = ?");
-    params.push(threshold);
-  }
-  if (debounce !== undefined) {
-    sets.push("debounce = ?");
-    params.push(debounce);
+// change status d'une place
+// + accepte aussi (optionnel) distance/threshold/debounce pour mise a jour depuis JSON
+app.put("/places/:id/status", (req, res) => {
+  const err = validateStatusUpdate(req.body || {});
+  if (err) {
+    return res.status(400).json(err);
   }
 
-  params.push(req.params.id);
-
-  const info = db
-    .prepare(`UPDATE spots SET ${sets.join(", ")} WHERE id = ?`)
-    .run(...params);
+  const ts = nowIso();
 
-  if (info.changes === 0) {
+  // meme requete preparee que le bulk: champs ecrases seulement s'ils sont fournis
+  syncMirror();
+  if (runStatusUpdate(req.params.id, req.body, ts) === 0) {
     return res.status(404).json({ error: "NOT_FOUND", message: "Spot not found" });
   }
 
-  const row = db
-    .prepare(
-      "SELECT id, label, status, distance, threshold, debounce, updated_at FROM spots WHERE id = ?"
-    )
-    .get(req.params.id);
-
-  res.json(row);
+  res.json(mirrorStatusUpdate(req.params.id, req.body, ts));
 });
 
 // requete chercher liste place non occupee
 app.get("/parking/available", (req, res) => {
-  const rows = db.prepare("SELECT id FROM spots WHERE status='FREE'").all();
-  res.json(rows);
+  sendMirrored(req, res, "available", () =>
+    [...mirror.spots.values()].filter((s) => s.status === "FREE").map((s) => ({ id: s.id }))
+  );
 });
 
-// info generale {nbr total, nbr 'free', nbr 'occupee'}
+// info generale {nbr total, nbr 'free', nbr 'occupee'} -> compteurs du miroir, O(1)
 app.get("/parking/state", (req, res) => {
-  const r = db
-    .prepare(`
-      SELECT
-        COUNT(*) AS total,
-        SUM(CASE WHEN status='FREE' THEN 1 ELSE 0 END) AS free,
-        SUM(CASE WHEN status='OCCUPIED' THEN 1 ELSE 0 END) AS occupied
-      FROM spots
-    `)
-    .get();
-
-  res.json({
-    total: r.total || 0,
-    free: r.free || 0,
-    occupied: r.occupied || 0,
-  });
+  sendMirrored(req, res, "state", () => ({ ...mirror.counts }));
 });
 
 // -------------
@@ -204,7 +323,8 @@ app.get("/parking/state", (req, res) => {
 // chercher status barrier par id
 app.get("/barrier/:id", (req, res) => {
   // schema uses "state", not "status"
-  const row = db.prepare("SELECT state, updated_at FROM barriers WHERE id = ?").get(req.params.id);
+  syncMirror();
+  const row = mirror.barriers.get(req.params.id);
   if (!row) return res.status(404).json({ error: "NOT_FOUND", message: "Barrier not found" });
   res.json(row);
 });
@@ -212,12 +332,10 @@ app.get("/barrier/:id", (req, res) => {
 // fonction gerer barrier
 function setBarrierState(id, state) {
   const ts = nowIso();
-  const stmt = db.prepare(`
-    INSERT INTO barriers (id, state, updated_at)
-    VALUES (?, ?, ?)
-    ON CONFLICT(id) DO UPDATE SET state=excluded.state, updated_at=excluded.updated_at
-  `);
-  stmt.run(id, state, ts);
+  syncMirror();
+  stmts.upsertBarrier.run(id, state, ts);
+  mirror.barriers.set(id, { state, updated_at: ts });
+  mirrorChanged();
   return { id, state, updated_at: ts };
 }
 
@@ -234,6 +352,275 @@ app.put("/barrier/:id/state", (req, res) => {
 });
 
 
+// ----------------
+// --- HISTORY ----
+// ----------------
+// spot_events est rempli par trigger (schema.sql). Les rollups minute/heure sont
+// maintenus incrementalement: chaque passe n'agrege que les events apres le curseur.
+const ROLLUP_PERIODS = [60, 3600];
+const ROLLUP_INTERVAL_MS = 5000;
+const ROLLUP_BATCH = 5000;
+const RAW_RETENTION_DAYS = Number(process.env.HISTORY_RAW_DAYS || 30);
+const MINUTE_RETENTION_DAYS = Number(process.env.HISTORY_MINUTE_DAYS || 7);
+const HOUR_RETENTION_DAYS = Number(process.env.HISTORY_HOUR_DAYS || 400);
+
+// "A01" -> "A", "L1-A001" -> "L1-A"
+function zoneOf(spotId) {
+  return spotId.replace(/\d+$/, "") || spotId;
+}
+function toUnix(iso) {
+  return Date.parse(iso) / 1000;
+}
+
+const historyStmts = {
+  pending: db.prepare("SELECT id, spot_id, status, ts FROM spot_events WHERE id > ? ORDER BY id LIMIT ?"),
+  cursor: db.prepare("SELECT value FROM history_state WHERE name = 'rollup_event_id'"),
+  setCursor: db.prepare(`
+    INSERT INTO history_state (name, value) VALUES ('rollup_event_id', ?)
+    ON CONFLICT(name) DO UPDATE SET value = excluded.value
+  `),
+  getOcc: db.prepare("SELECT status, since FROM spot_occupancy WHERE spot_id = ?"),
+  setOcc: db.prepare(`
+    INSERT INTO spot_occupancy (spot_id, status, since) VALUES (?, ?, ?)
+    ON CONFLICT(spot_id) DO UPDATE SET status = excluded.status, since = excluded.since
+  `),
+  bumpSpot: db.prepare(`
+    INSERT INTO rollup_spot (period, spot_id, bucket, occupied_s, arrivals, departures, dwell_s_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(period, spot_id, bucket) DO UPDATE SET
+      occupied_s = occupied_s + excluded.occupied_s,
+      arrivals = arrivals + excluded.arrivals,
+      departures = departures + excluded.departures,
+      dwell_s_sum = dwell_s_sum + excluded.dwell_s_sum
+  `),
+  bumpZone: db.prepare(`
+    INSERT INTO rollup_zone (period, zone, bucket, occupied_s, arrivals, departures, dwell_s_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(period, zone, bucket) DO UPDATE SET
+      occupied_s = occupied_s + excluded.occupied_s,
+      arrivals = arrivals + excluded.arrivals,
+      departures = departures + excluded.departures,
+      dwell_s_sum = dwell_s_sum + excluded.dwell_s_sum
+  `),
+  // retention (pruneHistory)
+  pruneEvents: db.prepare("DELETE FROM spot_events WHERE ts < ? AND id <= ?"),
+  pruneSpot: db.prepare("DELETE FROM rollup_spot WHERE period = ? AND bucket < ?"),
+  pruneZone: db.prepare("DELETE FROM rollup_zone WHERE period = ? AND bucket < ?"),
+  // lectures (routes /history et /places/:id/history)
+  spotSeries: db.prepare(`
+    SELECT bucket, occupied_s, arrivals, departures, dwell_s_sum FROM rollup_spot
+    WHERE period = ? AND spot_id = ? AND bucket >= ?
+  `),
+  zoneSeries: db.prepare(`
+    SELECT bucket, SUM(occupied_s) AS occupied_s, SUM(arrivals) AS arrivals,
+           SUM(departures) AS departures, SUM(dwell_s_sum) AS dwell_s_sum
+    FROM rollup_zone WHERE period = ? AND bucket >= ? AND (? IS NULL OR zone = ?)
+    GROUP BY bucket
+  `),
+  zoneTotals: db.prepare(`
+    SELECT zone, SUM(occupied_s) AS occupied_s, SUM(arrivals) AS arrivals,
+           SUM(departures) AS departures, SUM(dwell_s_sum) AS dwell_s_sum
+    FROM rollup_zone WHERE period = 3600 AND bucket >= ? GROUP BY zone
+  `),
+  openOcc: db.prepare("SELECT spot_id, since FROM spot_occupancy WHERE status = 'OCCUPIED'"),
+  spotEvents: db.prepare("SELECT status, ts FROM spot_events WHERE spot_id = ? ORDER BY id DESC LIMIT ?"),
+};
+
+function bump(period, spotId, bucket, occupied, arrivals, departures, dwell) {
+  historyStmts.bumpSpot.run(period, spotId, bucket, occupied, arrivals, departures, dwell);
+  historyStmts.bumpZone.run(period, zoneOf(spotId), bucket, occupied, arrivals, departures, dwell);
+}
+
+// repartit l'intervalle occupe [from, to) sur les buckets qu'il traverse
+function forEachBucket(period, from, to, fn) {
+  for (let b = Math.floor(from / period) * period; b < to; b += period) {
+    const s = Math.min(to, b + period) - Math.max(from, b);
+    if (s > 0) fn(b, s);
+  }
+}
+
+const rollupBatch = db.transaction(() => {
+  const row = historyStmts.cursor.get();
+  const events = historyStmts.pending.all(row ? row.value : 0, ROLLUP_BATCH);
+
+  for (const e of events) {
+    const prev = historyStmts.getOcc.get(e.spot_id);
+    if (prev && prev.status === e.status) continue;
+    const t = toUnix(e.ts);
+
+    for (const period of ROLLUP_PERIODS) {
+      const bucket = Math.floor(t / period) * period;
+      if (e.status === "OCCUPIED") {
+        bump(period, e.spot_id, bucket, 0, 1, 0, 0);
+      } else if (prev) {
+        // OCCUPIED -> FREE : intervalle occupe + duree de stationnement
+        const since = toUnix(prev.since);
+        forEachBucket(period, since, t, (b, s) => bump(period, e.spot_id, b, s, 0, 0, 0));
+        bump(period, e.spot_id, bucket, 0, 0, 1, Math.max(0, t - since));
+      }
+    }
+    historyStmts.setOcc.run(e.spot_id, e.status, e.ts);
+  }
+
+  if (events.length) historyStmts.setCursor.run(events[events.length - 1].id);
+  return events.length;
+});
+
+function rollupPending() {
+  while (rollupBatch() === ROLLUP_BATCH) {}
+}
+
+// supprime les events bruts deja agreges + les vieux rollups
+const pruneHistory = db.transaction(() => {
+  const now = Date.now() / 1000;
+  const row = historyStmts.cursor.get();
+  const rawCutoff = new Date((now - RAW_RETENTION_DAYS * 86400) * 1000).toISOString();
+  const raw = historyStmts.pruneEvents.run(rawCutoff, row ? row.value : 0).changes;
+  for (const [period, days] of [[60, MINUTE_RETENTION_DAYS], [3600, HOUR_RETENTION_DAYS]]) {
+    const cutoff = now - days * 86400;
+    historyStmts.pruneSpot.run(period, cutoff);
+    historyStmts.pruneZone.run(period, cutoff);
+  }
+  return raw;
+});
+
+rollupPending();
+pruneHistory();
+setInterval(rollupPending, ROLLUP_INTERVAL_MS).unref();
+setInterval(pruneHistory, 3600 * 1000).unref();
+
+// query params communs: ?days=30&period=hour|minute
+function historyWindow(req) {
+  const period = req.query.period === "minute" ? 60 : 3600;
+  const maxDays = period === 60 ? MINUTE_RETENTION_DAYS : HOUR_RETENTION_DAYS;
+  const days = Math.min(Number(req.query.days) || 30, maxDays);
+  const now = Date.now() / 1000;
+  const from = Math.floor((now - days * 86400) / period) * period;
+  return { period, days, from, now };
+}
+
+function spotIdsOf(zone) {
+  syncMirror();
+  const ids = [...mirror.spots.keys()];
+  return zone ? ids.filter((id) => zoneOf(id) === zone) : ids;
+}
+
+function summarize(totals, spots, period, nBuckets, days) {
+  const capacity = spots * period * nBuckets;
+  return {
+    spots,
+    occupancy: capacity ? totals.occupied_s / capacity : 0,
+    arrivals: totals.arrivals,
+    turnover_per_spot_day: spots && days ? totals.arrivals / spots / days : 0,
+    mean_dwell_s: totals.departures ? totals.dwell_s_sum / totals.departures : null,
+  };
+}
+
+// serie d'occupation depuis les rollups: parking entier, ?zone=A ou ?spot=A01
+// ex: GET /history/occupancy?days=30&zone=A
+app.get("/history/occupancy", (req, res) => {
+  rollupPending();
+  const { period, days, from, now } = historyWindow(req);
+  const { zone, spot } = req.query;
+
+  let rows;
+  let ids;
+  if (spot) {
+    rows = historyStmts.spotSeries.all(period, spot, from);
+    ids = [spot];
+  } else {
+    rows = historyStmts.zoneSeries.all(period, from, zone ?? null, zone ?? null);
+    ids = spotIdsOf(zone);
+  }
+
+  const buckets = new Map();
+  for (let b = from; b < now; b += period) {
+    buckets.set(b, { occupied_s: 0, arrivals: 0, departures: 0, dwell_s_sum: 0 });
+  }
+  for (const r of rows) {
+    const acc = buckets.get(r.bucket);
+    if (!acc) continue;
+    acc.occupied_s += r.occupied_s;
+    acc.arrivals += r.arrivals;
+    acc.departures += r.departures;
+    acc.dwell_s_sum += r.dwell_s_sum;
+  }
+
+  // places encore occupees: intervalle ouvert [since, now) pas encore dans les rollups
+  const wanted = new Set(ids);
+  const open = historyStmts.openOcc.all();
+  for (const o of open) {
+    if (!wanted.has(o.spot_id)) continue;
+    forEachBucket(period, Math.max(from, toUnix(o.since)), now, (b, s) => {
+      const acc = buckets.get(b);
+      if (acc) acc.occupied_s += s;
+    });
+  }
+
+  const totals = { occupied_s: 0, arrivals: 0, departures: 0, dwell_s_sum: 0 };
+  const series = [];
+  for (const [b, acc] of buckets) {
+    for (const k of Object.keys(totals)) totals[k] += acc[k];
+    series.push({
+      bucket: new Date(b * 1000).toISOString(),
+      occupancy: ids.length ? acc.occupied_s / (ids.length * period) : 0,
+      arrivals: acc.arrivals,
+      departures: acc.departures,
+      mean_dwell_s: acc.departures ? acc.dwell_s_sum / acc.departures : null,
+    });
+  }
+
+  res.json({
+    period,
+    days,
+    zone: zone ?? null,
+    spot: spot ?? null,
+    ...summarize(totals, ids.length, period, buckets.size, days),
+    buckets: series,
+  });
+});
+
+// resume par zone sur la periode (rollups horaires)
+app.get("/history/zones", (req, res) => {
+  rollupPending();
+  const { days, from, now } = historyWindow({ query: { ...req.query, period: "hour" } });
+  const rows = historyStmts.zoneTotals.all(from);
+
+  const byZone = new Map();
+  for (const id of spotIdsOf()) {
+    const z = zoneOf(id);
+    if (!byZone.has(z)) byZone.set(z, { spots: 0, occupied_s: 0, arrivals: 0, departures: 0, dwell_s_sum: 0 });
+    byZone.get(z).spots += 1;
+  }
+  for (const r of rows) {
+    const acc = byZone.get(r.zone);
+    if (!acc) continue;
+    acc.occupied_s += r.occupied_s;
+    acc.arrivals += r.arrivals;
+    acc.departures += r.departures;
+    acc.dwell_s_sum += r.dwell_s_sum;
+  }
+  const open = historyStmts.openOcc.all();
+  for (const o of open) {
+    const acc = byZone.get(zoneOf(o.spot_id));
+    if (acc) acc.occupied_s += Math.max(0, now - Math.max(from, toUnix(o.since)));
+  }
+
+  const nBuckets = Math.ceil((now - from) / 3600);
+  const zones = [...byZone].map(([zone, acc]) => ({
+    zone,
+    ...summarize(acc, acc.spots, 3600, nBuckets, days),
+  }));
+  res.json({ days, zones });
+});
+
+// events bruts d'une place (les plus recents d'abord)
+app.get("/places/:id/history", (req, res) => {
+  const limit = Math.min(Number(req.query.limit) || 100, 1000);
+  const rows = historyStmts.spotEvents.all(req.params.id, limit);
+  res.json(rows);
+});
+
 // --- start ---
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => console.log(`REST API running on http://localhost:${PORT}`));
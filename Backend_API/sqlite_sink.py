@@ -0,0 +1,177 @@
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+SPOT_STATUSES = ("FREE", "OCCUPIED")
+BARRIER_STATES = ("OPENING", "OPENED", "CLOSING", "CLOSED")
+
+# Same statement as PUT /places/status (server.js), plus the insert of unknown spots
+# (POST /places): distance/threshold/debounce are overwritten only if provided
+UPSERT_SPOT = """
+    INSERT INTO spots (id, label, status, distance, threshold, debounce, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+      status = excluded.status,
+      updated_at = excluded.updated_at,
+      distance  = CASE WHEN ? THEN excluded.distance ELSE distance END,
+      threshold = CASE WHEN ? THEN excluded.threshold ELSE threshold END,
+      debounce  = CASE WHEN ? THEN excluded.debounce ELSE debounce END
+"""
+
+UPSERT_BARRIER = """
+    INSERT INTO barriers (id, state, updated_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET state=excluded.state, updated_at=excluded.updated_at
+"""
+
+
+def now_iso() -> str:
+    # same format as new Date().toISOString() in server.js
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _is_number_or_none(v) -> bool:
+    return v is None or (isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v))
+
+
+def _is_int_or_none(v) -> bool:
+    # Number.isInteger() of server.js: 4.0 is an integer too
+    if isinstance(v, float):
+        return v.is_integer()
+    return v is None or (isinstance(v, int) and not isinstance(v, bool))
+
+
+def validate_status_update(u: dict):
+    # validateStatusUpdate() of server.js -> None if ok, else {"error", "message"}
+    if u.get("status") not in SPOT_STATUSES:
+        return {"error": "INVALID_STATUS"}
+    if not _is_number_or_none(u.get("distance")):
+        return {"error": "INVALID_DISTANCE", "message": "distance must be a number"}
+    if not _is_number_or_none(u.get("threshold")):
+        return {"error": "INVALID_THRESHOLD", "message": "threshold must be a number"}
+    if not _is_int_or_none(u.get("debounce")):
+        return {"error": "INVALID_DEBOUNCE", "message": "debounce must be an integer"}
+    return None
+
+
+class SqliteSink:
+    """
+    Writes spot / barrier states straight into the server.js database (schema.sql),
+    without the MQTT -> HTTP -> Node hop. For single-box deployments.
+
+    - WAL mode: server.js keeps reading (and writing) the same file concurrently.
+    - Group commit: rows are buffered and committed in one transaction every
+      batch_n rows or batch_ms milliseconds, whichever comes first.
+    - Statements are constant SQL strings, prepared once by the sqlite3 statement cache.
+    """
+
+    def __init__(self, db_path: str, schema_path: str, batch_n: int = 500, batch_ms: float = 50.0):
+        self.db_path = db_path
+        self.batch_n = batch_n
+        self.batch_ms = batch_ms
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with open(schema_path, encoding="utf-8") as f:
+            self.db.executescript(f.read())
+
+        self._lock = threading.Lock()       # protects the buffers
+        self._db_lock = threading.Lock()    # one transaction at a time
+        self._spots = []
+        self._barriers = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"received": 0, "invalid": 0, "rows": 0, "commits": 0, "errors": 0, "max_commit_ms": 0.0}
+
+    def spot_ids(self):
+        with self._db_lock:
+            return [row[0] for row in self.db.execute("SELECT id FROM spots")]
+
+    def add_spot(self, update: dict) -> bool:
+        """update: {"id", "status", "distance"?, "threshold"?, "debounce"?, "label"?}"""
+        err = validate_status_update(update) if isinstance(update.get("id"), str) and update["id"] \
+            else {"error": "INVALID_ID"}
+        with self._lock:
+            self.stats["received"] += 1
+            if err:
+                self.stats["invalid"] += 1
+                print(f"⚠️ invalid update {update.get('id')}: {err['error']}")
+                return False
+            self._spots.append(update)
+            full = len(self._spots) + len(self._barriers) >= self.batch_n
+        if full:
+            self._wake.set()
+        return True
+
+    def add_barrier(self, barrier_id: str, state: str) -> bool:
+        with self._lock:
+            self.stats["received"] += 1
+            if not barrier_id or state not in BARRIER_STATES:
+                self.stats["invalid"] += 1
+                return False
+            self._barriers.append((barrier_id, state))
+            full = len(self._spots) + len(self._barriers) >= self.batch_n
+        if full:
+            self._wake.set()
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._spots) + len(self._barriers)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sqlite-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._db_lock:
+            self.db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.batch_ms / 1000.0)
+            self._wake.clear()
+            self.flush()
+        self.flush()  # last group on shutdown
+
+    def flush(self):
+        with self._lock:
+            spots, self._spots = self._spots, []
+            barriers, self._barriers = self._barriers, []
+        if not spots and not barriers:
+            return
+
+        ts = now_iso()
+        spot_rows = [(u["id"], u.get("label") or u["id"], u["status"],
+                      u.get("distance"), u.get("threshold"), u.get("debounce"), ts,
+                      "distance" in u, "threshold" in u, "debounce" in u) for u in spots]
+        barrier_rows = [(b_id, state, ts) for b_id, state in barriers]
+
+        t0 = time.perf_counter()
+        with self._db_lock:
+            try:
+                self.db.execute("BEGIN")
+                self.db.executemany(UPSERT_SPOT, spot_rows)
+                self.db.executemany(UPSERT_BARRIER, barrier_rows)
+                self.db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self.db.in_transaction:
+                    self.db.execute("ROLLBACK")
+                self.stats["errors"] += 1
+                print(f"⚠️ sqlite sink commit failed ({e}), retried with the next group")
+                with self._lock:
+                    # e.g. database locked by server.js: keep the rows, in order
+                    self._spots = spots + self._spots
+                    self._barriers = barriers + self._barriers
+                return
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.stats["rows"] += len(spot_rows) + len(barrier_rows)
+        self.stats["commits"] += 1
+        self.stats["max_commit_ms"] = max(self.stats["max_commit_ms"], round(ms, 2))
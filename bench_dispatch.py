@@ -0,0 +1,166 @@
+"""
+Microbenchmark of MQTT message dispatch: messages/s handled by on_message.
+
+Same topic mix and same handler work for every mode, messages are fed straight
+to on_message (no broker, no network):
+
+    chain        : old style, json.loads on every payload then a chain of
+                   substring checks / topic.split("/") (as the modules did)
+    router-json  : smartpark_mqtt.Router (topic trie + cache), lazy decoding
+                   with the standard json module
+    router       : same, lazy decoding with smartpark_mqtt.codec (orjson if installed)
+
+Topic mix (per 100 messages): 70 spot status, 5 spot batch, 10 gate sensors,
+10 barrier states, 5 monitoring messages the module does not care about
+(received through a broad subscription, never decoded by the router).
+
+Usage :
+    python bench_dispatch.py
+    python bench_dispatch.py --messages 500000 --spots 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from smartpark_mqtt import Router, codec
+
+PREFIX = "smart_parking_2026/parking/"
+
+
+class Msg:
+    __slots__ = ("topic", "payload", "qos", "retain")
+
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic
+        self.payload = payload
+        self.qos = 1
+        self.retain = False
+
+
+def make_messages(n: int, n_spots: int, seed: int = 1):
+    rnd = random.Random(seed)
+    spots = [f"{z}{i:03d}" for z in "ABCD" for i in range(1, n_spots // 4 + 1)]
+    gates = [f"entry_{i}" for i in range(1, 5)] + [f"exit_{i}" for i in range(1, 5)]
+    out = []
+    for _ in range(n):
+        r = rnd.random()
+        if r < 0.70:
+            s = rnd.choice(spots)
+            body = {"id": s, "status": rnd.choice(("FREE", "OCCUPIED")), "distance_cm": 20.4,
+                    "threshold_cm": 50.0, "debounce_n": 4, "ts": "2026-01-29T18:25:30"}
+            out.append(Msg(f"{PREFIX}spots/{s}/status", json.dumps(body).encode()))
+        elif r < 0.75:
+            body = {"ts": "2026-01-29T18:25:30", "threshold_cm": 50.0, "debounce_n": 4,
+                    "spots": [[rnd.choice(spots), "OCCUPIED", 19.8] for _ in range(10)]}
+            out.append(Msg(f"{PREFIX}spots/batch", json.dumps(body).encode()))
+        elif r < 0.85:
+            body = {"status": rnd.choice(("FREE", "OCCUPIED")), "ts": "2026-01-29T18:25:30"}
+            out.append(Msg(f"{PREFIX}gates/{rnd.choice(gates)}/sensor", json.dumps(body).encode()))
+        elif r < 0.95:
+            body = {"state": rnd.choice(("OPENING", "OPENED", "CLOSING", "CLOSED"))}
+            out.append(Msg(f"{PREFIX}barriers/{rnd.choice(gates)}/state", json.dumps(body).encode()))
+        else:
+            body = {"depth": 3, "rate": 120.5, "workers": 4, "dropped": 0, "ts": 1769710730.1}
+            out.append(Msg(f"{PREFIX}monitoring/forwarder", json.dumps(body).encode()))
+    return out
+
+
+# --- handler work, identical in every mode ---
+counts = {"spot": 0, "batch": 0, "gate": 0, "barrier": 0}
+
+
+def handle_spot(spot_id, payload):
+    counts["spot"] += payload.get("status") == "OCCUPIED"
+
+
+def handle_batch(payload):
+    counts["batch"] += len(payload.get("spots") or [])
+
+
+def handle_gate(gate_id, payload):
+    counts["gate"] += payload.get("status") == "OCCUPIED"
+
+
+def handle_barrier(barrier_id, payload):
+    counts["barrier"] += payload.get("state") == "OPENED"
+
+
+# --- old style: decode first, then substring checks ---
+def chain_on_message(client, userdata, msg):
+    try:
+        topic = msg.topic
+        payload = json.loads(msg.payload.decode())
+
+        if topic == PREFIX + "spots/batch":
+            handle_batch(payload)
+        elif "/parking/spots/" in topic and topic.endswith("/status"):
+            handle_spot(topic.split("/")[-2], payload)
+        elif "/parking/gates/" in topic and topic.endswith("/sensor"):
+            handle_gate(topic.split("/")[-2], payload)
+        elif "/parking/barriers/" in topic and topic.endswith("/state"):
+            handle_barrier(topic.split("/")[-2], payload)
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+# --- router ---
+def make_router() -> Router:
+    router = Router(prefix=PREFIX)
+    router.route("spots/batch", lambda c, m: handle_batch(m.json))
+    router.route("spots/{spot_id}/status", lambda c, m: handle_spot(m.params["spot_id"], m.json))
+    router.route("gates/{gate}/sensor", lambda c, m: handle_gate(m.params["gate"], m.json))
+    router.route("barriers/{barrier_id}/state", lambda c, m: handle_barrier(m.params["barrier_id"], m.json))
+    return router
+
+
+def run(on_message, messages, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        for k in counts:
+            counts[k] = 0
+        start = time.perf_counter()
+        for msg in messages:
+            on_message(None, None, msg)
+        rate = len(messages) / (time.perf_counter() - start)
+        best = max(best, rate)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--spots", type=int, default=2000, help="distinct spot ids (distinct topics)")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N passes")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.spots)
+    print(f"{args.messages} messages | {args.spots} spots | codec={codec.BACKEND}")
+    print(f"{'mode':>12} | {'msg/s':>12} | {'vs chain':>8}")
+
+    results = {}
+    results["chain"] = run(chain_on_message, messages, args.repeat)
+    expected = dict(counts)
+
+    router = make_router()
+    fast_loads = codec.loads
+    codec.loads = codec.json_loads  # Message.json reads codec.loads at call time
+    try:
+        results["router-json"] = run(router.on_message, messages, args.repeat)
+    finally:
+        codec.loads = fast_loads
+    results["router"] = run(make_router().on_message, messages, args.repeat)
+
+    if counts != expected:
+        print(f"⚠️ handlers saw different data: chain={expected} router={counts}")
+    for mode, rate in results.items():
+        print(f"{mode:>12} | {rate:>12,.0f} | {rate / results['chain']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
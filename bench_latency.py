@@ -0,0 +1,286 @@
+"""
+End-to-end latency benchmark : spot event (P1) -> P6 / REST / SQLite and -> P4 display.
+
+Injects tagged spot events (extra "trace" field, ignored by the modules) at
+increasing rates and timestamps every hop in-process:
+
+    inject      : publish on .../spots/{id}/status
+    p6_mqtt     : MQTT_forwarding receives it
+    rest        : PUT /places/{id}/status has returned (server.js)
+    db_commit   : updated_at written by server.js in the spots row
+    p4_mqtt     : p4_led_display receives it
+    display     : /api/parking/summary reflects it (places[] updated)
+
+Reports p50 / p95 / p99 per hop (ms from inject) for each rate, and the
+highest rate that is still sustainable (every event done before the end of
+the step + grace, and p99 under --slo-ms).
+
+P4 always runs. P6 / REST / DB hops need the REST API (node server.js) on
+API_BASE, otherwise they are skipped.
+
+Usage :
+    python bench_latency.py                           # loopback broker, 50..1600 ev/s
+    python bench_latency.py --rates 20 50 100 --step-seconds 10
+    SMARTPARK_TRANSPORT=paho python bench_latency.py  # through broker.emqx.io
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault("SMARTPARK_TRANSPORT", "loopback")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for d in ("p1_sensor", "p4_afficheur_led", "Backend_API"):
+    sys.path.insert(0, os.path.join(ROOT, d))
+
+from smartpark_mqtt import make_client
+
+SPOT_TOPIC = "smart_parking_2026/parking/spots/{}/status"
+HOP_ORDER = ["p6_mqtt", "rest", "db_commit", "p4_mqtt", "display"]
+GRACE_S = 2.0  # time allowed after the last injection for the pipeline to catch up
+
+
+# =========================
+# Trace collection
+# =========================
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.marks = {}  # trace -> {hop: unix ts}
+
+    def mark(self, trace, hop: str, ts: float | None = None):
+        if trace is None:
+            return
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self.marks.setdefault(trace, {}).setdefault(hop, ts)
+
+    def latencies(self, traces, hop: str):
+        out = []
+        with self._lock:
+            for tr in traces:
+                m = self.marks.get(tr, {})
+                if "inject" in m and hop in m:
+                    out.append((m[hop] - m["inject"]) * 1000.0)
+        return sorted(out)
+
+    def done_at(self, traces, hop: str):
+        with self._lock:
+            ts = [self.marks.get(tr, {}).get(hop) for tr in traces]
+        return None if any(t is None for t in ts) else max(ts)
+
+
+def percentile(sorted_values, p: float):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _iso_to_unix(s):
+    # server.js: new Date().toISOString() -> "2026-01-29T18:25:30.123Z"
+    try:
+        return datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+# =========================
+# Instrumentation (wraps module functions, no change to their behaviour)
+# =========================
+def instrument_p4(p4, tracer: Tracer):
+    orig_on_message = p4.on_message
+
+    def on_message(client, userdata, msg):
+        try:
+            data = json.loads(msg.payload)
+            trace = data.get("trace") if isinstance(data, dict) else None
+        except Exception:
+            trace = None
+        tracer.mark(trace, "p4_mqtt")
+        orig_on_message(client, userdata, msg)
+        if trace is not None and p4.places.get(p4._normalize_place_id(data.get("id"))) == data.get("status"):
+            tracer.mark(trace, "display")
+
+    return on_message
+
+
+def instrument_p6(p6, tracer: Tracer):
+    orig_on_message = p6.on_message
+    orig_forward_spot = p6.forward_spot
+
+    def on_message(client, userdata, msg):
+        # MQTT receipt, before the job is queued to the HTTP workers
+        try:
+            data = json.loads(msg.payload)
+            tracer.mark(data.get("trace") if isinstance(data, dict) else None, "p6_mqtt")
+        except Exception:
+            pass
+        orig_on_message(client, userdata, msg)
+
+    class TimedHTTP:
+        def __init__(self, http, trace):
+            self.http, self.trace = http, trace
+
+        def __getattr__(self, name):
+            return getattr(self.http, name)
+
+        def put(self, url, *args, **kwargs):
+            r = self.http.put(url, *args, **kwargs)
+            if "/places/" in url and r.status_code == 200:
+                tracer.mark(self.trace, "rest")
+                tracer.mark(self.trace, "db_commit", _iso_to_unix(r.json().get("updated_at", "")))
+            return r
+
+    def forward_spot(mqtt_client, payload, topic, http=p6.requests):
+        return orig_forward_spot(mqtt_client, payload, topic, http=TimedHTTP(http, payload.get("trace")))
+
+    p6.on_message = on_message
+    p6.forward_spot = forward_spot
+
+
+def instrument_coalescer(p6, tracer: Tracer):
+    # Coalesced / outbox path: a bulk PUT commits every trace queued for its spots
+    # so far (superseded events are reflected by the later state of the same spot).
+    lock = threading.Lock()
+    pending = {}  # spot id -> traces queued since its last bulk PUT
+    coalescer = p6.coalescer
+    orig_queue_spot, orig_send = p6.queue_spot, coalescer.send
+
+    def queue_spot(mqtt_client, payload, topic):
+        with lock:
+            pending.setdefault(payload.get("id"), []).append(payload.get("trace"))
+        orig_queue_spot(mqtt_client, payload, topic)
+
+    def send(http, updates):
+        with lock:
+            traces = [t for u in updates for t in pending.pop(u["id"], [])]
+        r = orig_send(http, updates)
+        if r.status_code == 200:
+            committed = _iso_to_unix(r.json().get("updated_at", ""))
+            for t in traces:
+                tracer.mark(t, "rest")
+                tracer.mark(t, "db_commit", committed)
+        return r
+
+    p6.queue_spot = queue_spot
+    coalescer.send = send
+
+
+def api_up(base: str) -> bool:
+    try:
+        import requests
+        return requests.get(f"{base}/parking/state", timeout=1).status_code == 200
+    except Exception:
+        return False
+
+
+# =========================
+# Load steps
+# =========================
+def run_step(source, tracer: Tracer, rate: float, seconds: float, spot_ids, seq_start: int, hops):
+    n = max(1, int(rate * seconds))
+    traces = []
+    start = time.perf_counter()
+    for k in range(n):
+        delay = start + k / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        seq = seq_start + k
+        spot_id = spot_ids[seq % len(spot_ids)]
+        # alternate per spot so every event is a real transition for P4
+        status = "OCCUPIED" if (seq // len(spot_ids)) % 2 == 0 else "FREE"
+        trace = f"b{seq}"
+        payload = {"id": spot_id, "status": status, "distance_cm": 20.0 if status == "OCCUPIED" else 200.0,
+                   "threshold_cm": 50.0, "debounce_n": 4, "ts": datetime.now().isoformat(timespec="seconds"),
+                   "trace": trace}
+        tracer.mark(trace, "inject")
+        source.publish(SPOT_TOPIC.format(spot_id), json.dumps(payload), qos=1)
+        traces.append(trace)
+    inject_end = time.time()
+
+    # wait for the slowest hop to complete (or the grace period to expire)
+    deadline = inject_end + GRACE_S
+    while time.time() < deadline:
+        if all(tracer.done_at(traces, h) is not None for h in hops):
+            break
+        time.sleep(0.05)
+    time.sleep(0.2)
+    return traces, inject_end
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=float, nargs="+", default=[50, 100, 200, 400, 800, 1600])
+    parser.add_argument("--step-seconds", type=float, default=5.0)
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p99 budget for a rate to count as sustainable")
+    parser.add_argument("--verbose", action="store_true", help="keep the modules' own prints")
+    args = parser.parse_args()
+
+    import p4_led_display as p4
+    import MQTT_forwarding as p6
+    import sensor_p1
+
+    tracer = Tracer()
+    with_p6 = api_up(p6.API_BASE)
+    hops = HOP_ORDER if with_p6 else ["p4_mqtt", "display"]
+
+    out = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(out):
+        p4.on_message = instrument_p4(p4, tracer)
+        p4.start_mqtt()
+        if with_p6:
+            instrument_p6(p6, tracer)
+            c6 = make_client(p6.CLIENT_ID)
+            c6.on_connect = p6.on_connect
+            c6.on_message = p6.on_message
+            p6.start_workers(c6)
+            if p6.coalescer is not None:
+                instrument_coalescer(p6, tracer)
+            c6.connect(p6.BROKER, p6.PORT, 60)
+            c6.loop_start()
+
+        source = make_client("SmartPark2026_BENCH")
+        source.connect(p4.MQTT_BROKER, p4.MQTT_PORT, 60)
+        source.loop_start()
+        time.sleep(0.5)  # let subscriptions settle on a real broker
+
+    if not with_p6:
+        print(f"REST API not reachable on {p6.API_BASE}: P6 / REST / DB hops skipped.")
+
+    spot_ids = sorted(p4.places) or list(sensor_p1.SPOTS)  # P4 starts with an empty registry
+    best = None
+    seq = 0
+    for rate in args.rates:
+        with contextlib.redirect_stdout(out):
+            traces, inject_end = run_step(source, tracer, rate, args.step_seconds, spot_ids, seq, hops)
+        seq += len(traces)
+
+        print(f"\n== {rate:.0f} ev/s x {args.step_seconds:.0f}s ({len(traces)} events)")
+        print(f"{'hop':>10} | {'done':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+        sustainable = True
+        for hop in hops:
+            lat = tracer.latencies(traces, hop)
+            p50, p95, p99 = (percentile(lat, p) for p in (50, 95, 99))
+            fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+            print(f"{hop:>10} | {len(lat):>6} | {fmt(p50)} | {fmt(p95)} | {fmt(p99)}")
+            done = tracer.done_at(traces, hop)
+            if done is None or done > inject_end + GRACE_S or p99 is None or p99 > args.slo_ms:
+                sustainable = False
+        print("sustainable" if sustainable else "BACKLOG (not sustainable)")
+        if not sustainable:
+            break
+        best = rate
+
+    print(f"\nMax sustainable rate: {best:.0f} ev/s" if best else "\nNo sustainable rate in the tested range.")
+    source.loop_stop()
+    source.disconnect()
+
+
+if __name__ == "__main__":
+    main()
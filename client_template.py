@@ -1,43 +1,48 @@
-import paho.mqtt.client as mqtt
-import json
-import time
-
-# --- CONFIGURATION À MODIFIER ---
-BROKER = "broker.emqx.io"
-PORT = 1883
-# Chaque personne doit changer ce ID (ex: SmartPark2026_P1)
-CLIENT_ID = "SmartPark2026_PX" 
-
-# --- LOGIQUE DE RÉCEPTION ---
-def on_message(client, userdata, msg):
-    try:
-        payload = json.loads(msg.payload.decode())
-        print(f"📥 Message reçu sur {msg.topic}: {payload}")
-        # AJOUTER TA LOGIQUE ICI (ex: si topic == barrière alors...)
-    except Exception as e:
-        print(f"⚠️ Erreur de format : {e}")
-
-# --- INITIALISATION ---
-client = mqtt.Client(client_id=CLIENT_ID)
-client.on_message = on_message
-
-print(f"🔌 Connexion au broker {BROKER}...")
-client.connect(BROKER, PORT)
-
-# --- ABONNEMENTS ---
-# Exemple : client.subscribe("smart_parking_2026/parking/spots/+/status")
-client.subscribe("smart_parking_2026/parking/#") # Pour tester, on écoute tout
-
-client.loop_start() # Démarre la surveillance en arrière-plan
-
-try:
-    while True:
-        # --- LOGIQUE D'ENVOI ---
-        # Exemple pour P1 :
-        # data = {"id": "A1", "status": "FREE"}
-        # client.publish("smart_parking_2026/parking/spots/A1/status", json.dumps(data))
-        
-        time.sleep(5) 
-except KeyboardInterrupt:
-    print("Arrêt du module.")
+import time
+
+# paho (défaut) ou loopback en mémoire : SMARTPARK_TRANSPORT=loopback
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+
+# --- CONFIGURATION À MODIFIER ---
+BROKER = "broker.emqx.io"
+PORT = 1883
+# Chaque personne doit changer ce ID (ex: SmartPark2026_P1)
+CLIENT_ID = "SmartPark2026_PX" 
+
+# --- LOGIQUE DE RÉCEPTION ---
+# Une route par topic : {nom} = un niveau (msg.params["nom"]), "#" = tout le reste.
+# Le JSON n'est décodé que si le handler lit msg.json / msg.get(...).
+router = Router(prefix="smart_parking_2026/parking/")
+
+# Exemple : router.route("spots/{spot_id}/status", on_spot)
+@router.route("#")  # Pour tester, on écoute tout
+def on_any(client, msg):
+    print(f"📥 Message reçu sur {msg.topic}: {msg.text}")
+    # AJOUTER TA LOGIQUE ICI (ex: msg.get("status"), msg.params["spot_id"])
+
+# --- ABONNEMENTS ---
+# Toutes les routes, refaits à chaque (re)connexion
+def on_connect(client, userdata, flags, reason_code, properties=None):
+    router.subscribe_all(client, qos=1)
+
+# --- INITIALISATION ---
+client = make_client(CLIENT_ID)
+client.on_connect = on_connect
+client.on_message = router.on_message
+
+print(f"🔌 Connexion au broker {BROKER}...")
+connect_with_backoff(client, BROKER, PORT)  # réessaie avec délai croissant si le broker est injoignable
+
+client.loop_start() # Démarre la surveillance en arrière-plan
+
+try:
+    while True:
+        # --- LOGIQUE D'ENVOI ---
+        # Exemple pour P1 :
+        # data = {"id": "A1", "status": "FREE"}
+        # client.publish("smart_parking_2026/parking/spots/A1/status", codec.dumps(data))
+        
+        time.sleep(5) 
+except KeyboardInterrupt:
+    print("Arrêt du module.")
     client.disconnect()
\ No newline at end of file
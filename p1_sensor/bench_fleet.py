@@ -0,0 +1,53 @@
+"""
+Benchmark : ticks per second, per-object Spot path vs SpotFleet (NumPy).
+
+Usage :
+    python p1_sensor/bench_fleet.py
+    python p1_sensor/bench_fleet.py --sizes 1000 100000 --seconds 3
+"""
+import argparse
+import time
+
+from sensor_p1 import Spot
+from fleet_engine import SpotFleet
+
+
+def run_objects(n: int, seconds: float):
+    spots = [Spot(f"S{i:06d}") for i in range(n)]
+    last = {sp.spot_id: None for sp in spots}
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for sp in spots:
+            status = sp.update_debounced_status(sp.read_distance())
+            if status != last[sp.spot_id]:
+                last[sp.spot_id] = status
+        ticks += 1
+    return ticks / (time.perf_counter() - start)
+
+
+def run_fleet(n: int, seconds: float):
+    fleet = SpotFleet([f"S{i:06d}" for i in range(n)], seed=0)
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fleet.step()
+        ticks += 1
+    return ticks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each run")
+    args = parser.parse_args()
+
+    print(f"{'spots':>8} | {'objects ticks/s':>16} | {'fleet ticks/s':>14} | {'speedup':>8}")
+    for n in args.sizes:
+        obj = run_objects(n, args.seconds)
+        vec = run_fleet(n, args.seconds)
+        print(f"{n:>8} | {obj:>16.2f} | {vec:>14.2f} | {vec / obj:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark : memory per simulated spot (bytes), before / after.
+
+- before  : Spot with a __dict__, float attributes, string status,
+            plus the last_published_spots {id: status} dict of the old main loop
+- objects : current Spot (__slots__, integer status, published state on the spot)
+- fleet   : SpotFleet (NumPy struct-of-arrays)
+
+Usage :
+    python p1_sensor/bench_memory.py --spots 1000000
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from sensor_p1 import Spot, make_spot_ids
+
+
+class LegacySpot:
+    # Attribute layout of Spot before __slots__ / integer status
+    def __init__(self, spot_id: str):
+        self.spot_id = spot_id
+        self.has_car = False
+        self.activity = random.uniform(0.6, 1.6)
+        self.next_switch = time.time() + random.uniform(30, 150) / self.activity
+        self.stable_status = "FREE"
+        self.occ_count = 0
+        self.free_count = 0
+
+
+def build_before(ids):
+    spots = [LegacySpot(s) for s in ids]
+    last_published_spots = {sp.spot_id: sp.stable_status for sp in spots}
+    return spots, last_published_spots
+
+
+def build_objects(ids):
+    return [Spot(s) for s in ids]
+
+
+def build_fleet(ids):
+    from fleet_engine import SpotFleet
+    return SpotFleet(ids)
+
+
+def measure(build, ids) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = build(ids)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used / len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spots", type=int, default=200000)
+    args = parser.parse_args()
+
+    # Ids are built once and shared: only the per-spot state is measured.
+    # They are interned up front, otherwise the growth of the interning table
+    # (Spot interns its id) would be counted against the objects representation.
+    ids = [sys.intern(s) for s in make_spot_ids(("A",), 1, args.spots)]
+
+    print(f"{'representation':>15} | {'bytes/spot':>10} | {'MB total':>9}")
+    for name, build in (("before", build_before), ("objects", build_objects), ("fleet", build_fleet)):
+        per_spot = measure(build, ids)
+        print(f"{name:>15} | {per_spot:>10.1f} | {per_spot * len(ids) / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import heapq
+import itertools
+import time
+
+from sensor_p1 import GateSensor, FREE, THRESHOLD_CM, DIST_FREE, DIST_PARK, NOISE_CM
+
+# =========================
+# Event-driven scheduler — wake only the sensors that are due
+# =========================
+# A spot only needs to be read when:
+#   - its next_switch is due (a car arrives or leaves), or
+#   - its debounce window is open (readings disagree with the stable status).
+# Between those moments every reading gives the same detection, so skipping it
+# changes nothing. Gate sensors are woken at their next_toggle.
+#
+# Reads still happen on the READ_INTERVAL_S tick, so debounce (DEBOUNCE_N
+# consecutive readings) and gate timing are exactly the ones of the polling loop.
+
+# The skip is only exact if noise can never push a reading across the threshold
+assert DIST_PARK[1] + NOISE_CM < THRESHOLD_CM <= DIST_FREE[0] - NOISE_CM
+
+
+def _debounce_pending(sp) -> bool:
+    # Some readings disagree with the stable status -> read again next tick
+    if sp.status_code == FREE:
+        return sp.occ_count > 0
+    return sp.free_count > 0
+
+
+class EventScheduler:
+    def __init__(self, spots, gates=()):
+        self._heap = []                 # (due_time, seq, sensor)
+        self._seq = itertools.count()   # tie-breaker, sensors are not comparable
+        # First tick reads every sensor once (initial publish, like the polling loop)
+        self._next_tick = list(spots) + list(gates)
+
+    def _push(self, due: float, sensor):
+        heapq.heappush(self._heap, (due, next(self._seq), sensor))
+
+    def pending(self) -> int:
+        return len(self._heap) + len(self._next_tick)
+
+    def tick(self):
+        """
+        Runs one READ_INTERVAL_S tick on the due sensors only.
+        Returns [(sensor, status, distance_cm)] for every woken sensor
+        (distance_cm is None for gate sensors).
+        """
+        t = time.time()
+        woken = self._next_tick
+        self._next_tick = []
+        while self._heap and self._heap[0][0] <= t:
+            woken.append(heapq.heappop(self._heap)[2])
+
+        events = []
+        for sensor in woken:
+            if isinstance(sensor, GateSensor):
+                events.append((sensor, sensor.step(), None))
+                self._push(sensor.next_toggle, sensor)
+                continue
+
+            d = sensor.read_distance()
+            status = sensor.update_debounced_status(d)
+            events.append((sensor, status, d))
+
+            if _debounce_pending(sensor):
+                self._next_tick.append(sensor)
+            else:
+                self._push(sensor.next_switch, sensor)
+        return events
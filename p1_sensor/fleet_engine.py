@@ -0,0 +1,88 @@
+import sys
+import time
+import numpy as np
+
+from sensor_p1 import THRESHOLD_CM, DEBOUNCE_N, DIST_FREE, DIST_PARK, NOISE_CM
+from sensor_p1 import FREE, OCCUPIED, STATUS_NAMES, UNPUBLISHED
+
+# =========================
+# Fleet engine — all spots held in NumPy arrays
+# =========================
+# Same model as Spot (sensor_p1.py), but one vectorized step per tick
+# instead of one Python call per spot. Same status encoding as sensor_p1 (0 = FREE, 1 = OCCUPIED).
+
+PARK_DURATION_S = (45, 180)  # seconds parked (before / activity)
+FREE_DURATION_S = (30, 150)  # seconds free  (before / activity)
+
+
+class SpotFleet:
+    def __init__(self, spot_ids, seed=None, t0=None):
+        self.spot_ids = [sys.intern(s) for s in spot_ids]
+        n = len(self.spot_ids)
+        self.rng = np.random.default_rng(seed)
+        t0 = time.time() if t0 is None else t0
+
+        self.activity = self.rng.uniform(0.6, 1.6, n)  # higher = changes more often
+        self.has_car = np.zeros(n, dtype=bool)          # every spot starts empty
+        self.next_switch = t0 + self.rng.uniform(*FREE_DURATION_S, n) / self.activity
+
+        self.distance = np.zeros(n, dtype=np.float64)   # last simulated reading (cm)
+        self.occ_count = np.zeros(n, dtype=np.int32)
+        self.free_count = np.zeros(n, dtype=np.int32)
+        self.stable = np.full(n, FREE, dtype=np.int8)   # status after debounce
+        self.published = np.full(n, UNPUBLISHED, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.spot_ids)
+
+    def _update_world(self, t):
+        # Cars arrive/leave for the spots whose next_switch is due
+        due = np.flatnonzero(t >= self.next_switch)
+        if due.size == 0:
+            return
+        self.has_car[due] = ~self.has_car[due]
+        parked = self.has_car[due]
+        low = np.where(parked, PARK_DURATION_S[0], FREE_DURATION_S[0])
+        high = np.where(parked, PARK_DURATION_S[1], FREE_DURATION_S[1])
+        self.next_switch[due] = t + self.rng.uniform(low, high) / self.activity[due]
+
+    def read_distances(self, t):
+        # Ultrasonic-like reading for every spot at once
+        self._update_world(t)
+        low = np.where(self.has_car, DIST_PARK[0], DIST_FREE[0])
+        high = np.where(self.has_car, DIST_PARK[1], DIST_FREE[1])
+        base = self.rng.uniform(low, high)
+        noise = self.rng.uniform(-NOISE_CM, NOISE_CM, len(self))
+        np.maximum(base + noise, 0.0, out=self.distance)
+        return self.distance
+
+    def update_debounced_status(self, distances):
+        # Same rules as Spot.update_debounced_status, applied to the whole fleet
+        detected_occ = distances < THRESHOLD_CM
+        self.occ_count = np.where(detected_occ, self.occ_count + 1, 0).astype(np.int32)
+        self.free_count = np.where(detected_occ, 0, self.free_count + 1).astype(np.int32)
+
+        to_occ = (self.stable != OCCUPIED) & (self.occ_count >= DEBOUNCE_N)
+        to_free = (self.stable != FREE) & (self.free_count >= DEBOUNCE_N)
+        self.stable[to_occ] = OCCUPIED
+        self.stable[to_free] = FREE
+
+        switched = to_occ | to_free
+        self.occ_count[switched] = 0
+        self.free_count[switched] = 0
+        return self.stable
+
+    def step(self, t=None):
+        """
+        One tick for the whole fleet.
+        Returns the indices whose stable status differs from the last published one
+        (and marks them as published), so the caller only touches changed spots.
+        """
+        t = time.time() if t is None else t
+        self.update_debounced_status(self.read_distances(t))
+        changed = np.flatnonzero(self.stable != self.published)
+        self.published[changed] = self.stable[changed]
+        return changed
+
+    def status(self, i) -> str:
+        return STATUS_NAMES[self.stable[i]]
@@ -0,0 +1,89 @@
+"""
+Multi-process sensor fleet : splits a configurable spot space across a process pool.
+
+Each shard simulates its own slice of spots with its own MQTT connection
+(client id SmartPark2026_P1-s00, -s01, ...). The parent process only
+aggregates the publish rates. Shard 0 also runs the ENTRY/EXIT sensors.
+
+Usage :
+    python p1_sensor/fleet_shards.py --zones A B C D --levels 3 --per-zone 2000
+    python p1_sensor/fleet_shards.py --shards 4 --engine fleet --per-zone 50000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import time
+
+import sensor_p1
+from smartpark_mqtt import connect_with_backoff, make_client  # repo root is on sys.path (see sensor_p1)
+from sensor_p1 import make_spot_ids, run_sensors, add_spot_space_args, add_publish_args
+
+REPORT_INTERVAL_S = 5.0  # how often the parent prints the aggregated rates
+
+
+def run_shard(shard: int, spot_ids, engine: str, publish_mode: str, counter):
+    # Forked workers share the parent's random state -> reseed per shard
+    random.seed()
+    sensor_p1.LOG_PUBLISHES = False
+
+    client = make_client(f"{sensor_p1.CLIENT_ID}-s{shard:02d}")
+    connect_with_backoff(client, sensor_p1.BROKER_HOST, sensor_p1.BROKER_PORT, 60)
+    client.loop_start()
+
+    def count(n):
+        counter.value += n
+
+    try:
+        run_sensors(client, spot_ids, engine, with_gates=(shard == 0), on_publish=count,
+                    publish_mode=publish_mode)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--engine", choices=["events", "objects", "fleet"], default="events")
+    add_spot_space_args(parser)
+    add_publish_args(parser)
+    args = parser.parse_args()
+
+    spot_ids = make_spot_ids(args.zones, args.levels, args.per_zone)
+    n_shards = max(1, min(args.shards, len(spot_ids)))
+
+    # One unlocked counter per shard: only its own worker writes it
+    counters = [mp.Value("L", 0, lock=False) for _ in range(n_shards)]
+    workers = [
+        mp.Process(target=run_shard, daemon=True,
+                   args=(k, spot_ids[k::n_shards], args.engine, args.publish, counters[k]))
+        for k in range(n_shards)
+    ]
+    for w in workers:
+        w.start()
+
+    print(f"{len(spot_ids)} spots on {n_shards} shards ({args.engine} engine). Ctrl+C to stop.")
+
+    last = [0] * n_shards
+    last_t = time.time()
+    try:
+        while any(w.is_alive() for w in workers):
+            time.sleep(REPORT_INTERVAL_S)
+            t = time.time()
+            totals = [c.value for c in counters]
+            rates = [(cur - prev) / (t - last_t) for cur, prev in zip(totals, last)]
+            last, last_t = totals, t
+            per_shard = " ".join(f"{r:.0f}" for r in rates)
+            print(f"publish rate: {sum(rates):.1f} msg/s total | per shard: {per_shard} | sent: {sum(totals)}")
+    except KeyboardInterrupt:
+        print("Stopping shards...")
+    finally:
+        for w in workers:
+            w.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-import time, json, random
+import time, random, argparse, os, sys
 from datetime import datetime
-import paho.mqtt.client as mqtt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root
+from smartpark_mqtt import codec, connect_with_backoff, make_client  # paho or in-memory loopback (SMARTPARK_TRANSPORT)
 
 # =========================
 # Part A — Configuration
@@ -12,15 +14,26 @@ BROKER_PORT = 1883             # default MQTT port
 # 20 parking spots: A01..A20
 SPOTS = [f"A{i:02d}" for i in range(1, 21)]
 
+CLIENT_ID = "SmartPark2026_P1"
+LOG_PUBLISHES = True  # print one line per publish (turn off for large fleets)
+
 THRESHOLD_CM = 50.0   # distance below which a spot is considered OCCUPIED
 READ_INTERVAL_S = 1.0 # loop frequency (1 reading per second)
 DEBOUNCE_N = 4        # number of consistent readings to confirm status change (anti-flicker)
 
+# Integer status encoding (1 byte in arrays, shared small ints in objects)
+FREE, OCCUPIED = 0, 1
+STATUS_NAMES = ("FREE", "OCCUPIED")
+UNPUBLISHED = -1      # spot never published yet
+
 # Ultrasonic-like distance simulation ranges
 DIST_FREE = (150, 280)  # cm when no car (sensor sees the floor)
 DIST_PARK = (10, 35)    # cm when car is present (sensor sees the car)
 NOISE_CM = 2.0          # small noise to imitate real sensor variation
 
+# Batch topic: all spot changes of one tick in a single message (optional, see --publish)
+BATCH_TOPIC = "smart_parking_2026/parking/spots/batch"
+
 # Entry/Exit sensors topics (gate sensors, not parking spots)
 ENTRY_TOPIC = "smart_parking_2026/parking/entry_sensor/status"
 EXIT_TOPIC  = "smart_parking_2026/parking/exit_sensor/status"
@@ -34,19 +47,42 @@ ENTRY_EXIT_FREE_SECONDS = (4.0, 12.0)     # time between triggers (demo-friendly
 def now():
     return datetime.now().isoformat(timespec="seconds")
 
+def make_spot_ids(zones=("A",), levels: int = 1, per_zone: int = 20):
+    """
+    Builds the spot space of a site.
+    - 1 level : A01..A20 (same ids as SPOTS)
+    - N levels : L1-A01.., L2-A01.. (level prefix, zone letter, number)
+    """
+    width = max(2, len(str(per_zone)))
+    ids = []
+    for level in range(1, levels + 1):
+        prefix = "" if levels == 1 else f"L{level}-"
+        for zone in zones:
+            ids.extend(f"{prefix}{zone}{n:0{width}d}" for n in range(1, per_zone + 1))
+    return ids
+
 # =========================
 # Part B — Parking Spot Sensor Simulation
 # =========================
 class Spot:
+    # No per-instance __dict__: ~1/3 less memory per spot, ~230 -> ~150 bytes (see bench_memory.py)
+    __slots__ = ("spot_id", "has_car", "activity", "next_switch",
+                 "status_code", "occ_count", "free_count", "published_code")
+
     def __init__(self, spot_id: str):
-        self.spot_id = spot_id
+        self.spot_id = sys.intern(spot_id)  # one shared string per id
         self.has_car = False  # internally the spot starts empty
         self.activity = random.uniform(0.6, 1.6)  # higher = changes more often
         self.next_switch = time.time() + self._free_duration()  # when car arrives/leaves next
 
-        self.stable_status = "FREE"  # the final stable status (after debounce)
+        self.status_code = FREE  # the final stable status (after debounce)
         self.occ_count = 0
         self.free_count = 0
+        self.published_code = UNPUBLISHED  # last status sent on MQTT
+
+    @property
+    def stable_status(self) -> str:
+        return STATUS_NAMES[self.status_code]
 
     def _park_duration(self):
         base = random.uniform(45, 180)  # seconds parked
@@ -88,17 +124,17 @@ class Spot:
             self.occ_count = 0
 
         # Switch only if enough confirmations
-        if self.stable_status != "OCCUPIED" and self.occ_count >= DEBOUNCE_N:
-            self.stable_status = "OCCUPIED"
+        if self.status_code != OCCUPIED and self.occ_count >= DEBOUNCE_N:
+            self.status_code = OCCUPIED
             self.occ_count = 0
             self.free_count = 0
 
-        elif self.stable_status != "FREE" and self.free_count >= DEBOUNCE_N:
-            self.stable_status = "FREE"
+        elif self.status_code != FREE and self.free_count >= DEBOUNCE_N:
+            self.status_code = FREE
             self.occ_count = 0
             self.free_count = 0
 
-        return self.stable_status
+        return STATUS_NAMES[self.status_code]
 
 # =========================
 # Part B.2 — Gate Sensor (ENTRY / EXIT)
@@ -110,6 +146,8 @@ class GateSensor:
     - Become OCCUPIED briefly when a car passes
     - Return to FREE automatically
     """
+    __slots__ = ("name", "topic", "state", "next_toggle")
+
     def __init__(self, name: str, topic: str):
         self.name = name
         self.topic = topic
@@ -132,74 +170,170 @@ class GateSensor:
 # =========================
 # Part C — Main loop : publish to MQTT only on change
 # =========================
-def main():
-    # 1) Connect to MQTT broker
-    client = mqtt.Client(
-        mqtt.CallbackAPIVersion.VERSION2,
-        client_id="SmartPark2026_P1"
-    )
-    client.connect(BROKER_HOST, BROKER_PORT, 60)
-    client.loop_start()
-
-    # 2) Create sensors
-    spots = [Spot(s) for s in SPOTS]
-
-    # KeyError-proof: build dict from actual spot objects
-    last_published_spots = {sp.spot_id: None for sp in spots}
-
-    entry_sensor = GateSensor("ENTRY", ENTRY_TOPIC)
-    exit_sensor  = GateSensor("EXIT", EXIT_TOPIC)
-    last_entry_state = None
-    last_exit_state = None
-
-    print("20 spots (A01..A20) + ENTRY/EXIT sensors started. Publishing only on change...")
+def publish_spot(client, spot_id: str, status: str, distance_cm: float):
+    topic = f"smart_parking_2026/parking/spots/{spot_id}/status"
+    payload = {
+        "id": spot_id,
+        "status": status,
+        "distance_cm": round(float(distance_cm), 1),
+        "threshold_cm": THRESHOLD_CM,
+        "debounce_n": DEBOUNCE_N,
+        "ts": now()
+    }
+    client.publish(topic, codec.dumps(payload), qos=1, retain=True)
+    if LOG_PUBLISHES:
+        print(f"{payload['ts']} | {spot_id} => {status} (distance={payload['distance_cm']}cm)")
+
+def publish_spot_batch(client, changes):
+    """
+    One compact message for all spot changes of a tick:
+    {"ts": ..., "threshold_cm": 50.0, "debounce_n": 4, "spots": [["A01", "OCCUPIED", 19.8], ...]}
+    threshold_cm / debounce_n are sent once instead of once per spot.
+    """
+    payload = {
+        "ts": now(),
+        "threshold_cm": THRESHOLD_CM,
+        "debounce_n": DEBOUNCE_N,
+        "spots": [[spot_id, status, round(float(d), 1)] for spot_id, status, d in changes]
+    }
+    client.publish(BATCH_TOPIC, codec.dumps(payload), qos=1)  # compact JSON
+    if LOG_PUBLISHES:
+        print(f"{payload['ts']} | BATCH => {len(changes)} spot(s)")
+
+def publish_gate(client, gate, state: str):
+    payload = {"status": state, "ts": now()}
+    client.publish(gate.topic, codec.dumps(payload), qos=1, retain=True)
+    if LOG_PUBLISHES:
+        print(f"{payload['ts']} | {gate.name}_SENSOR => {state}")
+
+def run_sensors(client, spot_ids, engine: str = "events", with_gates: bool = True, on_publish=None,
+                publish_mode: str = "spot", stop=None):
+    """
+    Simulates spot_ids (+ ENTRY/EXIT sensors) and publishes every change on client.
+    Runs until KeyboardInterrupt, or until the stop threading.Event is set.
+    on_publish(n) is called after each tick with the number of messages
+    published during that tick.
+    publish_mode: "spot" = one message per spot topic, "batch" = one BATCH_TOPIC
+    message per tick, "both" = both forms (mixed consumers).
+    """
+    if engine == "fleet":
+        # Array-backed engine (p1_sensor/fleet_engine.py), needs numpy
+        from fleet_engine import SpotFleet
+        fleet = SpotFleet(spot_ids)
+        spots = []
+    else:
+        fleet = None
+        spots = [Spot(s) for s in spot_ids]
+
+    gates = [GateSensor("ENTRY", ENTRY_TOPIC), GateSensor("EXIT", EXIT_TOPIC)] if with_gates else []
+    last_gate_states = {g.name: None for g in gates}
+
+    # Heap scheduler (p1_sensor/event_scheduler.py): only due sensors are read
+    scheduler = None
+    if engine == "events":
+        from event_scheduler import EventScheduler
+        scheduler = EventScheduler(spots, gates)
+
+    while stop is None or not stop.is_set():
+        published = 0
+        changes = []  # (spot_id, status, distance_cm) changed during this tick
+
+        if scheduler is not None:
+            for sensor, status, d in scheduler.tick():
+                if isinstance(sensor, GateSensor):
+                    if status != last_gate_states[sensor.name]:
+                        last_gate_states[sensor.name] = status
+                        publish_gate(client, sensor, status)
+                        published += 1
+                elif sensor.status_code != sensor.published_code:
+                    sensor.published_code = sensor.status_code
+                    changes.append((sensor.spot_id, status, d))
 
-    try:
-        while True:
+        else:
             # ---- Parking spots ----
+            if fleet is not None:
+                # Only the indices that changed since the last publish
+                for i in fleet.step():
+                    changes.append((fleet.spot_ids[i], fleet.status(i), fleet.distance[i]))
+
             for sp in spots:
                 d = sp.read_distance()
                 status = sp.update_debounced_status(d)
 
-                # KeyError-proof access with .get()
-                if status != last_published_spots.get(sp.spot_id):
-                    last_published_spots[sp.spot_id] = status
-
-                    topic = f"smart_parking_2026/parking/spots/{sp.spot_id}/status"
-                    payload = {
-                        "id": sp.spot_id,
-                        "status": status,
-                        "distance_cm": round(d, 1),
-                        "threshold_cm": THRESHOLD_CM,
-                        "debounce_n": DEBOUNCE_N,
-                        "ts": now()
-                    }
-                    client.publish(topic, json.dumps(payload), qos=1, retain=True)
-                    print(f"{payload['ts']} | {sp.spot_id} => {status} (distance={payload['distance_cm']}cm)")
-
-            # ---- Entry sensor ----
-            entry_state = entry_sensor.step()
-            if entry_state != last_entry_state:
-                last_entry_state = entry_state
-                payload = {"status": entry_state, "ts": now()}
-                client.publish(ENTRY_TOPIC, json.dumps(payload), qos=1, retain=True)
-                print(f"{payload['ts']} | ENTRY_SENSOR => {entry_state}")
-
-            # ---- Exit sensor ----
-            exit_state = exit_sensor.step()
-            if exit_state != last_exit_state:
-                last_exit_state = exit_state
-                payload = {"status": exit_state, "ts": now()}
-                client.publish(EXIT_TOPIC, json.dumps(payload), qos=1, retain=True)
-                print(f"{payload['ts']} | EXIT_SENSOR => {exit_state}")
-
-            time.sleep(READ_INTERVAL_S)
+                # last published status lives on the spot itself (no id -> status dict)
+                if sp.status_code != sp.published_code:
+                    sp.published_code = sp.status_code
+                    changes.append((sp.spot_id, status, d))
+
+            # ---- Entry / Exit sensors ----
+            for g in gates:
+                state = g.step()
+                if state != last_gate_states[g.name]:
+                    last_gate_states[g.name] = state
+                    publish_gate(client, g, state)
+                    published += 1
+
+        # ---- Publish spot changes of this tick ----
+        if changes:
+            if publish_mode in ("spot", "both"):
+                for spot_id, status, d in changes:
+                    publish_spot(client, spot_id, status, d)
+                published += len(changes)
+            if publish_mode in ("batch", "both"):
+                publish_spot_batch(client, changes)
+                published += 1
+
+        if on_publish is not None:
+            on_publish(published)
+
+        time.sleep(READ_INTERVAL_S)
+
+def main(engine: str = "events", spot_ids=None, publish_mode: str = "spot", record_path=None):
+    spot_ids = SPOTS if spot_ids is None else spot_ids
 
+    # 1) Connect to MQTT broker
+    client = make_client(CLIENT_ID)
+    connect_with_backoff(client, BROKER_HOST, BROKER_PORT, 60)
+    client.loop_start()
+
+    # Optional: append every published message to a replayable log (p1_sensor/traffic_log.py)
+    recorder = None
+    publisher = client
+    if record_path:
+        from traffic_log import TrafficRecorder, RecordingClient
+        recorder = TrafficRecorder(record_path)
+        publisher = RecordingClient(client, recorder)
+
+    print(f"{len(spot_ids)} spots ({spot_ids[0]}..{spot_ids[-1]}) + ENTRY/EXIT sensors started. Publishing only on change...")
+
+    # 2) Simulate sensors and publish on change
+    try:
+        run_sensors(publisher, spot_ids, engine, publish_mode=publish_mode)
     except KeyboardInterrupt:
         print("Stopping...")
     finally:
         client.loop_stop()
         client.disconnect()
+        if recorder is not None:
+            recorder.close()
+
+def add_spot_space_args(parser):
+    parser.add_argument("--zones", nargs="+", default=["A"], help="Zone letters, e.g. A B C")
+    parser.add_argument("--levels", type=int, default=1, help="Number of levels per site")
+    parser.add_argument("--per-zone", type=int, default=20, help="Spots per zone and per level")
+
+def add_publish_args(parser):
+    parser.add_argument("--publish", choices=["spot", "batch", "both"], default="spot",
+                        help="spot = per-spot topics, batch = one parking/spots/batch message per tick")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", choices=["events", "objects", "fleet"], default="events",
+                        help="events = heap scheduler (only due spots), objects = poll every Spot, "
+                             "fleet = NumPy arrays (large fleets)")
+    add_spot_space_args(parser)
+    add_publish_args(parser)
+    parser.add_argument("--record", metavar="LOG", help="Also append every published message to LOG (replayable)")
+    args = parser.parse_args()
+    main(engine=args.engine, spot_ids=make_spot_ids(args.zones, args.levels, args.per_zone),
+         publish_mode=args.publish, record_path=args.record)
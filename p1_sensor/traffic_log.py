@@ -0,0 +1,162 @@
+"""
+Record & replay of sensor traffic (spots + ENTRY/EXIT).
+
+Log format : one line per published message, append-only, tab-separated
+    <unix_ts>\t<qos><retain>\t<topic>\t<payload JSON>
+e.g.
+    1769711130.412\t11\tsmart_parking_2026/parking/spots/A06/status\t{"id": "A06", ...}
+
+Usage :
+    # record what P1 publishes (subscriber on the broker)
+    python p1_sensor/traffic_log.py record traffic.log
+
+    # or record directly at the source
+    python p1_sensor/sensor_p1.py --record traffic.log
+
+    # replay at 10x, or as fast as possible (--speed 0)
+    python p1_sensor/traffic_log.py replay traffic.log --speed 10
+"""
+import argparse
+import time
+
+from sensor_p1 import BROKER_HOST, BROKER_PORT, BATCH_TOPIC, ENTRY_TOPIC, EXIT_TOPIC
+from smartpark_mqtt import connect_with_backoff, make_client  # repo root is on sys.path (see sensor_p1)
+
+RECORD_TOPICS = [
+    "smart_parking_2026/parking/spots/+/status",
+    BATCH_TOPIC,
+    ENTRY_TOPIC,
+    EXIT_TOPIC,
+]
+REPORT_EVERY = 1000  # replay progress line every N messages
+
+
+# =========================
+# Recording
+# =========================
+class TrafficRecorder:
+    def __init__(self, path: str):
+        # line buffered: every event hits the file as soon as it is written
+        self.f = open(path, "a", encoding="utf-8", buffering=1)
+        self.count = 0
+
+    def log(self, topic: str, payload, qos: int = 0, retain: bool = False, ts: float | None = None):
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode("utf-8", errors="replace")
+        ts = time.time() if ts is None else ts
+        self.f.write(f"{ts:.3f}\t{qos}{int(bool(retain))}\t{topic}\t{payload}\n")
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+
+class RecordingClient:
+    """Wraps a paho client: every publish() is also appended to the log."""
+    def __init__(self, client, recorder: TrafficRecorder):
+        self._client = client
+        self.recorder = recorder
+
+    def publish(self, topic, payload=None, qos=0, retain=False, **kwargs):
+        self.recorder.log(topic, payload, qos, retain)
+        return self._client.publish(topic, payload, qos=qos, retain=retain, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def record(path: str):
+    recorder = TrafficRecorder(path)
+
+    def on_connect(client, userdata, flags, reason_code, properties=None):
+        for t in RECORD_TOPICS:
+            client.subscribe(t, qos=1)
+        print(f"Recording {len(RECORD_TOPICS)} topics -> {path}")
+
+    def on_message(client, userdata, msg):
+        recorder.log(msg.topic, msg.payload, msg.qos, msg.retain)
+
+    client = make_client("SmartPark2026_P1_REC")
+    client.on_connect = on_connect
+    client.on_message = on_message
+    connect_with_backoff(client, BROKER_HOST, BROKER_PORT, 60)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print(f"Stopping... {recorder.count} events recorded.")
+    finally:
+        client.disconnect()
+        recorder.close()
+
+
+# =========================
+# Replay
+# =========================
+def read_log(path: str):
+    """Yields (ts, topic, payload, qos, retain) for every valid line of the log."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t", 3)
+            if len(parts) != 4 or len(parts[1]) != 2:
+                continue  # truncated last line (recorder killed mid-write)
+            ts, flags, topic, payload = parts
+            yield float(ts), topic, payload, int(flags[0]), flags[1] == "1"
+
+
+def replay(client, path: str, speed: float = 1.0):
+    """
+    Re-publishes the log on client, keeping the recorded gaps divided by speed
+    (speed <= 0 : as fast as possible). Returns (messages, seconds, msg/s achieved).
+    """
+    start = time.perf_counter()
+    t0 = None
+    sent = 0
+    for ts, topic, payload, qos, retain in read_log(path):
+        if t0 is None:
+            t0 = ts
+        if speed > 0:
+            delay = (ts - t0) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        client.publish(topic, payload, qos=qos, retain=retain)
+        sent += 1
+        if sent % REPORT_EVERY == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{sent} msgs | {sent / elapsed:.1f} msg/s")
+
+    elapsed = time.perf_counter() - start
+    return sent, elapsed, (sent / elapsed if elapsed > 0 else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_rec = sub.add_parser("record", help="Subscribe to P1 topics and append them to a log")
+    p_rec.add_argument("log")
+
+    p_rep = sub.add_parser("replay", help="Re-publish a log")
+    p_rep.add_argument("log")
+    p_rep.add_argument("--speed", type=float, default=1.0, help="1 = real time, 10 = 10x, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        record(args.log)
+        return
+
+    client = make_client("SmartPark2026_P1_REPLAY")
+    connect_with_backoff(client, BROKER_HOST, BROKER_PORT, 60)
+    client.loop_start()
+    try:
+        sent, elapsed, rate = replay(client, args.log, args.speed)
+        print(f"Replayed {sent} msgs in {elapsed:.2f}s -> {rate:.1f} msg/s (speed={args.speed}x)")
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
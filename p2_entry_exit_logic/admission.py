@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import deque
+
+
+class AdmissionControl:
+    """
+    Local, authoritative entry decisions for P2.
+
+    - Occupancy is counted from parking/spots/+/status (real transitions only),
+      no P1 -> P4 -> broker -> P2 round trip before a decision.
+    - admit() reserves an in-flight token: a car let in counts as occupying a
+      spot until it parks (next FREE -> OCCUPIED transition releases the oldest
+      token) or its token expires (token_timeout_s, e.g. the car left again).
+    - free = capacity - occupied - in-flight tokens; every operation is O(1)
+      (amortized for the expiry of old tokens).
+    """
+
+    def __init__(self, total_spots: int, token_timeout_s: float = 120.0):
+        self.total_spots = total_spots          # capacity floor before every spot has reported
+        self.token_timeout_s = token_timeout_s
+        self.status = {}                        # spot id -> "FREE" / "OCCUPIED"
+        self.occupied = 0
+        self._tokens = deque()                  # expiry times, oldest first
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "denied": 0, "parked": 0, "expired": 0}
+
+    @property
+    def capacity(self) -> int:
+        return max(self.total_spots, len(self.status))
+
+    def _expire(self, now: float):
+        while self._tokens and self._tokens[0] <= now:
+            self._tokens.popleft()
+            self.stats["expired"] += 1
+
+    def _free(self) -> int:
+        return self.capacity - self.occupied - len(self._tokens)
+
+    def spot_status(self, spot_id: str, status: str) -> bool:
+        """Applies a spot status; True on a real transition."""
+        if status not in ("FREE", "OCCUPIED"):
+            return False
+        with self._lock:
+            prev = self.status.get(spot_id)
+            if prev == status:
+                return False
+            self.status[spot_id] = status
+            if status == "OCCUPIED":
+                self.occupied += 1
+                self._expire(time.monotonic())
+                if self._tokens:
+                    self._tokens.popleft()  # an admitted car has parked
+                    self.stats["parked"] += 1
+            elif prev == "OCCUPIED":
+                self.occupied -= 1
+            return True
+
+    def admit(self) -> bool:
+        """Entry request: reserves a spot if one is free (local O(1) check)."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if self._free() <= 0:
+                self.stats["denied"] += 1
+                return False
+            self._tokens.append(now + self.token_timeout_s)
+            self.stats["admitted"] += 1
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"capacity": self.capacity, "occupied": self.occupied,
+                    "in_flight": len(self._tokens), "free": self._free(), **self.stats}
@@ -0,0 +1,92 @@
+"""
+Rush hour on many gates: P2 decisions/s and queue time per gate (loopback broker, in-process).
+
+--gates gates (half entry, half exit) each see --cars vehicles back-to-back
+on parking/gates/{gate}/sensor. --decision-ms simulates the cost of one
+decision (e.g. a plate check); the run is repeated for each --workers value:
+1 worker = every gate handled one after another, as the old on_message did.
+
+Usage :
+    python bench_gates.py
+    python bench_gates.py --gates 16 --cars 200 --decision-ms 2 --workers 1 4 16
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+os.environ["SMARTPARK_TRANSPORT"] = "loopback"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import person2_entry_exit_logic as p2
+from smartpark_mqtt import make_client
+
+
+def run(n_gates: int, cars: int, workers: int, decision_ms: float) -> dict:
+    p2.GATE_WORKERS = workers
+    p2.LOG_DECISIONS = False
+    p2.admission = p2.AdmissionControl(n_gates * cars, p2.TOKEN_TIMEOUT_S)  # never full
+
+    decide = p2.decide
+    if decision_ms > 0:
+        def decide(gate, _decide=p2.decide):
+            time.sleep(decision_ms / 1000)
+            return _decide(gate)
+
+    client = make_client(f"{p2.CLIENT_ID}_BENCH_{workers}")
+    client.on_connect = p2.on_connect
+    client.on_message = p2.on_message
+    p2.start_workers(client)
+    p2.gates.decide = decide
+    client.connect("loopback", 0, 60)
+    client.loop_start()
+
+    source = make_client("SmartPark2026_GATES")
+    source.connect("loopback", 0, 60)
+    gate_ids = [f"{'entry' if i % 2 == 0 else 'exit'}_{i // 2 + 1}" for i in range(n_gates)]
+
+    start = time.perf_counter()
+    for _ in range(cars):
+        for gate_id in gate_ids:
+            topic = f"{p2.PREFIX}parking/gates/{gate_id}/sensor"
+            source.publish(topic, json.dumps({"status": "OCCUPIED"}), qos=1)
+            source.publish(topic, json.dumps({"status": "FREE"}), qos=1)
+
+    expected = n_gates * cars
+    while sum(g.decisions for g in p2.gates.gates.values()) < expected and time.perf_counter() - start < 120:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    m = p2.gates.metrics()
+
+    client.loop_stop()
+    client.disconnect()
+    p2.stop_workers()
+    return {"elapsed": elapsed, "decisions": sum(g["decisions"] for g in m["gates"].values()),
+            "queue_ms_avg": max(g["queue_ms_avg"] for g in m["gates"].values()),
+            "queue_ms_max": max(g["queue_ms_max"] for g in m["gates"].values())}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gates", type=int, default=8)
+    parser.add_argument("--cars", type=int, default=100, help="vehicles per gate")
+    parser.add_argument("--decision-ms", type=float, default=1.0, help="simulated cost of one decision")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{args.gates} gates x {args.cars} cars | decision {args.decision_ms}ms")
+    print(f"{'workers':>8} | {'decisions/s':>12} | {'queue avg (worst gate)':>23} | {'queue max':>10}")
+    for workers in args.workers:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):  # modules' own prints
+            r = run(args.gates, args.cars, workers, args.decision_ms)
+        print(f"{workers:>8} | {r['decisions'] / r['elapsed']:>12.0f} | "
+              f"{r['queue_ms_avg']:>20.1f} ms | {r['queue_ms_max']:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+
+# Gate phases (one state machine per gate)
+#   IDLE --sensor OCCUPIED--> QUEUED --decision--> OPENING (OPEN sent) | DENIED
+#   OPENING / OPENED / CLOSING follow parking/barriers/{gate}/state, CLOSED -> IDLE
+#   DENIED --sensor FREE (car went away)--> IDLE
+PHASES = ("IDLE", "QUEUED", "OPENING", "OPENED", "CLOSING", "DENIED")
+BARRIER_PHASES = ("OPENING", "OPENED", "CLOSING")
+
+
+def gate_direction(gate_id: str, payload: dict) -> str:
+    """ "entry" / "exit": payload "direction" first, else the gate id (entry_3, exit-north, in2, out1)."""
+    direction = str(payload.get("direction") or "").lower()
+    if direction in ("entry", "exit"):
+        return direction
+    gid = gate_id.lower()
+    return "exit" if gid.startswith(("exit", "out")) else "entry"
+
+
+class Gate:
+    __slots__ = ("gate_id", "direction", "phase", "sensor", "decisions", "admitted", "denied",
+                 "duplicates", "queue_wait_sum", "queue_wait_max", "last_decisions", "lock")
+
+    def __init__(self, gate_id: str, direction: str):
+        self.gate_id = gate_id
+        self.direction = direction
+        self.phase = "IDLE"
+        self.sensor = "FREE"
+        self.decisions = 0
+        self.admitted = 0
+        self.denied = 0
+        self.duplicates = 0        # OCCUPIED repeated without FREE in between (retained / replayed)
+        self.queue_wait_sum = 0.0  # seconds between the sensor event and its decision
+        self.queue_wait_max = 0.0
+        self.last_decisions = 0    # for decisions/s between two metrics() calls
+        self.lock = threading.Lock()
+
+
+class GateController:
+    """
+    Entry/exit decisions for any number of gates, discovered from their topics.
+
+    - on_sensor() runs on the MQTT thread: it only moves the gate state machine
+      and queues the vehicle; it never waits for a decision or a publish.
+    - n_workers decision threads, one queue each; a gate is routed by key
+      (same idea as Backend_API/forward_pool.py): the cars of one gate are
+      handled in order, different gates in parallel.
+    - decide(gate) -> bool takes the decision (admission for entries),
+      open_barrier(gate, detect_ns) publishes the barrier command; detect_ns is
+      the time.monotonic_ns() of the sensor event, for tracing.
+    """
+
+    def __init__(self, decide, open_barrier, n_workers: int = 4, queue_size: int = 1000):
+        self.decide = decide
+        self.open_barrier = open_barrier
+        self.gates = {}
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(n_workers)]
+        self.threads = []
+        self._lock = threading.Lock()
+        self._last_metrics = time.monotonic()
+        self.stats = {"discovered": 0, "dropped": 0}
+
+    def gate(self, gate_id: str, payload: dict = None) -> Gate:
+        """Known gate, or a new one (wildcard discovery)."""
+        g = self.gates.get(gate_id)
+        if g is None:
+            with self._lock:
+                g = self.gates.get(gate_id)
+                if g is None:
+                    g = Gate(gate_id, gate_direction(gate_id, payload or {}))
+                    self.gates[gate_id] = g
+                    self.stats["discovered"] += 1
+                    print(f"🚧 New gate: {gate_id} ({g.direction})")
+        return g
+
+    def start(self):
+        for i, q in enumerate(self.queues):
+            t = threading.Thread(target=self._worker, args=(q,), name=f"gate-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        for q in self.queues:
+            q.put(None)
+        for t in self.threads:
+            t.join(timeout)
+        self.threads = []
+
+    # --- events (MQTT thread) ---
+    def on_sensor(self, gate_id: str, payload: dict) -> bool:
+        """Gate sensor message; True if a vehicle was queued for a decision."""
+        g = self.gate(gate_id, payload)
+        status = payload.get("status")
+        with g.lock:
+            prev, g.sensor = g.sensor, status
+            if status == "FREE":
+                if g.phase == "DENIED":
+                    g.phase = "IDLE"
+                return False
+            if status != "OCCUPIED":
+                return False
+            if prev == "OCCUPIED":
+                g.duplicates += 1
+                return False
+            if g.phase in ("IDLE", "DENIED"):
+                g.phase = "QUEUED"
+
+        q = self.queues[hash(gate_id) % len(self.queues)]
+        try:
+            q.put_nowait((g, time.monotonic_ns()))
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            return False
+        return True
+
+    def on_barrier_state(self, gate_id: str, state: str):
+        g = self.gates.get(gate_id)
+        if g is None:
+            return
+        with g.lock:
+            if state in BARRIER_PHASES:
+                g.phase = state
+            elif state == "CLOSED" and g.phase != "QUEUED":
+                g.phase = "IDLE"
+
+    # --- decisions (worker threads) ---
+    def _worker(self, q: queue.Queue):
+        while True:
+            job = q.get()
+            if job is None:
+                break
+            g, detect_ns = job
+            wait = (time.monotonic_ns() - detect_ns) / 1e9
+            try:
+                admitted = self.decide(g)
+                if admitted:
+                    self.open_barrier(g, detect_ns)
+            except Exception as e:
+                print(f"⚠️ Gate {g.gate_id}: {e}")
+                admitted = False
+            with g.lock:
+                g.decisions += 1
+                g.queue_wait_sum += wait
+                g.queue_wait_max = max(g.queue_wait_max, wait)
+                if admitted:
+                    g.admitted += 1
+                    if g.phase in ("QUEUED", "IDLE"):
+                        g.phase = "OPENING"
+                else:
+                    g.denied += 1
+                    if g.phase == "QUEUED":
+                        g.phase = "DENIED"
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    def metrics(self) -> dict:
+        """Per-gate decisions/s (since the previous call) and queue time."""
+        now = time.monotonic()
+        elapsed = max(now - self._last_metrics, 1e-9)
+        self._last_metrics = now
+        with self._lock:  # gate() inserts from the MQTT thread
+            known = sorted(self.gates.items())
+        gates = {}
+        for gate_id, g in known:
+            with g.lock:
+                rate = (g.decisions - g.last_decisions) / elapsed
+                g.last_decisions = g.decisions
+                gates[gate_id] = {
+                    "direction": g.direction, "phase": g.phase,
+                    "decisions": g.decisions, "admitted": g.admitted, "denied": g.denied,
+                    "duplicates": g.duplicates, "decisions_per_s": round(rate, 2),
+                    "queue_ms_avg": round(1000 * g.queue_wait_sum / g.decisions, 3) if g.decisions else 0.0,
+                    "queue_ms_max": round(1000 * g.queue_wait_max, 3),
+                }
+        return {"gates": gates, "depth": self.depth(), "workers": len(self.queues), **self.stats, "ts": time.time()}
@@ -1,11 +1,18 @@
 """
 Smart Parking IoT 2026 - Person 2: Entry/Exit Logic
 """
-import paho.mqtt.client as mqtt
-import json
+import os
+import sys
+import threading
 import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+from smartpark_mqtt.tracing import CLOCK_ID, new_cid, now_ns, wall_ns
+from admission import AdmissionControl
+from gates import GateController
+
 # Configuration
 CLIENT_ID = "SmartPark2026_P2"
 BROKER = "broker.emqx.io"
@@ -13,12 +20,75 @@ PORT = 1883
 PREFIX = "smart_parking_2026/"
 
 # Topics for entry/exit sensors (from Person 1)
-ENTRY_TOPIC = PREFIX + "parking/entry_sensor/status"
-EXIT_TOPIC = PREFIX + "parking/exit_sensor/status"
+ENTRY_TOPIC = PREFIX + "parking/entry_sensor/status"   # legacy single gate -> gate "entry"
+EXIT_TOPIC = PREFIX + "parking/exit_sensor/status"     # legacy single gate -> gate "exit"
+
+# Any number of gates: parking/gates/{gate}/sensor -> parking/barriers/{gate}/cmd
+GATES_SENSOR_TOPIC = PREFIX + "parking/gates/{gate}/sensor"
+BARRIER_STATE_TOPIC = PREFIX + "parking/barriers/{gate}/state"
+BARRIER_CMD_TOPIC = PREFIX + "parking/barriers/{gate}/cmd"
+METRICS_TOPIC = PREFIX + "parking/monitoring/p2"
+
+# P1 spots (batch mode: every change of a tick in one message)
+SPOT_STATUS_TOPIC = PREFIX + "parking/spots/{spot_id}/status"
+SPOTS_BATCH_TOPIC = PREFIX + "parking/spots/batch"
+
+# P4 available spots count (display / cross-check only)
+AVAILABLE_TOPIC = PREFIX + "parking/display/available"
 
 # Global variables
-available_spots = 0
+available_spots = 0      # last value published by P4 (display only, not used to decide)
 total_spots = 20
+TOKEN_TIMEOUT_S = 120.0  # an admitted car that has not parked after this frees its reservation
+GATE_WORKERS = 4         # decision threads, gates are spread over them (one gate = one thread)
+METRICS_INTERVAL_S = 10.0
+LOG_DECISIONS = True     # one print per decision (off for benchmarks)
+
+# Entry decisions are taken locally from our own spot counter + in-flight tokens
+admission = AdmissionControl(total_spots, TOKEN_TIMEOUT_S)
+gates = None             # GateController, created by start_workers()
+_metrics_stop = threading.Event()
+
+# Topic -> handler table (smartpark_mqtt/router.py), payloads decoded only when read
+router = Router()
+
+@router.route(AVAILABLE_TOPIC)
+def on_available(client, msg):
+    global available_spots
+    available_spots = msg.get("count", 0)
+
+# Gate sensors: only queued here, decided on the gate's worker thread
+@router.route(ENTRY_TOPIC)
+def on_entry_sensor(client, msg):
+    gates.on_sensor("entry", msg.json)
+
+@router.route(EXIT_TOPIC)
+def on_exit_sensor(client, msg):
+    gates.on_sensor("exit", msg.json)
+
+@router.route(GATES_SENSOR_TOPIC)
+def on_gate_sensor(client, msg):
+    gates.on_sensor(msg.params["gate"], msg.json)
+
+@router.route(BARRIER_STATE_TOPIC)
+def on_barrier_state(client, msg):
+    gates.on_barrier_state(msg.params["gate"], msg.get("state"))
+
+# Parking spot updates (local occupancy counter)
+@router.route(SPOTS_BATCH_TOPIC)
+def on_spots_batch(client, msg):
+    for item in msg.get("spots") or []:
+        if isinstance(item, list) and len(item) >= 2:
+            admission.spot_status(item[0], item[1])
+
+@router.route(SPOT_STATUS_TOPIC)
+def on_spot_status(client, msg):
+    payload = msg.json
+    spot_id = payload.get("id")
+    status = payload.get("status")
+    if LOG_DECISIONS:
+        print(f"Spot {spot_id}: {status} (distance={payload.get('distance_cm')}cm) at {payload.get('ts')}")
+    admission.spot_status(spot_id or msg.params["spot_id"], status)
 
 def on_connect(client, userdata, flags, reason_code, properties):
     """Callback API v2 - updated signature"""
@@ -28,111 +98,71 @@ def on_connect(client, userdata, flags, reason_code, properties):
         print(f"Client ID: {CLIENT_ID}")
         print("=" * 60)
         
-        # Subscribe to parking spot status updates
-        client.subscribe(PREFIX + "parking/spots/+/status")
-        
-        # Subscribe to available spots count
-        client.subscribe(PREFIX + "parking/display/available")
-        
-        # Subscribe to entry/exit sensors
-        client.subscribe(ENTRY_TOPIC)
-        client.subscribe(EXIT_TOPIC)
-        
-        # Subscribe to barrier states (optional, for monitoring)
-        client.subscribe(PREFIX + "parking/barriers/entry/state")
-        client.subscribe(PREFIX + "parking/barriers/exit/state")
+        # Every route of the table (again after each reconnection)
+        router.subscribe_all(client)
         
         print("Person 2 - Entry/Exit Logic ACTIVE!")
         print("Waiting for events...\n")
     else:
         print(f"Connection failed with reason code: {reason_code}")
 
-def on_message(client, userdata, msg):
-    global available_spots
-    
-    try:
-        topic = msg.topic
-        payload = json.loads(msg.payload.decode())
-        
-        print(f"\nReceived: {topic}")
-        print(f"Data: {payload}")
-        
-        # Update available spots count
-        if "display/available" in topic:
-            available_spots = payload.get("count", 0)
-            print(f"Available: {available_spots} spots")
-        
-        # Handle entry sensor
-        elif topic == ENTRY_TOPIC:
-            status = payload.get("status")
-            ts = payload.get("ts")
-            
-            if status == "OCCUPIED":
-                print(f"Vehicle detected at ENTRY at {ts}")
-                handle_entry_request(client)
-        
-        # Handle exit sensor
-        elif topic == EXIT_TOPIC:
-            status = payload.get("status")
-            ts = payload.get("ts")
-            
-            if status == "OCCUPIED":
-                print(f"Vehicle detected at EXIT at {ts}")
-                handle_exit_request(client)
-        
-        # Handle parking spot updates (for counting)
-        elif "spots/" in topic and "/status" in topic:
-            spot_id = payload.get("id")
-            status = payload.get("status")
-            distance_cm = payload.get("distance_cm")
-            ts = payload.get("ts")
-            
-            print(f"Spot {spot_id}: {status} (distance={distance_cm}cm) at {ts}")
-    
-    except Exception as e:
-        print(f"Error processing message: {e}")
+on_message = router.on_message
 
-def handle_entry_request(client):
-    global available_spots
-    
-    print("\n" + "=" * 60)
-    print("ENTRY REQUEST")
-    print("=" * 60)
-    print(f"Available spots: {available_spots}/{total_spots}")
-    
-    if available_spots > 0:
-        print("✓ Opening ENTRY barrier")
-        open_entry_barrier(client)
-    else:
-        print("✗ PARKING FULL - Barrier stays CLOSED")
+def decide(gate) -> bool:
+    """Runs on the gate's worker thread: True = open the barrier."""
+    if gate.direction == "exit":
+        if LOG_DECISIONS:
+            print(f"[{gate.gate_id}] EXIT request -> ✓ opening")
+        return True
     
-    print("=" * 60)
+    # Local O(1) decision: reserves a token for the car if a spot is free
+    admitted = admission.admit()
+    if LOG_DECISIONS:
+        s = admission.snapshot()
+        if admitted:
+            print(f"[{gate.gate_id}] ENTRY request -> ✓ opening | free {s['free']}/{s['capacity']} "
+                  f"(in flight: {s['in_flight']}, P4 shows {available_spots})")
+        else:
+            print(f"[{gate.gate_id}] ENTRY request -> ✗ PARKING FULL | occupied {s['occupied']}/{s['capacity']} "
+                  f"(in flight: {s['in_flight']})")
+    return admitted
 
-def handle_exit_request(client):
-    print("\n" + "=" * 60)
-    print("EXIT REQUEST")
-    print("=" * 60)
-    print("✓ Opening EXIT barrier")
-    open_exit_barrier(client)
-    print("=" * 60)
+def make_open_barrier(client):
+    def open_barrier(gate, detect_ns):
+        topic = BARRIER_CMD_TOPIC.format(gate=gate.gate_id)
+        # cid + monotonic stamps, echoed by P3 in every state of the sequence
+        command = {
+            "action": "OPEN",
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "cid": new_cid(gate.gate_id),
+            "trace": {"clock": CLOCK_ID, "detect_ns": detect_ns, "cmd_ns": now_ns(), "cmd_wall_ns": wall_ns()}
+        }
+        client.publish(topic, codec.dumps(command), qos=1)
+        if LOG_DECISIONS:
+            print(f"Command sent to {topic}: {command}")
+    return open_barrier
+
+def report_metrics(client, stop: threading.Event):
+    while not stop.wait(METRICS_INTERVAL_S):
+        m = gates.metrics()
+        m["admission"] = admission.snapshot()
+        for gate_id, g in m["gates"].items():
+            print(f"📊 gate {gate_id} ({g['direction']}, {g['phase']}) | {g['decisions_per_s']} decisions/s | "
+                  f"queue avg {g['queue_ms_avg']}ms max {g['queue_ms_max']}ms | denied={g['denied']}")
+        client.publish(METRICS_TOPIC, codec.dumps(m))
 
-def open_entry_barrier(client):
-    topic = PREFIX + "parking/barriers/entry/cmd"
-    command = {
-        "action": "OPEN",
-        "ts": datetime.now().isoformat(timespec="seconds")
-    }
-    client.publish(topic, json.dumps(command), qos=1)
-    print(f"Command sent to {topic}: {command}")
-
-def open_exit_barrier(client):
-    topic = PREFIX + "parking/barriers/exit/cmd"
-    command = {
-        "action": "OPEN",
-        "ts": datetime.now().isoformat(timespec="seconds")
-    }
-    client.publish(topic, json.dumps(command), qos=1)
-    print(f"Command sent to {topic}: {command}")
+def start_workers(client):
+    """Gate decision threads + metrics; call before connect() so no sensor event is lost."""
+    global gates
+    gates = GateController(decide, make_open_barrier(client), GATE_WORKERS)
+    gates.start()
+    _metrics_stop.clear()
+    threading.Thread(target=report_metrics, args=(client, _metrics_stop), daemon=True).start()
+
+def stop_workers():
+    _metrics_stop.set()
+    if gates is not None:
+        gates.stop()
 
 def main():
     print("=" * 60)
@@ -140,23 +170,23 @@ def main():
     print("=" * 60)
     
     # Use Callback API v2 (matching Person 1)
-    client = mqtt.Client(
-        mqtt.CallbackAPIVersion.VERSION2,
-        client_id=CLIENT_ID
-    )
+    client = make_client(CLIENT_ID)
     client.on_connect = on_connect
     client.on_message = on_message
+    start_workers(client)
     
     try:
         print(f"Connecting to {BROKER}:{PORT}...")
-        client.connect(BROKER, PORT, 60)
+        connect_with_backoff(client, BROKER, PORT, 60)
         client.loop_forever()
     except KeyboardInterrupt:
         print("\n\nStopping...")
-        client.disconnect()
-        print("Goodbye!")
     except Exception as e:
         print(f"Connection error: {e}")
+    finally:
+        client.disconnect()
+        stop_workers()
+        print("Goodbye!")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
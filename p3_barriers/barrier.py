@@ -1,7 +1,10 @@
-import paho.mqtt.client as mqtt
-import json
-import time
-import threading
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+from smartpark_mqtt.tracing import CLOCK_ID, now_ns, wall_ns
+from barrier_engine import BarrierEngine
 
 # --- CONFIGURATION ---
 BROKER = "broker.emqx.io"
@@ -9,84 +12,90 @@ PORT = 1883
 CLIENT_ID = "SmartPark2026_P3"
 PREFIX = "smart_parking_2026/"
 
-# TOPICS
-# We subscribe to BOTH entry and exit commands using a wildcard '+'
-TOPIC_CMD_WILDCARD = PREFIX + "parking/barriers/+/cmd"
+# TOPICS: parking/barriers/{id}/cmd -> parking/barriers/{id}/state (routes below)
 
 # --- BARRIER SIMULATION ---
-def move_barrier_sequence(client, barrier_type):
-    """
-    Simulates the movement of a specific barrier (ENTRY or EXIT).
-    barrier_type should be "entry" or "exit".
-    """
-    topic_state = f"{PREFIX}parking/barriers/{barrier_type}/state"
-    
-    print(f"\n[🚀 {barrier_type.upper()}] Received OPEN command. Moving barrier...")
+# Movement timings (seconds), see barrier_engine.py for the state machine
+OPENING_S = 2.0
+OPEN_S = 5.0       # window extended by every OPEN received while OPENED
+CLOSING_S = 2.0
+LOG_TRANSITIONS = True
+
+STATE_ICONS = {"OPENING": "⚙️", "OPENED": "✅", "CLOSING": "⚙️", "CLOSED": "⛔"}
+
+# One scheduler thread for every barrier, created on the first connection
+engine = None
 
-    # 1. OPENING
-    client.publish(topic_state, json.dumps({"state": "OPENING"}))
-    print(f"[⚙️ {barrier_type.upper()}] Status: OPENING... (2s)")
-    time.sleep(2)
+def make_publish_state(client):
+    def publish_state(barrier_type, state, trace=None):
+        """barrier_type is the barrier id of the topic ("entry", "exit", "north_in"...)."""
+        topic_state = f"{PREFIX}parking/barriers/{barrier_type}/state"
+        payload = {"state": state}
+        if trace is not None:
+            # Correlation id + stamps of the command driving this sequence
+            payload["cid"] = trace.get("cid")
+            payload["trace"] = trace
+        client.publish(topic_state, codec.dumps(payload))
+        if LOG_TRANSITIONS:
+            print(f"[{STATE_ICONS[state]} {barrier_type.upper()}] Status: {state}")
+    return publish_state
 
-    # 2. OPENED
-    client.publish(topic_state, json.dumps({"state": "OPENED"}))
-    print(f"[✅ {barrier_type.upper()}] Status: OPENED. Waiting for car (5s)...")
-    time.sleep(5)
+def start_engine(client):
+    global engine
+    if engine is None:
+        engine = BarrierEngine(make_publish_state(client), OPENING_S, OPEN_S, CLOSING_S, clock_id=CLOCK_ID)
+        engine.start()
+    return engine
 
-    # 3. CLOSING
-    client.publish(topic_state, json.dumps({"state": "CLOSING"}))
-    print(f"[⚙️ {barrier_type.upper()}] Status: CLOSING... (2s)")
-    time.sleep(2)
+# --- MQTT ROUTES ---
+router = Router(prefix=PREFIX)
 
-    # 4. CLOSED
-    client.publish(topic_state, json.dumps({"state": "CLOSED"}))
-    print(f"[⛔ {barrier_type.upper()}] Status: CLOSED. Ready.")
+@router.route("parking/barriers/{barrier_id}/cmd")
+def on_barrier_cmd(client, msg):
+    # barrier_id: "entry" / "exit" for the single-gate setup, any gate id on larger sites
+    recv_ns = now_ns()
+    barrier_type = msg.params["barrier_id"]
+    payload = msg.json
+
+    # Check for OPEN command
+    if payload.get("action") == "OPEN":
+        # Never blocks: the engine moves the barrier on its timers,
+        # a repeated OPEN extends the sequence already running
+        trace = None
+        if isinstance(payload.get("trace"), dict):
+            trace = dict(payload["trace"], cid=payload.get("cid"),
+                         recv_ns=recv_ns, recv_wall_ns=wall_ns(), recv_clock=CLOCK_ID)
+        result = engine.open(barrier_type, trace)
+        if LOG_TRANSITIONS:
+            print(f"\n[🚀 {barrier_type.upper()}] Received OPEN command ({result})")
 
 # --- MQTT CALLBACKS ---
 def on_connect(client, userdata, flags, reason_code, properties):
     if reason_code == 0:
         print(f"✅ Connected to {BROKER} as {CLIENT_ID}")
-        # Subscribe to ANY barrier command (entry OR exit)
-        client.subscribe(TOPIC_CMD_WILDCARD)
-        print(f"👂 Listening to: {TOPIC_CMD_WILDCARD}")
+        start_engine(client)
+        # Subscribe to ANY barrier command (entry, exit, any gate); again after each reconnection
+        router.subscribe_all(client)
+        print(f"👂 Listening to: {', '.join(router.filters())}")
     else:
         print(f"⚠️ Connection failed: {reason_code}")
 
-def on_message(client, userdata, msg):
-    try:
-        topic = msg.topic
-        payload = json.loads(msg.payload.decode())
-        
-        # Determine if it's ENTRY or EXIT based on the topic string
-        # Topic format: .../parking/barriers/{TYPE}/cmd
-        if "entry/cmd" in topic:
-            barrier_type = "entry"
-        elif "exit/cmd" in topic:
-            barrier_type = "exit"
-        else:
-            return # Unknown topic
-
-        # Check for OPEN command
-        if payload.get("action") == "OPEN":
-            # Run in a thread so we don't block the other barrier!
-            t = threading.Thread(target=move_barrier_sequence, args=(client, barrier_type))
-            t.start()
-            
-    except Exception as e:
-        print(f"Error: {e}")
+on_message = router.on_message
 
 # --- MAIN ---
 if __name__ == "__main__":
-    # VERSION 2 FIX included here
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, CLIENT_ID)
+    # Callback API v2 (paho) or in-memory loopback, see smartpark_mqtt/transport.py
+    client = make_client(CLIENT_ID)
     client.on_connect = on_connect
     client.on_message = on_message
 
     print("🔌 Connecting to broker...")
-    client.connect(BROKER, PORT, 60)
+    connect_with_backoff(client, BROKER, PORT, 60)
     
     try:
         client.loop_forever()
     except KeyboardInterrupt:
         print("\nStopping Barrier Module.")
-        client.disconnect()
\ No newline at end of file
+        client.disconnect()
+        if engine is not None:
+            engine.stop()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import threading
+import time
+
+# =========================
+# Timer-driven barrier engine — one scheduler thread for every barrier
+# =========================
+# Each barrier is a small state machine:
+#
+#   CLOSED --OPEN--> OPENING --opening_s--> OPENED --open_s--> CLOSING --closing_s--> CLOSED
+#
+# Repeated OPENs never start a second sequence:
+#   - OPENING : nothing to do, the barrier will stay open open_s once OPENED
+#   - OPENED  : the open window is extended (close_at = now + open_s)
+#   - CLOSING : the barrier reverses to OPENING (as a real barrier would) and
+#               takes the time already spent closing to be fully open again
+#
+# Timers live in one heap (due, seq, barrier, gen); a barrier owns at most one
+# live timer, a stale one is recognised by its generation and skipped. Memory is
+# O(barriers), the thread count is 1 whatever the command rate. Every state is
+# published from the scheduler thread, so a barrier's states are never reordered.
+#
+# Tracing: the trace dict of the OPEN that started (or reversed) a sequence is
+# kept on the barrier; every transition stamps "<state>_ns" (monotonic),
+# "<state>_wall_ns" and "<state>_clock" in it and the publish carries a copy
+# (see smartpark_mqtt/tracing.py). Coalesced OPENs keep the running trace.
+
+OPENING, OPENED, CLOSING, CLOSED = "OPENING", "OPENED", "CLOSING", "CLOSED"
+
+
+class Barrier:
+    __slots__ = ("barrier_id", "state", "since", "close_at", "gen", "trace")
+
+    def __init__(self, barrier_id: str):
+        self.barrier_id = barrier_id
+        self.state = CLOSED
+        self.since = 0.0      # monotonic time of the last transition
+        self.close_at = 0.0   # OPENED: when to start closing (extended by OPENs)
+        self.gen = 0          # bumped when the pending timer is replaced
+        self.trace = None     # trace of the OPEN driving the current sequence
+
+
+class BarrierEngine:
+    def __init__(self, publish, opening_s: float = 2.0, open_s: float = 5.0, closing_s: float = 2.0,
+                 clock_id: str = None):
+        """publish(barrier_id, state, trace) is called from the scheduler thread on every transition."""
+        self.publish = publish
+        self.clock_id = clock_id
+        self.opening_s = opening_s
+        self.open_s = open_s
+        self.closing_s = closing_s
+        self.barriers = {}
+        self._heap = []                 # (due, seq, barrier, gen)
+        self._seq = itertools.count()   # tie-breaker, barriers are not comparable
+        self._outbox = []               # (barrier_id, state, trace) to publish, in transition order
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self.stats = {"opens": 0, "coalesced": 0, "reversed": 0, "transitions": 0, "stale_timers": 0}
+
+    # --- lifecycle ---
+    def start(self):
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="barrier-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- commands (any thread) ---
+    def open(self, barrier_id: str, trace: dict = None) -> str:
+        """
+        OPEN command; returns what it did: "started", "extended", "reversed" or "coalesced".
+        trace (optional) is owned by the engine from now on.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.stats["opens"] += 1
+            b = self.barriers.get(barrier_id)
+            if b is None:
+                b = self.barriers[barrier_id] = Barrier(barrier_id)
+
+            if b.state == CLOSED:
+                b.trace = trace
+                self._transition(b, OPENING, now, now + self.opening_s)
+                return "started"
+            if b.state == OPENED:
+                b.close_at = now + self.open_s  # timer checks close_at when it fires
+                self.stats["coalesced"] += 1
+                return "extended"
+            if b.state == CLOSING:
+                # Back up: the barrier is open again after the time it spent closing
+                self.stats["reversed"] += 1
+                b.trace = trace
+                self._transition(b, OPENING, now, now + (now - b.since) * self.opening_s / self.closing_s)
+                return "reversed"
+            self.stats["coalesced"] += 1  # already OPENING
+            return "coalesced"
+
+    def state(self, barrier_id: str) -> str:
+        b = self.barriers.get(barrier_id)
+        return b.state if b is not None else CLOSED
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            counts = {OPENING: 0, OPENED: 0, CLOSING: 0, CLOSED: 0}
+            for b in self.barriers.values():
+                counts[b.state] += 1
+            return {"barriers": len(self.barriers), "timers": len(self._heap), **counts, **self.stats}
+
+    # --- scheduler ---
+    def _transition(self, b: Barrier, state: str, now: float, due: float = None):
+        # Called with the lock held; the scheduler thread publishes it
+        b.state = state
+        b.since = now
+        b.gen += 1
+        self.stats["transitions"] += 1
+        trace = b.trace
+        if trace is not None:
+            key = state.lower()
+            trace[key + "_ns"] = time.monotonic_ns()
+            trace[key + "_wall_ns"] = time.time_ns()
+            if self.clock_id is not None:
+                trace[key + "_clock"] = self.clock_id
+            trace = dict(trace)  # later stamps must not change what is published
+            if state == CLOSED:
+                b.trace = None
+        if not self._outbox:
+            self._cond.notify()
+        self._outbox.append((b.barrier_id, state, trace))
+        if due is not None:
+            heapq.heappush(self._heap, (due, next(self._seq), b, b.gen))
+
+    def _emit(self, out):
+        # Outside the lock: a slow publish never delays open()
+        for barrier_id, state, trace in out:
+            try:
+                self.publish(barrier_id, state, trace)
+            except Exception as e:
+                print(f"⚠️ Barrier {barrier_id}: {e}")
+
+    def _fire(self, b: Barrier, now: float):
+        if b.state == OPENING:
+            b.close_at = now + self.open_s
+            self._transition(b, OPENED, now, b.close_at)
+        elif b.state == OPENED:
+            if b.close_at > now:
+                # Extended by an OPEN meanwhile: same barrier, one timer
+                heapq.heappush(self._heap, (b.close_at, next(self._seq), b, b.gen))
+            else:
+                self._transition(b, CLOSING, now, now + self.closing_s)
+        elif b.state == CLOSING:
+            self._transition(b, CLOSED, now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop:
+                    now = time.monotonic()
+                    if self._outbox or (self._heap and self._heap[0][0] <= now):
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                if self._stop:
+                    return
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, b, gen = heapq.heappop(self._heap)
+                    if gen != b.gen:
+                        self.stats["stale_timers"] += 1
+                        continue
+                    self._fire(b, now)
+                out, self._outbox = self._outbox, []
+            self._emit(out)
@@ -0,0 +1,112 @@
+"""
+Stress test of the p3 barrier engine (loopback broker, in-process).
+
+--barriers simulated barriers receive random OPEN commands on
+parking/barriers/{id}/cmd at each --rates value (commands/s) for --seconds.
+Timings are scaled by --scale so barriers cycle many times during the run.
+
+Every published state is checked against the state machine
+(CLOSED -> OPENING -> OPENED -> CLOSING -> CLOSED, CLOSING -> OPENING):
+repeated OPENs must never produce a contradictory sequence.
+Thread count and traced memory are printed per rate: they must stay flat.
+Exit code 1 on any invalid transition.
+
+Usage :
+    python stress_barriers.py
+    python stress_barriers.py --barriers 5000 --rates 1000 10000 50000 --seconds 5
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+os.environ["SMARTPARK_TRANSPORT"] = "loopback"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import barrier as p3
+from smartpark_mqtt import make_client
+
+NEXT = {"CLOSED": ("OPENING",), "OPENING": ("OPENED",), "OPENED": ("CLOSING",), "CLOSING": ("CLOSED", "OPENING")}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--barriers", type=int, default=2000)
+    parser.add_argument("--rates", type=int, nargs="+", default=[500, 5000, 20000], help="OPEN commands/s")
+    parser.add_argument("--seconds", type=float, default=3.0, help="per rate")
+    parser.add_argument("--scale", type=float, default=0.05, help="multiplies the 2s / 5s / 2s timings")
+    args = parser.parse_args()
+
+    p3.OPENING_S, p3.OPEN_S, p3.CLOSING_S = (t * args.scale for t in (p3.OPENING_S, p3.OPEN_S, p3.CLOSING_S))
+    p3.LOG_TRANSITIONS = False
+
+    last = {}
+    errors = []
+    states = [0]
+
+    def on_state(client, userdata, msg):
+        barrier_id = msg.topic.split("/")[-2]
+        state = json.loads(msg.payload)["state"]
+        prev = last.get(barrier_id, "CLOSED")
+        if state not in NEXT[prev]:
+            errors.append(f"{barrier_id}: {prev} -> {state}")
+        last[barrier_id] = state
+        states[0] += 1
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        module = make_client(p3.CLIENT_ID)
+        module.on_connect = p3.on_connect
+        module.on_message = p3.on_message
+        module.connect("loopback", 0, 60)
+        module.loop_start()
+
+        monitor = make_client("SmartPark2026_P3_MONITOR")
+        monitor.on_connect = lambda c, *a: c.subscribe(p3.PREFIX + "parking/barriers/+/state", qos=1)
+        monitor.on_message = on_state
+        monitor.connect("loopback", 0, 60)
+        monitor.loop_start()
+
+    source = make_client("SmartPark2026_P3_STRESS")
+    source.connect("loopback", 0, 60)
+    barrier_ids = [f"gate_{i:05d}" for i in range(args.barriers)]
+    rnd = random.Random(1)
+    cmd = json.dumps({"action": "OPEN"})
+
+    print(f"{args.barriers} barriers | timings x{args.scale}")
+    print(f"{'cmd/s':>7} | {'sent':>7} | {'states':>7} | {'threads':>7} | {'timers':>6} | {'memory':>9} | coalesced")
+    for rate in args.rates:
+        sent = 0
+        start = time.perf_counter()
+        states[0] = 0
+        while time.perf_counter() - start < args.seconds:
+            due = int((time.perf_counter() - start) * rate)
+            while sent < due:
+                source.publish(f"{p3.PREFIX}parking/barriers/{rnd.choice(barrier_ids)}/cmd", cmd, qos=1)
+                sent += 1
+            time.sleep(0.001)
+        snap = p3.engine.snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"{rate:>7} | {sent:>7} | {states[0]:>7} | {threading.active_count():>7} | {snap['timers']:>6} | "
+              f"{current / 1e6:>7.1f}MB | {snap['coalesced']}")
+
+    time.sleep((p3.OPENING_S + p3.OPEN_S + p3.CLOSING_S) * 2)  # let every barrier close
+    snap = p3.engine.snapshot()
+    print(f"after drain: {snap['CLOSED']}/{snap['barriers']} closed | timers={snap['timers']} | "
+          f"reversed={snap['reversed']} | invalid transitions: {len(errors)}")
+    for e in errors[:10]:
+        print("  ", e)
+    p3.engine.stop()
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
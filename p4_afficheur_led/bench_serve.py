@@ -0,0 +1,119 @@
+"""
+Requests per second on /api/parking/summary: Flask dev server vs serve.py.
+
+Spawns the server in a subprocess (loopback MQTT transport, no broker needed),
+then --clients processes send keep-alive GETs for --seconds and count them.
+
+    dev       : p4_led_display.app.run(debug=True), as in p4_led_display.py
+    werkzeug  : serve.py --server werkzeug
+    waitress  : serve.py --server waitress (needs pip install waitress)
+
+Usage :
+    python bench_serve.py
+    python bench_serve.py --modes dev waitress --clients 16 --seconds 10
+    python bench_serve.py --url http://127.0.0.1:8080   # already running server
+"""
+import argparse
+import http.client
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PATH = "/api/parking/summary"
+
+DEV_CMD = ("import p4_led_display as p4; p4.start_mqtt(); "
+           "p4.app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)")
+
+
+def spawn(mode: str, port: int):
+    env = dict(os.environ, SMARTPARK_TRANSPORT=os.environ.get("SMARTPARK_TRANSPORT", "loopback"))
+    if mode == "dev":
+        cmd = [sys.executable, "-c", DEV_CMD.format(port=port)]
+    else:
+        cmd = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--server", mode]
+    return subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_up(host: str, port: int, timeout: float = 15.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", PATH)
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client(host: str, port: int, seconds: float, out):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    n = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            conn.request("GET", PATH)
+            r = conn.getresponse()
+            r.read()
+            n += r.status == 200
+        except OSError:
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+    out.put((n, errors))
+
+
+def measure(host: str, port: int, clients: int, seconds: float):
+    out = mp.Queue()
+    procs = [mp.Process(target=client, args=(host, port, seconds, out)) for _ in range(clients)]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    ok = sum(r[0] for r in results)
+    return ok / seconds, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", choices=["dev", "werkzeug", "waitress"], default=["dev", "werkzeug", "waitress"])
+    parser.add_argument("--clients", type=int, default=8, help="client processes (1 keep-alive connection each)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--url", help="benchmark an already running server instead of spawning one")
+    args = parser.parse_args()
+
+    print(f"GET {PATH} | {args.clients} clients | {args.seconds:.0f}s")
+    if args.url:
+        u = urlparse(args.url)
+        rps, errors = measure(u.hostname, u.port or 80, args.clients, args.seconds)
+        print(f"{args.url:>10} | {rps:10.0f} req/s | errors={errors}")
+        return
+
+    for mode in args.modes:
+        if mode == "waitress":
+            try:
+                import waitress  # noqa: F401
+            except ImportError:
+                print(f"{mode:>10} | waitress not installed: skipped")
+                continue
+        proc = spawn(mode, args.port)
+        try:
+            if not wait_up("127.0.0.1", args.port):
+                print(f"{mode:>10} | server did not start")
+                continue
+            rps, errors = measure("127.0.0.1", args.port, args.clients, args.seconds)
+            print(f"{mode:>10} | {rps:10.0f} req/s | errors={errors}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
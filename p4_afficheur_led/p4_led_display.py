@@ -1,16 +1,30 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, Response, request
+import hashlib
 import json
+import os
+import sys
+import threading
 from datetime import datetime
-import paho.mqtt.client as mqtt
 import time
+from typing import NamedTuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # racine du dépôt
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+from sse_hub import SseHub
+from spot_registry import SpotRegistry, parse_spot_id
 
 app = Flask(__name__)
 
 # ----------------------------
 # MODÈLE DE DONNÉES (Read-only)
 # ----------------------------
-SPOTS = [f"A{i:02d}" for i in range(1, 21)]  # A01..A20
-places = {sid: "FREE" for sid in SPOTS}
+# Registre dynamique: places ajoutées par config/new_spot (P6) ou au premier
+# état reçu; compteurs par zone / niveau tenus à jour à chaque transition.
+# SPOTS pré-remplit le registre (ex. [f"A{i:02d}" for i in range(1, 21)]) ; vide
+# par défaut pour ne pas compter de places fantômes sur un site multi-niveaux.
+SPOTS = []
+registry = SpotRegistry(SPOTS)
+places = registry.status  # id -> "FREE" / "OCCUPIED" (écrit seulement par le thread MQTT)
 
 # ----------------------------
 # CONFIG MQTT
@@ -20,138 +34,305 @@ MQTT_PORT = 1883
 PREFIX = "smart_parking_2026"
 
 # P1 -> états des places
-MQTT_SPOTS_TOPIC = f"{PREFIX}/parking/spots/+/status"
+MQTT_SPOTS_TOPIC = f"{PREFIX}/parking/spots/{{spot_id}}/status"
+# P1 -> tous les changements d'un tick en un seul message (mode --publish batch)
+MQTT_SPOTS_BATCH_TOPIC = f"{PREFIX}/parking/spots/batch"
+
+# P6 -> nouvelle place {"id": "B1", "cmd": "ADD"} (ou "REMOVE")
+MQTT_NEW_SPOT_TOPIC = f"{PREFIX}/parking/config/new_spot"
 
 # P4 -> résumé (pour P2 / P7)
 MQTT_LED_TOPIC = f"{PREFIX}/parking/display/available"
 
-# P2 -> ordres barrière (CMD). On écoute juste pour l’UI (barrière globale).
-MQTT_ENTRY_CMD_TOPIC = f"{PREFIX}/parking/barriers/entry/cmd"
-MQTT_EXIT_CMD_TOPIC  = f"{PREFIX}/parking/barriers/exit/cmd"
+# P2 -> ordres barrière (CMD) de tous les portails (entry, exit, entry_2, ...).
+# On écoute juste pour l’UI (barrière globale).
+MQTT_BARRIER_CMD_TOPIC = f"{PREFIX}/parking/barriers/{{barrier_id}}/cmd"
 
 mqtt_client = None
 
+# ----------------------------
+# PUSH SSE (écrans)
+# ----------------------------
+SSE_HEARTBEAT_S = 15.0            # commentaire ": heartbeat" si aucun changement
+SSE_RETRY_MS = 2000               # délai de reconnexion de l'EventSource
+hub = SseHub(SSE_HEARTBEAT_S, SSE_RETRY_MS)
+_last_summary = None              # dernier résumé poussé aux écrans
+
+# ----------------------------
+# PUBLICATION display/available
+# ----------------------------
+SUMMARY_COALESCE_S = 0.5          # au plus 1 publication par fenêtre (0 = immédiat)
+_summary_lock = threading.Lock()
+_last_published_free = None       # dernière valeur publiée (change-only)
+_last_publish_ts = 0.0
+_summary_timer = None             # publication différée en fin de fenêtre
+
 # ----------------------------
 # ÉTAT BARrière (GLOBAL - UI)
 # ----------------------------
-barrier_state = "CLOSED"          # "OPENED" / "CLOSED"
-barrier_last_open_ts = 0.0        # time.time() quand on reçoit OPEN
 BARRIER_OPEN_SECONDS = 3.0        # durée d’affichage "OUVERTE" après un OPEN
+_barrier_timer = None             # pousse l'événement CLOSED après BARRIER_OPEN_SECONDS
+_last_barrier_event = "CLOSED"    # dernier état barrière poussé aux écrans
 
 
 def _now_iso():
     return datetime.now().isoformat(timespec="seconds")
 
 
+# ----------------------------
+# INSTANTANÉ (lecture sans verrou)
+# ----------------------------
+class DisplayState(NamedTuple):
+    """
+    État immuable de l'afficheur. Le thread MQTT en construit un nouveau après
+    chaque changement et remplace `state` en une seule affectation: un handler
+    Flask lit `state` une fois et voit un total, des compteurs par zone et une
+    barrière cohérents entre eux, sans prendre de verrou.
+    """
+    version: int
+    total: int
+    occupied: int
+    zones: tuple                # ((zone, total, occupied), ...)
+    levels: tuple               # ((niveau, total, occupied), ...)
+    barrier_open_until: float   # time.time() jusqu'auquel la barrière est OUVERTE
+
+    @property
+    def free(self) -> int:
+        return self.total - self.occupied
+
+    def summary(self) -> dict:
+        return {"total": self.total, "occupied": self.occupied, "free": self.free}
+
+    def barrier_state(self) -> str:
+        # le délai est calculé à la lecture: aucun lecteur n'a besoin d'écrire
+        return "OPENED" if time.time() < self.barrier_open_until else "CLOSED"
+
+    def barrier(self) -> dict:
+        return {"state": self.barrier_state(), "ts": _now_iso()}
+
+    @staticmethod
+    def rows(items, key: str):
+        return [{key: k, "total": t, "occupied": o, "free": t - o} for k, t, o in items]
+
+
+state = DisplayState(0, registry.total, registry.occupied, registry.zone_items(), registry.level_items(), 0.0)
+_write_lock = threading.Lock()    # écrivains seulement (thread MQTT, timer barrière)
+
+
+def _publish_state(barrier_open_until: float | None = None) -> DisplayState:
+    """Construit l'instantané suivant depuis le registre et le publie (appelé sous _write_lock)."""
+    global state
+    prev = state
+    state = DisplayState(
+        version=prev.version + 1,
+        total=registry.total,
+        occupied=registry.occupied,
+        zones=registry.zone_items(),
+        levels=registry.level_items(),
+        barrier_open_until=prev.barrier_open_until if barrier_open_until is None else barrier_open_until,
+    )
+    return state
+
+
 def _normalize_place_id(raw) -> str | None:
-    """Normalise l'ID en A01..A20 (accepte A1 ou A01)."""
-    if raw is None:
-        return None
-    raw = str(raw).upper().strip()
-    if not (raw.startswith("A") and raw[1:].isdigit()):
-        return None
-    return f"A{int(raw[1:]):02d}"
+    """Normalise l'ID (A1 -> A01, l2-b3 -> L2-B03); None si le format est invalide."""
+    parsed = parse_spot_id(raw)
+    return parsed[0] if parsed else None
 
 
-def publish_led_summary():
-    """Publie {count: free} sur MQTT (retain=True) pour les autres modules."""
-    if mqtt_client is None:
-        return
+def _set_place(place_id: str, status: str) -> bool:
+    """Met à jour (ou enregistre) une place; True seulement si les compteurs changent."""
+    return registry.set(place_id, status)
 
-    total = len(places)
-    occupied = sum(1 for s in places.values() if s == "OCCUPIED")
-    free = total - occupied
 
-    payload = {"count": free, "ts": _now_iso()}
-    mqtt_client.publish(MQTT_LED_TOPIC, json.dumps(payload), qos=1, retain=True)
+def _summary() -> dict:
+    return state.summary()
 
 
-def _update_barrier_timeout():
-    """Si aucun OPEN récent, repasse la barrière en CLOSED."""
-    global barrier_state
-    if barrier_state == "OPENED":
-        if (time.time() - barrier_last_open_ts) >= BARRIER_OPEN_SECONDS:
-            barrier_state = "CLOSED"
+def _snapshot() -> dict:
+    snap = state
+    return {"summary": snap.summary(), "barrier": snap.barrier()}
 
 
-# ----------------------------
-# MQTT CALLBACKS (Callback API v2)
-# ----------------------------
-def on_connect(client, userdata, flags, reason_code, properties=None):
-    # Abonnements
-    client.subscribe(MQTT_SPOTS_TOPIC, qos=1)
-    client.subscribe(MQTT_ENTRY_CMD_TOPIC, qos=1)
-    client.subscribe(MQTT_EXIT_CMD_TOPIC, qos=1)
+def places_changed():
+    """Après une vraie transition: nouvel instantané, résumé MQTT, événement SSE si le résumé a changé."""
+    global _last_summary
+    summary = _publish_state().summary()
+    publish_led_summary()
+    if summary != _last_summary:
+        _last_summary = summary
+        hub.publish("summary", summary)
 
 
-def on_message(client, userdata, msg):
-    global barrier_state, barrier_last_open_ts
+def _push_barrier():
+    """Pousse l'état barrière aux écrans s'il a changé (appelé sous _write_lock)."""
+    global _last_barrier_event
+    barrier = state.barrier()
+    if barrier["state"] != _last_barrier_event:
+        _last_barrier_event = barrier["state"]
+        hub.publish("barrier", barrier)
 
-    topic = msg.topic
-    payload_str = msg.payload.decode("utf-8", errors="ignore").strip()
 
-    # ---- 1) État des places (P1) ----
-    if "/parking/spots/" in topic and topic.endswith("/status"):
-        parts = topic.split("/")
-        if len(parts) < 5:
-            return
+def _barrier_timeout():
+    with _write_lock:
+        _push_barrier()
+
 
-        place_id = _normalize_place_id(parts[3])
-        if place_id is None:
+def publish_led_summary(force: bool = False):
+    """
+    Publie {count: free} sur MQTT (retain=True) pour les autres modules.
+    Seulement si le nombre a changé, et au plus une fois par SUMMARY_COALESCE_S:
+    pendant une rafale, la dernière valeur part en fin de fenêtre.
+    """
+    global _summary_timer
+    if mqtt_client is None:
+        return
+
+    with _summary_lock:
+        wait = _last_publish_ts + SUMMARY_COALESCE_S - time.time()
+        if not force and wait > 0:
+            if _summary_timer is None:
+                _summary_timer = threading.Timer(wait, _publish_pending)
+                _summary_timer.daemon = True
+                _summary_timer.start()
             return
+        _publish_now(force)
+
 
-        status = None
-        try:
-            data = json.loads(payload_str)
-            status = str(data.get("status", "")).upper()
+def _publish_pending():
+    global _summary_timer
+    with _summary_lock:
+        _summary_timer = None
+        _publish_now()
 
-            # Compatibilité : si "id" existe aussi dans le JSON, on le normalise
-            incoming_id = _normalize_place_id(data.get("id"))
-            if incoming_id is not None:
-                place_id = incoming_id
 
-            # Champs additionnels P1 acceptés (non utilisés)
-            # distance_cm = data.get("distance_cm")
-            # ts = data.get("ts")
+def _publish_now(force: bool = False):
+    """Appelé sous _summary_lock: lecture, mise à jour et publication dans la même
+    section, sinon le thread MQTT et le timer peuvent publier dans le désordre et
+    laisser une valeur retenue périmée (publish() ne fait que mettre en file)."""
+    global _last_published_free, _last_publish_ts
+    free = state.free
+    if not force and free == _last_published_free:
+        return
+    _last_published_free = free
+    _last_publish_ts = time.time()
 
-        except Exception:
-            status = payload_str.upper()
+    payload = {"count": free, "ts": _now_iso()}
+    mqtt_client.publish(MQTT_LED_TOPIC, codec.dumps(payload), qos=1, retain=True)
 
-        if status not in ("FREE", "OCCUPIED"):
-            return
 
-        if place_id in places:
-            places[place_id] = status
-            publish_led_summary()
+# ----------------------------
+# ROUTES MQTT (table topic -> handler, smartpark_mqtt/router.py)
+# ----------------------------
+# Les handlers tournent sous _write_lock (voir on_message); le JSON n'est
+# décodé que si le handler lit msg.json / msg.get().
+router = Router()
+
+
+# ---- Lot de changements (P1, topic batch) ----
+# {"ts": ..., "spots": [["A01", "OCCUPIED", 19.8], ...]} -> un seul résumé publié
+@router.route(MQTT_SPOTS_BATCH_TOPIC)
+def _on_spots_batch(client, msg):
+    changed = False
+    for item in msg.get("spots") or []:
+        if not isinstance(item, list) or len(item) < 2:
+            continue
+        place_id = _normalize_place_id(item[0])
+        status = str(item[1]).upper()
+        if place_id is not None and status in ("FREE", "OCCUPIED"):
+            changed |= _set_place(place_id, status)
+
+    if changed:
+        places_changed()
+
+
+# ---- Registre des places (P6, config/new_spot) ----
+@router.route(MQTT_NEW_SPOT_TOPIC)
+def _on_new_spot(client, msg):
+    cmd = str(msg.get("cmd", "ADD")).upper()
+    spot_id = msg.get("id")
+
+    if cmd == "ADD":
+        changed = registry.add(spot_id)
+    elif cmd in ("REMOVE", "DELETE", "DEL"):
+        changed = registry.remove(spot_id)
+    else:
         return
+    if changed:
+        places_changed()
 
-    # ---- 2) CMD barrière (P2) -> UI globale ----
-    
-    if topic in (MQTT_ENTRY_CMD_TOPIC, MQTT_EXIT_CMD_TOPIC):
-        try:
-            data = json.loads(payload_str)
-            action = str(data.get("action", "")).upper()
-        except Exception:
-            action = payload_str.upper()
-
-        if action == "OPEN":
-            barrier_state = "OPENED"
-            barrier_last_open_ts = time.time()
-        # Si un jour vous publiez "CLOSE", vous pouvez décommenter:
-        # elif action in ("CLOSE", "CLOSED"):
-        #     barrier_state = "CLOSED"
+
+# ---- 1) État des places (P1) ----
+@router.route(MQTT_SPOTS_TOPIC)
+def _on_spot_status(client, msg):
+    place_id = _normalize_place_id(msg.params["spot_id"])
+    if place_id is None:
+        return
+
+    try:
+        data = msg.json
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        status = str(data.get("status", "")).upper()
+
+        # Compatibilité : si "id" existe aussi dans le JSON, on le normalise
+        incoming_id = _normalize_place_id(data.get("id"))
+        if incoming_id is not None:
+            place_id = incoming_id
+
+        # Champs additionnels P1 acceptés (non utilisés)
+        # distance_cm = data.get("distance_cm")
+        # ts = data.get("ts")
+    else:
+        status = msg.text.upper()  # payload texte brut "FREE" / "OCCUPIED"
+
+    if status not in ("FREE", "OCCUPIED"):
         return
 
+    if _set_place(place_id, status):
+        places_changed()
+
+
+# ---- 2) CMD barrière (P2) -> UI globale ----
+@router.route(MQTT_BARRIER_CMD_TOPIC)
+def _on_barrier_cmd(client, msg):
+    global _barrier_timer
+    action = msg.get("action")
+    action = str(action).upper() if action is not None else msg.text.upper()
+
+    if action == "OPEN":
+        _publish_state(barrier_open_until=time.time() + BARRIER_OPEN_SECONDS)
+        _push_barrier()
+        if _barrier_timer is not None:
+            _barrier_timer.cancel()
+        _barrier_timer = threading.Timer(BARRIER_OPEN_SECONDS, _barrier_timeout)
+        _barrier_timer.daemon = True
+        _barrier_timer.start()
+    # Si un jour vous publiez "CLOSE", vous pouvez décommenter:
+    # elif action in ("CLOSE", "CLOSED"):
+    #     barrier_state = "CLOSED"
+
+
+# ----------------------------
+# MQTT CALLBACKS (Callback API v2)
+# ----------------------------
+def on_connect(client, userdata, flags, reason_code, properties=None):
+    # Abonnements (toutes les routes, à nouveau après chaque reconnexion)
+    router.subscribe_all(client, qos=1)
+
+
+def on_message(client, userdata, msg):
+    with _write_lock:
+        router.dispatch(client, msg)
+
 
 def start_mqtt():
     global mqtt_client
-    client = mqtt.Client(
-        mqtt.CallbackAPIVersion.VERSION2,
-        client_id="SmartPark2026_P4"
-    )
+    client = make_client("SmartPark2026_P4")
     client.on_connect = on_connect
     client.on_message = on_message
-    client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    connect_with_backoff(client, MQTT_BROKER, MQTT_PORT, 60)
     client.loop_start()
     mqtt_client = client
 
@@ -159,30 +340,48 @@ def start_mqtt():
 # ----------------------------
 # API REST (Read-only)
 # ----------------------------
+_summary_body = ((None, False), "")  # ((version, zones), JSON) du dernier résumé servi
+
+
 @app.get("/api/parking/summary")
 def get_summary():
-    _update_barrier_timeout()
-    total = len(places)
-    occupied = sum(1 for s in places.values() if s == "OCCUPIED")
-    free = total - occupied
-    return jsonify({"total": total, "occupied": occupied, "free": free})
+    """?zones=1 -> ajoute la disponibilité par zone et par niveau (O(zones), pas O(places))."""
+    global _summary_body
+    snap = state  # une seule lecture: tous les champs viennent du même instantané
+    zones = bool(request.args.get("zones"))
+    cached = _summary_body
+    if cached[0] == (snap.version, zones):
+        return Response(cached[1], mimetype="application/json")
+
+    out = snap.summary()
+    out["version"] = snap.version
+    if zones:
+        out["zones"] = DisplayState.rows(snap.zones, "zone")
+        out["levels"] = DisplayState.rows(snap.levels, "level")
+    body = json.dumps(out)
+    _summary_body = ((snap.version, zones), body)  # sérialisé une fois par version
+    return Response(body, mimetype="application/json")
 
 
 @app.get("/api/barrier")
 def get_barrier():
-    _update_barrier_timeout()
-    return jsonify({
-        "state": barrier_state,  # OPENED / CLOSED
-        "ts": _now_iso()
-    })
+    return jsonify(state.barrier())  # state: OPENED / CLOSED
+
+
+@app.get("/api/stream")
+def stream():
+    """SSE: snapshot {summary, barrier} puis événements "summary" / "barrier" sur changement."""
+    return Response(
+        hub.stream(_snapshot),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ----------------------------
 # WEB UI (Read-only)
 # ----------------------------
-@app.get("/")
-def led_display():
-    return """
+LED_PAGE_HTML = """
 <!DOCTYPE html>
 <html lang="fr">
 <head>
@@ -274,7 +473,7 @@ def led_display():
         <div class="label">Places libres</div>
 
         <div class="status" id="state">Chargement...</div>
-        <div class="hint">Mise à jour automatique (toutes les 2 secondes)</div>
+        <div class="hint" id="hint">Mise à jour en direct</div>
 
         <div class="barrier-wrap">
             <div class="dot" id="barDot"></div>
@@ -286,11 +485,7 @@ def led_display():
     </div>
 
     <script>
-        async function update() {
-            // ---- Parking summary ----
-            const r = await fetch('/api/parking/summary');
-            const data = await r.json();
-
+        function showSummary(data) {
             document.getElementById('free').innerText = data.free + " / " + data.total;
 
             if (data.free === 0) {
@@ -298,11 +493,9 @@ def led_display():
             } else {
                 document.getElementById('state').innerText = "Places disponibles";
             }
+        }
 
-            // ---- Barrier state ----
-            const b = await fetch('/api/barrier');
-            const bd = await b.json();
-
+        function showBarrier(bd) {
             const dot = document.getElementById('barDot');
             const txt = document.getElementById('barState');
 
@@ -315,15 +508,54 @@ def led_display():
             }
         }
 
-        update();
-        setInterval(update, 2000);
+        async function poll() {
+            const r = await fetch('/api/parking/summary');
+            showSummary(await r.json());
+            const b = await fetch('/api/barrier');
+            showBarrier(await b.json());
+        }
+
+        if (window.EventSource) {
+            // Push: snapshot à la connexion puis changements seulement.
+            // L'EventSource se reconnecte tout seul (délai "retry" envoyé par le serveur).
+            const es = new EventSource('/api/stream');
+            const hint = document.getElementById('hint');
+            es.addEventListener('snapshot', (e) => {
+                const d = JSON.parse(e.data);
+                showSummary(d.summary);
+                showBarrier(d.barrier);
+                hint.innerText = "Mise à jour en direct";
+            });
+            es.addEventListener('summary', (e) => showSummary(JSON.parse(e.data)));
+            es.addEventListener('barrier', (e) => showBarrier(JSON.parse(e.data)));
+            es.onerror = () => { hint.innerText = "Reconnexion..."; };
+        } else {
+            // Navigateur sans SSE: ancien polling
+            poll();
+            setInterval(poll, 2000);
+        }
     </script>
 </body>
 </html>
 """
 
+# Page statique: rendue une fois au chargement du module, servie avec ETag + Cache-Control
+# (toutes les données arrivent ensuite par /api/stream)
+LED_PAGE_BYTES = LED_PAGE_HTML.encode("utf-8")
+LED_PAGE_ETAG = hashlib.sha1(LED_PAGE_BYTES).hexdigest()[:16]
+LED_PAGE_MAX_AGE_S = 300
+
+
+@app.get("/")
+def led_display():
+    resp = Response(LED_PAGE_BYTES, mimetype="text/html")
+    resp.set_etag(LED_PAGE_ETAG)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = LED_PAGE_MAX_AGE_S
+    return resp.make_conditional(request)
+
 
 if __name__ == "__main__":
     start_mqtt()
-    publish_led_summary()  # Publie une première valeur au démarrage (optionnel)
+    publish_led_summary(force=True)  # Publie une première valeur au démarrage (optionnel)
     app.run(host="127.0.0.1", port=3000, debug=True, use_reloader=False)
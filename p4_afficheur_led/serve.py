@@ -0,0 +1,62 @@
+"""
+Production entry point of the P4 display API (same Flask routes as p4_led_display.py).
+
+One process, one shared MQTT client, one DisplayState: the WSGI server runs a
+pool of worker threads that all read the same lock-free snapshot. Process
+workers (gunicorn -w N) are not used on purpose: each process would open its
+own MQTT connection and keep its own copy of the parking state.
+
+Server : waitress if installed (pip install waitress), otherwise werkzeug's
+threaded server without debugger / reloader.
+Each open /api/stream (SSE screen) keeps one thread: size --threads accordingly.
+
+Usage :
+    python serve.py                               # 0.0.0.0:8080, 64 threads
+    python serve.py --port 3000 --threads 512     # hundreds of SSE screens
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import p4_led_display as p4
+
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
+
+def run(host: str, port: int, threads: int, server: str = "auto"):
+    p4.start_mqtt()
+    p4.publish_led_summary(force=True)
+
+    if server == "waitress" or (server == "auto" and waitress_serve is not None):
+        if waitress_serve is None:
+            raise SystemExit("waitress is not installed: pip install waitress")
+        print(f"🚀 P4 (waitress, {threads} threads) on http://{host}:{port}")
+        waitress_serve(p4.app, host=host, port=port, threads=threads, ident="smartpark-p4")
+        return
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive (SSE streams use chunked encoding)
+
+    print(f"🚀 P4 (werkzeug threaded, no debugger) on http://{host}:{port}")
+    make_server(host, port, p4.app, threaded=True, request_handler=KeepAliveHandler).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=64, help="waitress worker threads")
+    parser.add_argument("--server", choices=["auto", "waitress", "werkzeug"], default="auto")
+    args = parser.parse_args()
+    run(args.host, args.port, args.threads, args.server)
+
+
+if __name__ == "__main__":
+    main()
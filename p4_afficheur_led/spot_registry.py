@@ -0,0 +1,100 @@
+import re
+
+# A01, B7, L2-C014 : niveau optionnel, lettre(s) de zone, numéro
+_SPOT_ID_RE = re.compile(r"^(?:L(\d+)-)?([A-Z]+)(\d+)$")
+NUM_WIDTH = 2  # largeur minimale du numéro normalisé (A1, A01, A001 -> A01)
+
+
+def parse_spot_id(raw):
+    """
+    Normalise un id de place -> (id, zone, niveau) ou None.
+    Le numéro est réécrit sur NUM_WIDTH chiffres quelle que soit sa forme reçue
+    (A1, A01, A001 -> A01 ; L2-B3 -> L2-B03 ; A120 reste A120).
+    Zone = préfixe sans le numéro ("A", "L2-B"), niveau = "L1" par défaut.
+    """
+    if raw is None:
+        return None
+    m = _SPOT_ID_RE.match(str(raw).upper().strip())
+    if m is None:
+        return None
+    level, zone, num = m.groups()
+    prefix = f"L{int(level)}-" if level else ""
+    spot_id = f"{prefix}{zone}{int(num):0{NUM_WIDTH}d}"
+    return spot_id, f"{prefix}{zone}", f"L{int(level) if level else 1}"
+
+
+class SpotRegistry:
+    """
+    Places connues de l'afficheur, avec index et compteurs par zone et par niveau.
+
+    - set() / add() / remove() ne touchent que les compteurs de la zone et du
+      niveau de la place: O(1) par message.
+    - zone_items() / level_items() copient les compteurs en O(zones) / O(niveaux)
+      pour les instantanés de l'afficheur (DisplayState).
+    """
+
+    def __init__(self, spot_ids=()):
+        self.status = {}        # id -> "FREE" / "OCCUPIED"
+        self.location = {}      # id -> (zone, niveau)
+        self.zone_counts = {}   # zone -> [total, occupied]
+        self.level_counts = {}  # niveau -> [total, occupied]
+        self.total = 0
+        self.occupied = 0
+        for spot_id in spot_ids:
+            self.add(spot_id)
+
+    def __contains__(self, spot_id) -> bool:
+        return spot_id in self.status
+
+    def __len__(self) -> int:
+        return self.total
+
+    def _count(self, spot_id: str, total: int, occupied: int):
+        zone, level = self.location[spot_id]
+        for counts, key in ((self.zone_counts, zone), (self.level_counts, level)):
+            c = counts.setdefault(key, [0, 0])
+            c[0] += total
+            c[1] += occupied
+            if c[0] == 0:
+                del counts[key]
+        self.total += total
+        self.occupied += occupied
+
+    def add(self, raw_id, status: str = "FREE") -> bool:
+        """Enregistre une place; False si l'id est invalide ou déjà connu."""
+        parsed = parse_spot_id(raw_id)
+        if parsed is None or parsed[0] in self.status:
+            return False
+        spot_id, zone, level = parsed
+        self.status[spot_id] = status
+        self.location[spot_id] = (zone, level)
+        self._count(spot_id, 1, 1 if status == "OCCUPIED" else 0)
+        return True
+
+    def remove(self, raw_id) -> bool:
+        parsed = parse_spot_id(raw_id)
+        if parsed is None or parsed[0] not in self.status:
+            return False
+        spot_id = parsed[0]
+        self._count(spot_id, -1, -1 if self.status[spot_id] == "OCCUPIED" else 0)
+        del self.status[spot_id]
+        del self.location[spot_id]
+        return True
+
+    def set(self, spot_id: str, status: str) -> bool:
+        """spot_id déjà normalisé. Place inconnue -> enregistrée. True si les compteurs changent."""
+        prev = self.status.get(spot_id)
+        if prev is None:
+            return self.add(spot_id, status)
+        if prev == status:
+            return False
+        self.status[spot_id] = status
+        self._count(spot_id, 0, 1 if status == "OCCUPIED" else -1)
+        return True
+
+    def zone_items(self) -> tuple:
+        """((zone, total, occupied), ...) trié: copie immuable pour un instantané."""
+        return tuple((k, t, o) for k, (t, o) in sorted(self.zone_counts.items()))
+
+    def level_items(self) -> tuple:
+        return tuple((k, t, o) for k, (t, o) in sorted(self.level_counts.items()))
@@ -0,0 +1,90 @@
+import itertools
+import json
+import queue
+import threading
+
+
+class SseHub:
+    """
+    Fan-out of server-sent events to the connected screens.
+
+    - publish() formats the event once and drops it in every subscriber queue
+      (O(screens), no HTTP work on the MQTT thread).
+    - Each screen has a bounded queue: a screen that stops reading is
+      disconnected, its EventSource reconnects and gets a fresh snapshot.
+    - stream() yields the "retry" hint, the snapshot, then the change events,
+      with a comment line as heartbeat when nothing happens.
+    """
+
+    def __init__(self, heartbeat_s: float = 15.0, retry_ms: int = 2000, queue_size: int = 256):
+        self.heartbeat_s = heartbeat_s
+        self.retry_ms = retry_ms
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self.stats = {"connected": 0, "events": 0, "dropped_clients": 0}
+
+    @staticmethod
+    def format(event: str, data: dict, event_id=None) -> str:
+        head = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    def publish(self, event: str, data: dict):
+        frame = self.format(event, data, next(self._ids))
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.stats["events"] += 1
+        for q in subscribers:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                self._drop(q)
+
+    def _drop(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.discard(q)
+                self.stats["dropped_clients"] += 1
+                self.stats["connected"] = len(self._subscribers)
+        # The queue is full: drop the stale backlog so the end-of-stream marker fits
+        # (the screen reconnects and gets a fresh snapshot anyway)
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            q.put_nowait(None)  # wakes the stream so it ends
+        except queue.Full:
+            pass  # stream() also ends on its next heartbeat (no longer subscribed)
+
+    def stream(self, snapshot):
+        """Generator for a Flask Response; snapshot() -> dict, taken after subscribing."""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+            self.stats["connected"] = len(self._subscribers)
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            yield self.format("snapshot", snapshot())
+            while True:
+                try:
+                    frame = q.get(timeout=self.heartbeat_s)
+                except queue.Empty:
+                    with self._lock:
+                        if q not in self._subscribers:
+                            return  # dropped: end the stream so the EventSource reconnects
+                    yield ": heartbeat\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            with self._lock:
+                self._subscribers.discard(q)
+                self.stats["connected"] = len(self._subscribers)
+
+    def clients(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
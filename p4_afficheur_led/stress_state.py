@@ -0,0 +1,134 @@
+"""
+Concurrency stress test of the p4 display state (loopback broker, in-process).
+
+Writers : one publisher floods spot transitions (several zones / levels),
+          new_spot ADD / REMOVE and barrier OPEN commands; p4's MQTT thread
+          applies them and publishes a new DisplayState each time.
+Readers : --readers threads call the Flask handlers (/api/parking/summary?zones=1,
+          /api/barrier) and read p4.state directly, in tight loops.
+
+Every read is checked:
+    free + occupied == total
+    sum(zones.total) == total, sum(zones.occupied) == occupied (same for levels)
+    version never goes backwards for a given reader
+Exit code 1 if any read was torn.
+
+Usage :
+    python stress_state.py
+    python stress_state.py --seconds 20 --readers 16 --spots 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ["SMARTPARK_TRANSPORT"] = "loopback"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "p1_sensor"))
+
+import p4_led_display as p4
+from sensor_p1 import make_spot_ids
+from smartpark_mqtt import make_client
+
+
+def check(summary: dict, errors: list, last_version: list):
+    total, occupied, free = summary["total"], summary["occupied"], summary["free"]
+    if free + occupied != total:
+        errors.append(f"free+occupied != total: {summary}")
+    for key in ("zones", "levels"):
+        rows = summary.get(key)
+        if rows is None:
+            continue
+        if sum(r["total"] for r in rows) != total or sum(r["occupied"] for r in rows) != occupied:
+            errors.append(f"{key} disagree with total v{summary.get('version')}")
+    v = summary.get("version")
+    if v is not None:
+        if v < last_version[0]:
+            errors.append(f"version went backwards {last_version[0]} -> {v}")
+        last_version[0] = v
+
+
+def http_reader(stop, errors, counts):
+    client = p4.app.test_client()
+    last_version = [0]
+    while not stop.is_set():
+        check(client.get("/api/parking/summary?zones=1").get_json(), errors, last_version)
+        if client.get("/api/barrier").get_json()["state"] not in ("OPENED", "CLOSED"):
+            errors.append("bad barrier state")
+        counts["http"] += 2
+
+
+def direct_reader(stop, errors, counts):
+    last_version = [0]
+    while not stop.is_set():
+        snap = p4.state
+        out = snap.summary()
+        out["version"] = snap.version
+        out["zones"] = p4.DisplayState.rows(snap.zones, "zone")
+        out["levels"] = p4.DisplayState.rows(snap.levels, "level")
+        check(out, errors, last_version)
+        counts["direct"] += 1
+
+
+def writer(stop, spot_ids, counts):
+    source = make_client("SmartPark2026_STRESS")
+    source.connect("loopback", 0, 60)
+    rnd = random.Random(1)
+    extra = [f"L9-Z{i:03d}" for i in range(50)]  # spots added / removed on the fly
+    while not stop.is_set():
+        for _ in range(200):
+            spot_id = rnd.choice(spot_ids)
+            status = rnd.choice(("FREE", "OCCUPIED"))
+            source.publish(f"{p4.PREFIX}/parking/spots/{spot_id}/status",
+                           json.dumps({"id": spot_id, "status": status}), qos=1)
+        cmd = rnd.choice(("ADD", "REMOVE"))
+        source.publish(p4.MQTT_NEW_SPOT_TOPIC, json.dumps({"id": rnd.choice(extra), "cmd": cmd}), qos=1)
+        source.publish(p4.MQTT_BARRIER_CMD_TOPIC.format(barrier_id="entry"), json.dumps({"action": "OPEN"}), qos=1)
+        counts["published"] += 202
+        while p4.mqtt_client._inbox.qsize() > 5000 and not stop.is_set():
+            time.sleep(0.001)  # keep the backlog bounded, readers see fresh versions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=8, help="HTTP reader threads (same number of direct readers)")
+    parser.add_argument("--spots", type=int, default=500, help="spots per zone")
+    args = parser.parse_args()
+
+    p4.BARRIER_OPEN_SECONDS = 0.01  # barrier flips constantly
+    p4.SUMMARY_COALESCE_S = 0.05
+    p4.start_mqtt()
+    spot_ids = make_spot_ids(("A", "B", "C"), 3, args.spots)
+
+    stop = threading.Event()
+    errors = []
+    counts = {"http": 0, "direct": 0, "published": 0}
+    threads = [threading.Thread(target=writer, args=(stop, spot_ids, counts), daemon=True)]
+    for _ in range(args.readers):
+        threads.append(threading.Thread(target=http_reader, args=(stop, errors, counts), daemon=True))
+        threads.append(threading.Thread(target=direct_reader, args=(stop, errors, counts), daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join(5)
+
+    snap = p4.state
+    print(f"{args.seconds:.0f}s | {counts['published']} MQTT messages | final version {snap.version} | "
+          f"{snap.total} spots, {snap.occupied} occupied")
+    print(f"reads: {counts['http']} HTTP, {counts['direct']} direct | torn reads: {len(errors)}")
+    for e in errors[:10]:
+        print("  ", e)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Smart Parking IoT 2026 - Person 5: command -> actuation latency collector
+
+Listens to parking/barriers/+/state. P2 stamps every OPEN command with a
+correlation id and monotonic timestamps, P3 echoes them and adds its own stamp
+on each transition (see smartpark_mqtt/tracing.py). When a barrier reaches
+OPENED, the collector records per barrier:
+
+    detect_to_cmd      gate sensor event -> OPEN published (P2 queue + decision)
+    cmd_to_recv        OPEN published -> received by P3 (broker transit)
+    cmd_to_opening     OPEN published -> OPENING
+    opening_to_opened  OPENING -> OPENED (movement)
+    detect_to_opened   end to end
+
+Every METRICS_INTERVAL_S it publishes the histograms (p50 / p95 / p99 / max)
+on parking/monitoring/latency, and an alert on parking/monitoring/alerts for
+every segment whose p95 over the last interval is above ALERT_P95_MS.
+
+Usage :
+    python latency_collector.py
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root
+from smartpark_mqtt import Router, codec, connect_with_backoff, make_client
+from smartpark_mqtt.tracing import span_ms
+
+# --- CONFIGURATION ---
+BROKER = "broker.emqx.io"
+PORT = 1883
+CLIENT_ID = "SmartPark2026_P5"
+PREFIX = "smart_parking_2026/"
+
+TOPIC_BARRIER_STATE = PREFIX + "parking/barriers/{barrier_id}/state"
+TOPIC_LATENCY = PREFIX + "parking/monitoring/latency"
+TOPIC_ALERTS = PREFIX + "parking/monitoring/alerts"
+
+METRICS_INTERVAL_S = 10.0
+
+# (name, start stamp, end stamp)
+SEGMENTS = [
+    ("detect_to_cmd", "detect", "cmd"),
+    ("cmd_to_recv", "cmd", "recv"),
+    ("cmd_to_opening", "cmd", "opening"),
+    ("opening_to_opened", "opening", "opened"),
+    ("detect_to_opened", "detect", "opened"),
+]
+
+# p95 over one interval above this -> alert (opening_to_opened includes the 2 s movement)
+ALERT_P95_MS = {
+    "detect_to_cmd": 100.0,
+    "cmd_to_recv": 250.0,
+    "cmd_to_opening": 500.0,
+    "opening_to_opened": 3000.0,
+    "detect_to_opened": 3500.0,
+}
+
+# Bucket upper bounds (ms), the last bucket is unbounded
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class LatencyHistogram:
+    """Fixed buckets: O(log buckets) per sample, constant memory."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (max for the last bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3), "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+            "buckets": {("le_" + str(b)): n for b, n in zip(BUCKETS_MS + ["inf"], self.counts) if n},
+        }
+
+
+# barrier -> segment -> histogram: since start (total) and since the last report (window)
+total = {}
+window = {}
+stats = {"opened": 0, "untraced": 0}
+_lock = threading.Lock()
+
+
+def record(barrier_id: str, trace: dict):
+    with _lock:
+        for name, start, end in SEGMENTS:
+            ms = span_ms(trace, start, end)
+            if ms is None:
+                continue
+            for hists in (total, window):
+                hists.setdefault(barrier_id, {}).setdefault(name, LatencyHistogram()).observe(ms)
+        stats["opened"] += 1
+
+
+def report(client):
+    global window
+    with _lock:
+        current, window = window, {}
+        out = {"barriers": {b: {name: h.to_dict() for name, h in segs.items()} for b, segs in total.items()},
+               **stats, "ts": time.time()}
+
+    alerts = []
+    for barrier_id, segs in current.items():
+        for name, h in segs.items():
+            p95 = h.percentile(95)
+            if p95 > ALERT_P95_MS.get(name, float("inf")):
+                alerts.append({"barrier": barrier_id, "segment": name, "p95_ms": p95,
+                               "threshold_ms": ALERT_P95_MS[name], "samples": h.count})
+
+    for barrier_id, segs in sorted(out["barriers"].items()):
+        e2e = segs.get("detect_to_opened")
+        if e2e:
+            print(f"📊 {barrier_id} | detect->OPENED p50 {e2e['p50']}ms p95 {e2e['p95']}ms "
+                  f"max {e2e['max']}ms ({e2e['count']} opens)")
+    client.publish(TOPIC_LATENCY, codec.dumps(out))
+    for a in alerts:
+        print(f"🚨 {a['barrier']} {a['segment']} p95 {a['p95_ms']}ms > {a['threshold_ms']}ms")
+        client.publish(TOPIC_ALERTS, codec.dumps({"type": "LATENCY", **a, "ts": time.time()}), qos=1)
+    return out, alerts
+
+
+def report_loop(client, stop: threading.Event):
+    while not stop.wait(METRICS_INTERVAL_S):
+        report(client)
+
+
+# --- MQTT ROUTES ---
+router = Router()
+
+
+@router.route(TOPIC_BARRIER_STATE)
+def on_barrier_state(client, msg):
+    if msg.get("state") != "OPENED":
+        return
+    trace = msg.get("trace")
+    if not isinstance(trace, dict):
+        with _lock:
+            stats["untraced"] += 1
+        return
+    record(msg.params["barrier_id"], trace)
+
+
+# --- MQTT CALLBACKS ---
+def on_connect(client, userdata, flags, reason_code, properties):
+    if reason_code == 0:
+        print(f"✅ Connected to {BROKER} as {CLIENT_ID}")
+        router.subscribe_all(client, qos=1)
+        print(f"👂 Listening to: {', '.join(router.filters())}")
+    else:
+        print(f"⚠️ Connection failed: {reason_code}")
+
+
+on_message = router.on_message
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    client = make_client(CLIENT_ID)
+    client.on_connect = on_connect
+    client.on_message = on_message
+
+    stop = threading.Event()
+    threading.Thread(target=report_loop, args=(client, stop), daemon=True).start()
+
+    print("🔌 Connecting to broker...")
+    connect_with_backoff(client, BROKER, PORT, 60)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("\nStopping latency collector.")
+        stop.set()
+        client.disconnect()
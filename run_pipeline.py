@@ -0,0 +1,135 @@
+"""
+Runs the whole chain P1 -> P2 -> P3 -> P4 (-> P6) in ONE process on the
+in-memory loopback broker (smartpark_mqtt), then prints messages and msg/s
+seen on each hop. No network, no public broker jitter.
+
+Sources :
+    live   : sensor_p1 simulation (real timings, --duration seconds)
+    replay : a traffic_log.py log (--speed 0 = as fast as possible)
+    flood  : --count spot messages published back-to-back
+
+Usage :
+    python run_pipeline.py --source flood --count 50000
+    python run_pipeline.py --source replay --log traffic.log --speed 0
+    python run_pipeline.py --source live --duration 30 --zones A B --per-zone 500
+    python run_pipeline.py --source flood --with-p6      # needs the REST API on :3000
+"""
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+os.environ["SMARTPARK_TRANSPORT"] = "loopback"
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for d in ("p1_sensor", "p2_entry_exit_logic", "p3_barriers", "p4_afficheur_led", "Backend_API"):
+    sys.path.insert(0, os.path.join(ROOT, d))
+
+from smartpark_mqtt import make_client
+
+PREFIX = "smart_parking_2026/parking/"
+HOPS = [
+    ("P1 spots", "spots/"),
+    ("P1 gates", "_sensor/status"),
+    ("P2 barrier cmd", "/cmd"),
+    ("P3 barrier state", "/state"),
+    ("P4 display", "display/available"),
+    ("P6 new_spot", "config/new_spot"),
+]
+
+
+def hop_of(topic: str) -> str:
+    for name, marker in HOPS:
+        if marker in topic:
+            return name
+    return "other"
+
+
+def start_module(client_id, on_connect, on_message, setup=None):
+    client = make_client(client_id)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    if setup is not None:
+        setup(client)  # e.g. start the module's workers before messages arrive
+    client.connect("loopback", 0, 60)
+    client.loop_start()
+    return client
+
+
+def wait_drained(clients, timeout: float = 10.0):
+    # Loopback inboxes empty = every hop has handled its messages
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if all(c._inbox.empty() for c in clients):
+            return
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", choices=["live", "replay", "flood"], default="flood")
+    parser.add_argument("--count", type=int, default=20000, help="flood: number of spot messages")
+    parser.add_argument("--log", help="replay: traffic_log.py file")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay: 0 = as fast as possible")
+    parser.add_argument("--duration", type=float, default=30.0, help="live: seconds to simulate")
+    parser.add_argument("--with-p6", action="store_true", help="also run MQTT_forwarding (REST API must be up)")
+    parser.add_argument("--verbose", action="store_true", help="keep the modules' own prints")
+    import sensor_p1
+    sensor_p1.add_spot_space_args(parser)
+    args = parser.parse_args()
+
+    import traffic_log
+    import person2_entry_exit_logic as p2
+    import barrier as p3
+    import p4_led_display as p4
+
+    counts = Counter()
+
+    def on_monitor(client, userdata, msg):
+        counts[hop_of(msg.topic)] += 1
+
+    out = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(out):
+        monitor = start_module("SmartPark2026_MONITOR",
+                               lambda c, *a: c.subscribe(PREFIX + "#", qos=1), on_monitor)
+        clients = [monitor,
+                   start_module(p3.CLIENT_ID, p3.on_connect, p3.on_message),
+                   start_module(p2.CLIENT_ID, p2.on_connect, p2.on_message, setup=p2.start_workers)]
+        p4.start_mqtt()
+        clients.append(p4.mqtt_client)
+        if args.with_p6:
+            import MQTT_forwarding as p6
+            clients.append(start_module(p6.CLIENT_ID, p6.on_connect, p6.on_message, setup=p6.start_workers))
+
+        source = make_client(sensor_p1.CLIENT_ID)
+        source.connect("loopback", 0, 60)
+        spot_ids = sensor_p1.make_spot_ids(args.zones, args.levels, args.per_zone)
+
+        start = time.perf_counter()
+        if args.source == "flood":
+            sensor_p1.LOG_PUBLISHES = False
+            for k in range(args.count):
+                status = "OCCUPIED" if (k // len(spot_ids)) % 2 == 0 else "FREE"
+                sensor_p1.publish_spot(source, spot_ids[k % len(spot_ids)], status, 20.0)
+        elif args.source == "replay":
+            traffic_log.replay(source, args.log, args.speed)
+        else:
+            stop = threading.Event()
+            threading.Timer(args.duration, stop.set).start()
+            sensor_p1.run_sensors(source, spot_ids, stop=stop)
+        published = time.perf_counter() - start
+        wait_drained(clients)
+        elapsed = time.perf_counter() - start
+
+    print(f"source={args.source} | published in {published:.2f}s | drained in {elapsed:.2f}s")
+    print(f"{'hop':>18} | {'messages':>9} | {'msg/s':>10}")
+    for name in [h[0] for h in HOPS] + ["other"]:
+        if counts[name]:
+            print(f"{name:>18} | {counts[name]:>9} | {counts[name] / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""Shared MQTT helpers for the Smart Parking modules."""
+from . import codec
+from .router import Message, Router
+from .transport import (
+    LoopbackBroker,
+    LoopbackClient,
+    connect_with_backoff,
+    default_broker,
+    make_client,
+    topic_matches,
+)
+
+__all__ = ["LoopbackBroker", "LoopbackClient", "Message", "Router", "codec", "connect_with_backoff",
+           "default_broker", "make_client", "topic_matches"]
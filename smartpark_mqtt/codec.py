@@ -0,0 +1,34 @@
+"""
+JSON codec of the MQTT payloads: orjson when installed (pip install orjson),
+the standard json module otherwise. Same output either way (compact JSON).
+
+loads(bytes | str) -> object      raises ValueError on invalid JSON
+dumps(object)      -> bytes       ready for client.publish()
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data):
+    # Standard library decoder; bytes are decoded first (json.loads(bytes) sniffs the encoding)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    loads = orjson.loads  # orjson.JSONDecodeError is a ValueError
+    dumps = orjson.dumps
+else:
+    BACKEND = "json"
+    loads = json_loads
+    dumps = json_dumps
@@ -0,0 +1,172 @@
+"""
+Table-driven topic dispatch.
+
+    router = Router(prefix="smart_parking_2026/parking/")
+    router.route("spots/{spot_id}/status", on_spot)      # on_spot(client, msg)
+    router.route("spots/batch", on_batch)
+    router.route("barriers/{barrier_id}/state", on_barrier_state)
+
+    client.on_message = router.on_message                  # paho callback
+    for f in router.filters(): client.subscribe(f, qos=1)  # in on_connect
+
+- Patterns are compiled once into a trie of topic levels; "{name}" (or "+")
+  matches one level, a final "#" the remaining levels (params["#"]).
+  The most specific route wins: literal level > "{name}" > "#".
+- Results are cached per topic (bounded), so a hot topic costs one dict lookup.
+- Handlers get a Message: topic, params (path parameters) and the raw payload,
+  decoded only when the handler reads msg.json (codec.py: orjson if installed).
+"""
+from . import codec
+
+CACHE_MAX = 50000  # topics remembered by match(); the cache is cleared when full
+
+
+class Message:
+    """paho message + path params, payload decoded lazily (once)."""
+    __slots__ = ("topic", "params", "payload", "qos", "retain", "_json")
+
+    _UNSET = object()
+
+    def __init__(self, topic: str, params: dict, payload: bytes, qos: int = 0, retain: bool = False):
+        self.topic = topic
+        self.params = params      # shared with the match cache: read only
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self._json = Message._UNSET
+
+    @property
+    def json(self):
+        """Decoded JSON payload; raises ValueError if the payload is not JSON."""
+        if self._json is Message._UNSET:
+            self._json = codec.loads(self.payload)
+        return self._json
+
+    @property
+    def text(self) -> str:
+        return self.payload.decode("utf-8", errors="ignore").strip()
+
+    def get(self, key, default=None):
+        """json.get(key) for dict payloads, default for anything else (invalid JSON included)."""
+        try:
+            data = self.json
+        except ValueError:
+            return default
+        return data.get(key, default) if isinstance(data, dict) else default
+
+
+class _Node:
+    __slots__ = ("children", "wildcard", "route", "hash_route")
+
+    def __init__(self):
+        self.children = {}      # literal level -> _Node
+        self.wildcard = None    # "+" / "{name}" level
+        self.route = None       # (handler, ((level, name), ...), None) ending here
+        self.hash_route = None  # (handler, names, level of "#") for a "#" after this level
+
+
+class Router:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._root = _Node()
+        self._filters = []
+        self._cache = {}
+        self.stats = {"dispatched": 0, "unmatched": 0, "errors": 0}
+
+    def route(self, pattern: str, handler=None):
+        """Registers handler(client, msg) for pattern; usable as a decorator."""
+        if handler is None:
+            return lambda fn: self.route(pattern, fn)
+
+        levels = (self.prefix + pattern).split("/")
+        node = self._root
+        names = []
+        mqtt_filter = []
+        for i, level in enumerate(levels):
+            if level == "#":
+                if i != len(levels) - 1:
+                    raise ValueError(f"'#' must be the last level: {pattern}")
+                node.hash_route = (handler, tuple(names), i)
+                mqtt_filter.append("#")
+                break
+            if level == "+" or (level.startswith("{") and level.endswith("}")):
+                if level != "+":
+                    names.append((i, level[1:-1]))
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+                mqtt_filter.append("+")
+            else:
+                node = node.children.setdefault(level, _Node())
+                mqtt_filter.append(level)
+        else:
+            node.route = (handler, tuple(names), None)
+
+        f = "/".join(mqtt_filter)
+        if f not in self._filters:
+            self._filters.append(f)
+        self._cache.clear()
+        return handler
+
+    def filters(self) -> list:
+        """MQTT subscription filters of every route ("{name}" -> "+")."""
+        return list(self._filters)
+
+    @staticmethod
+    def _walk(node: _Node, levels: list, i: int):
+        if i == len(levels):
+            if node.route is not None:
+                return node.route
+            return node.hash_route  # "a/#" also matches "a"
+        child = node.children.get(levels[i])
+        if child is not None:
+            found = Router._walk(child, levels, i + 1)
+            if found is not None:
+                return found
+        if node.wildcard is not None:
+            found = Router._walk(node.wildcard, levels, i + 1)
+            if found is not None:
+                return found
+        return node.hash_route
+
+    def match(self, topic: str):
+        """(handler, params) for topic, or (None, None)."""
+        hit = self._cache.get(topic)
+        if hit is not None:
+            return hit
+        levels = topic.split("/")
+        found = self._walk(self._root, levels, 0)
+        if found is None:
+            hit = (None, None)
+        else:
+            handler, names, hash_level = found
+            params = {name: levels[i] for i, name in names}
+            if hash_level is not None:
+                params["#"] = "/".join(levels[hash_level:])
+            hit = (handler, params)
+        if len(self._cache) >= CACHE_MAX:
+            self._cache.clear()
+        self._cache[topic] = hit
+        return hit
+
+    def dispatch(self, client, msg) -> bool:
+        """Runs the handler of msg.topic; False if no route matches."""
+        handler, params = self.match(msg.topic)
+        if handler is None:
+            self.stats["unmatched"] += 1
+            return False
+        self.stats["dispatched"] += 1
+        try:
+            handler(client, Message(msg.topic, params, msg.payload, msg.qos, msg.retain))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ Error on {msg.topic}: {e}")
+        return True
+
+    def on_message(self, client, userdata, msg):
+        """paho on_message callback (Callback API v2 signature)."""
+        self.dispatch(client, msg)
+
+    def subscribe_all(self, client, qos: int = 1):
+        for f in self._filters:
+            client.subscribe(f, qos=qos)
@@ -0,0 +1,52 @@
+"""
+Command tracing helpers: correlation ids and high-resolution timestamps.
+
+Timestamps are time.monotonic_ns() values tagged with CLOCK_ID. On Linux the
+monotonic clock is shared by every process of one boot, so two stamps with the
+same CLOCK_ID can be subtracted even across processes (P2 -> P3). Between
+different machines, use the *_wall_ns (time.time_ns) twins instead.
+"""
+import socket
+import time
+import uuid
+
+
+def _clock_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()[:8]
+    except OSError:
+        return socket.gethostname()
+
+
+CLOCK_ID = _clock_id()
+
+
+def now_ns() -> int:
+    return time.monotonic_ns()
+
+
+def wall_ns() -> int:
+    return time.time_ns()
+
+
+def new_cid(prefix: str = "") -> str:
+    """Correlation id of one command, e.g. "entry_3-4f1c9a2b7d0e"."""
+    return f"{prefix}-{uuid.uuid4().hex[:12]}" if prefix else uuid.uuid4().hex[:12]
+
+
+def span_ms(trace: dict, start: str, end: str):
+    """
+    Milliseconds between two stamps of a trace, or None if one is missing.
+    Stamp "x" is trace["x_ns"] on clock trace["x_clock"] (default trace["clock"]),
+    with trace["x_wall_ns"] as fallback when the two clocks differ.
+    """
+    a, b = trace.get(start + "_ns"), trace.get(end + "_ns")
+    if a is None or b is None:
+        return None
+    clock = trace.get("clock")
+    if trace.get(start + "_clock", clock) != trace.get(end + "_clock", clock):
+        a, b = trace.get(start + "_wall_ns"), trace.get(end + "_wall_ns")
+        if a is None or b is None:
+            return None
+    return (b - a) / 1e6
@@ -0,0 +1,283 @@
+"""
+Pluggable MQTT transport.
+
+make_client(client_id) returns either:
+- "paho"     : a real paho-mqtt client (Callback API v2) -> broker.emqx.io / mosquitto
+- "loopback" : an in-memory client attached to a process-wide LoopbackBroker
+               (+/# wildcards, retained messages, QoS 0/1), no network at all
+
+The transport is chosen with SMARTPARK_TRANSPORT=paho|loopback (default: paho).
+Both expose the subset of the paho API used by the modules: on_connect,
+on_message, connect, subscribe, unsubscribe, publish, loop_start, loop_stop,
+loop_forever, disconnect, reconnect_delay_set.
+
+connect_with_backoff() retries the first connection with exponential backoff;
+later drops are retried by paho's network loop (reconnect_delay_set), and
+on_connect runs again after each reconnection (re-subscribe there).
+"""
+import itertools
+import os
+import queue
+import random
+import threading
+import time
+
+TRANSPORT_ENV = "SMARTPARK_TRANSPORT"
+
+
+def topic_matches(sub: str, topic: str) -> bool:
+    """MQTT filter matching: '+' = one level, '#' = all remaining levels."""
+    sub_parts = sub.split("/")
+    topic_parts = topic.split("/")
+    for i, s in enumerate(sub_parts):
+        if s == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if s != "+" and s != topic_parts[i]:
+            return False
+    return len(sub_parts) == len(topic_parts)
+
+
+def _to_bytes(payload) -> bytes:
+    if payload is None:
+        return b""
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload)
+    if isinstance(payload, str):
+        return payload.encode("utf-8")
+    return str(payload).encode("utf-8")
+
+
+class LoopbackMessage:
+    """Same attributes as paho's MQTTMessage."""
+    __slots__ = ("topic", "payload", "qos", "retain", "mid")
+
+    def __init__(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False, mid: int = 0):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.mid = mid
+
+
+class LoopbackPublishInfo:
+    """Same surface as paho's MQTTMessageInfo (delivery is immediate)."""
+    rc = 0
+
+    def __init__(self, mid: int):
+        self.mid = mid
+
+    def is_published(self) -> bool:
+        return True
+
+    def wait_for_publish(self, timeout=None):
+        return None
+
+
+# =========================
+# In-memory broker
+# =========================
+class LoopbackBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = []       # [(filter, client, qos)]
+        self._retained = {}   # topic -> LoopbackMessage
+        self._mid = itertools.count(1)
+
+    def subscribe(self, client, sub: str, qos: int = 0):
+        with self._lock:
+            self._subs = [s for s in self._subs if not (s[0] == sub and s[1] is client)]
+            self._subs.append((sub, client, qos))
+            retained = [m for t, m in self._retained.items() if topic_matches(sub, t)]
+        # Retained messages are delivered to the new subscription (retain flag set)
+        for m in retained:
+            client._enqueue(LoopbackMessage(m.topic, m.payload, min(m.qos, qos), True, m.mid))
+
+    def unsubscribe(self, client, sub: str):
+        with self._lock:
+            self._subs = [s for s in self._subs if not (s[0] == sub and s[1] is client)]
+
+    def drop(self, client):
+        with self._lock:
+            self._subs = [s for s in self._subs if s[1] is not client]
+
+    def publish(self, topic: str, payload, qos: int = 0, retain: bool = False) -> int:
+        payload = _to_bytes(payload)
+        mid = next(self._mid)
+        with self._lock:
+            if retain:
+                # Empty retained payload clears the retained message (MQTT spec)
+                if payload:
+                    self._retained[topic] = LoopbackMessage(topic, payload, qos, True, mid)
+                else:
+                    self._retained.pop(topic, None)
+            targets = {}
+            for sub, client, sub_qos in self._subs:
+                if topic_matches(sub, topic):
+                    # One copy per client, at the highest matching QoS
+                    targets[client] = max(targets.get(client, 0), sub_qos)
+        for client, sub_qos in targets.items():
+            client._enqueue(LoopbackMessage(topic, payload, min(qos, sub_qos), False, mid))
+        return mid
+
+
+_default_broker = LoopbackBroker()
+
+
+def default_broker() -> LoopbackBroker:
+    return _default_broker
+
+
+class LoopbackClient:
+    """
+    paho-like client on a LoopbackBroker.
+    Messages are queued per client and handed to on_message by the network
+    loop (loop_start thread or loop_forever), like paho does.
+    """
+    def __init__(self, client_id: str = "", broker: LoopbackBroker | None = None, userdata=None):
+        self.client_id = client_id
+        self.broker = broker or _default_broker
+        self.on_connect = None
+        self.on_message = None
+        self.on_disconnect = None
+        self._userdata = userdata
+        self._inbox = queue.Queue()
+        self._thread = None
+        self._running = False
+        self.connected = False
+
+    def user_data_set(self, userdata):
+        self._userdata = userdata
+
+    def _enqueue(self, msg: LoopbackMessage):
+        self._inbox.put(msg)
+
+    # ---- connection ----
+    def connect(self, host=None, port=None, keepalive=60, **kwargs):
+        self.connected = True
+        if self.on_connect is not None:
+            self.on_connect(self, self._userdata, {}, 0, None)
+        return 0
+
+    def disconnect(self, *args, **kwargs):
+        self.connected = False
+        self.broker.drop(self)
+        self._running = False
+        self._inbox.put(None)  # wakes the loop
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, self._userdata, {}, 0, None)
+        return 0
+
+    def reconnect(self):
+        return self.connect()
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        return None  # never disconnected by the broker
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    # ---- pub / sub ----
+    def subscribe(self, topic, qos: int = 0, **kwargs):
+        topics = topic if isinstance(topic, list) else [(topic, qos)]
+        for t, q in topics:
+            self.broker.subscribe(self, t, q)
+        return (0, 0)
+
+    def unsubscribe(self, topic, **kwargs):
+        for t in (topic if isinstance(topic, list) else [topic]):
+            self.broker.unsubscribe(self, t)
+        return (0, 0)
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False, **kwargs):
+        return LoopbackPublishInfo(self.broker.publish(topic, payload, qos, retain))
+
+    # ---- network loop ----
+    def _dispatch(self, msg: LoopbackMessage):
+        if self.on_message is not None:
+            self.on_message(self, self._userdata, msg)
+
+    def _run(self):
+        while self._running:
+            msg = self._inbox.get()
+            if msg is None:
+                continue
+            self._dispatch(msg)
+
+    def loop(self, timeout: float = 1.0):
+        # Handles everything already queued (single-threaded use / tests)
+        while True:
+            try:
+                msg = self._inbox.get_nowait()
+            except queue.Empty:
+                return 0
+            if msg is not None:
+                self._dispatch(msg)
+
+    def loop_start(self):
+        if self._thread is not None:
+            return 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"loopback-{self.client_id}", daemon=True)
+        self._thread.start()
+        return 0
+
+    def loop_stop(self, *args):
+        self._running = False
+        self._inbox.put(None)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        return 0
+
+    def loop_forever(self, *args, **kwargs):
+        self._running = True
+        self._run()
+        return 0
+
+
+# =========================
+# Factory
+# =========================
+def transport_name() -> str:
+    return os.environ.get(TRANSPORT_ENV, "paho").lower()
+
+
+def make_client(client_id: str, transport: str | None = None, userdata=None):
+    transport = (transport or transport_name()).lower()
+    if transport == "loopback":
+        return LoopbackClient(client_id, userdata=userdata)
+    if transport != "paho":
+        raise ValueError(f"Unknown MQTT transport: {transport} (expected paho or loopback)")
+
+    import paho.mqtt.client as mqtt
+    return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, userdata=userdata)
+
+
+RECONNECT_MIN_S = 1.0
+RECONNECT_MAX_S = 30.0
+
+
+def connect_with_backoff(client, host: str, port: int = 1883, keepalive: int = 60,
+                         min_s: float = RECONNECT_MIN_S, max_s: float = RECONNECT_MAX_S,
+                         max_attempts: int | None = None):
+    """
+    client.connect() with exponential backoff + jitter until it succeeds
+    (or max_attempts failures: the last error is raised). Also sets the delays
+    paho uses to reconnect by itself when the connection drops later.
+    """
+    client.reconnect_delay_set(min_delay=max(1, int(min_s)), max_delay=max(1, int(max_s)))
+    delay = min_s
+    attempt = 0
+    while True:
+        try:
+            return client.connect(host, port, keepalive)
+        except OSError as e:
+            attempt += 1
+            if max_attempts is not None and attempt >= max_attempts:
+                raise
+            wait = delay * random.uniform(0.5, 1.0)
+            print(f"⚠️ MQTT connect to {host}:{port} failed ({e}), retry in {wait:.1f}s")
+            time.sleep(wait)
+            delay = min(delay * 2, max_s)